@@ -0,0 +1,334 @@
+"""
+All-pairs damage tensor for a roster.
+
+Builds arrays of stats, types and move data for every Pokemon in a roster file
+(config/pokemon.yaml) and computes the damage of every attacker/defender/move/roll
+combination in one pass of NumPy integer arithmetic, following the Gen 1 formula
+used by simulate_attack.calculate_damage.
+
+Usage:
+    roster = Roster.from_yaml("config/pokemon.yaml")
+    damage = damage_tensor(roster)          # [attacker, defender, move, roll]
+    odds = ko_tables(roster, damage, 4)     # [attacker, defender, n], P(KO within n hits)
+    odds = parallel_ko_tables(roster, 4, workers=8)  # same, attacker rows sharded over processes
+"""
+
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from analysis.calculate_type_effectiveness import calculate_type_effectiveness, type_chart
+from parse import pokemon_parser
+
+LOW_ROLL = 217
+HIGH_ROLL = 255
+ROLLS = np.arange(LOW_ROLL, HIGH_ROLL + 1, dtype=np.int64)
+MAX_MOVES = 4
+
+TYPES: List[str] = list(type_chart.keys())
+TYPE_INDEX = {name: i for i, name in enumerate(TYPES)}
+NO_TYPE = len(TYPES) # Index used for a missing second type
+
+
+def _effectiveness_table() -> np.ndarray:
+    """
+    [move type, defender type1, defender type2 (or NO_TYPE)] -> effectiveness code
+    as returned by calculate_type_effectiveness (0, 1, 2, 4, -2, -4).
+    """
+    table = np.zeros((len(TYPES), len(TYPES), len(TYPES) + 1), dtype=np.int64)
+    for i, attacking in enumerate(TYPES):
+        for j, type1 in enumerate(TYPES):
+            for k, type2 in enumerate(TYPES + [None]):
+                try:
+                    table[i, j, k] = calculate_type_effectiveness(attacking, type1, type2)
+                except ValueError:
+                    table[i, j, k] = 1 # Blank cell in type_chart.csv (Poison -> Dragon)
+    return table
+
+
+EFFECTIVENESS = _effectiveness_table()
+
+
+@dataclass
+class Roster:
+    """
+    Struct-of-arrays view of a roster. Move arrays are [pokemon, MAX_MOVES], padded
+    with invalid (valid=False) entries for Pokemon with fewer than MAX_MOVES moves.
+
+    There is one row per roster entry, holding one moveset. Several sets of a
+    species are listed as entries of their own, e.g. "Starmie" and "Starmie (Psychic)".
+    """
+    names: List[str]
+    moves: List[List[str]]
+    level: np.ndarray # [P]
+    stats: np.ndarray # [P, 5] hp, atk, def, spc, spe
+    type1: np.ndarray # [P]
+    type2: np.ndarray # [P], NO_TYPE if single typed
+    move_power: np.ndarray # [P, M]
+    move_type: np.ndarray # [P, M]
+    move_special: np.ndarray # [P, M]
+    move_fixed: np.ndarray # [P, M]
+    move_high_crit: np.ndarray # [P, M]
+    move_selfdestruct: np.ndarray # [P, M]
+    move_last_resort: np.ndarray # [P, M]
+    move_valid: np.ndarray # [P, M]
+
+    @staticmethod
+    def from_parser(parser: pokemon_parser.PokemonParser) -> 'Roster':
+        names = parser.get_pokemon_names()
+        for name in names:
+            if len(parser.moveset(name)) > MAX_MOVES:
+                raise ValueError(f"{name} has {len(parser.moveset(name))} moves, at most {MAX_MOVES} are supported.")
+        n = len(names)
+        shape = (n, MAX_MOVES)
+        roster = Roster(
+            names=names,
+            moves=[list(parser.moveset(name)) for name in names],
+            level=np.array([parser.level(name) for name in names], dtype=np.int64),
+            stats=np.array([parser.get_stats(name) for name in names], dtype=np.int64),
+            type1=np.zeros(n, dtype=np.int64),
+            type2=np.full(n, NO_TYPE, dtype=np.int64),
+            move_power=np.zeros(shape, dtype=np.int64),
+            move_type=np.zeros(shape, dtype=np.int64),
+            move_special=np.zeros(shape, dtype=bool),
+            move_fixed=np.zeros(shape, dtype=bool),
+            move_high_crit=np.zeros(shape, dtype=bool),
+            move_selfdestruct=np.zeros(shape, dtype=bool),
+            move_last_resort=np.zeros(shape, dtype=bool),
+            move_valid=np.zeros(shape, dtype=bool),
+        )
+        for i, name in enumerate(names):
+            type1, type2 = parser.type(name)
+            roster.type1[i] = TYPE_INDEX[type1]
+            if type2 is not None:
+                roster.type2[i] = TYPE_INDEX[type2]
+            for m, move_name in enumerate(roster.moves[i]):
+                move = pokemon_parser.Move(move_name)
+                roster.move_power[i, m] = move.power()
+                roster.move_type[i, m] = TYPE_INDEX[move.type()]
+                roster.move_special[i, m] = move.category() == "Special"
+                roster.move_fixed[i, m] = move.fixed_damage()
+                roster.move_high_crit[i, m] = move.high_crit()
+                roster.move_selfdestruct[i, m] = move.selfdestruct()
+                roster.move_last_resort[i, m] = move.last_resort()
+                roster.move_valid[i, m] = True
+        return roster
+
+    @staticmethod
+    def from_yaml(yaml_filepath: str) -> 'Roster':
+        return Roster.from_parser(pokemon_parser.PokemonParser(yaml_filepath))
+
+    def subset(self, indices: List[int]) -> 'Roster':
+        """
+        Roster of only the Pokemon at the given indices, in that order.
+        """
+        return Roster(
+            names=[self.names[i] for i in indices],
+            moves=[self.moves[i] for i in indices],
+            **{
+                field: getattr(self, field)[indices]
+                for field in self.__dataclass_fields__ if field not in ("names", "moves")
+            },
+        )
+
+    @property
+    def hp(self) -> np.ndarray:
+        return self.stats[:, pokemon_parser.Stat.HP.value]
+
+    @property
+    def damaging(self) -> np.ndarray:
+        """
+        [P, M] moves that deal damage (status moves and padding don't).
+        """
+        return self.move_valid & ((self.move_power > 0) | self.move_fixed)
+
+
+def damage_tensor(roster: Roster, crit: bool = False, defenders: Optional[Roster] = None) -> np.ndarray:
+    """
+    Damage of every (attacker, defender, move, roll) combination. Attackers come from
+    roster, defenders from `defenders` (defaults to the same roster).
+
+    Same arithmetic as simulate_attack.calculate_damage: integer division at each
+    step, stats quartered when either is above 255, Selfdestruct/Explosion halving
+    defense, high crit moves always using the crit multiplier, and fixed damage
+    moves dealing the attacker's level. Non-damaging moves deal 0.
+
+    Returns:
+        int64 array of shape [attackers, defenders, MAX_MOVES, 39]
+    """
+    Stat = pokemon_parser.Stat
+    if defenders is None:
+        defenders = roster
+    special = roster.move_special[:, None, :] # [A, 1, M]
+    A = np.where(special, roster.stats[:, None, None, Stat.SPC.value], roster.stats[:, None, None, Stat.ATK.value])
+    D = np.where(special, defenders.stats[None, :, None, Stat.SPC.value], defenders.stats[None, :, None, Stat.DEF.value])
+    A, D = np.broadcast_arrays(A, D) # [A, D, M]
+    D = np.where(roster.move_selfdestruct[:, None, :], D // 2, D)
+    scale = (A > 255) | (D > 255)
+    A = np.where(scale, A // 4, A)
+    D = np.where(scale, D // 4, D)
+    D = np.maximum(D, 1)
+
+    crit_boost = np.where(crit | roster.move_high_crit, 2, 1)[:, None, :] # [A, 1, M]
+    level = roster.level[:, None, None]
+    base = ((((2 * level * crit_boost) // 5 + 2) * roster.move_power[:, None, :] * A) // D) // 50 + 2
+
+    move_type = roster.move_type[:, None, :]
+    stab = (move_type == roster.type1[:, None, None]) | (move_type == roster.type2[:, None, None])
+    base = np.where(stab, base + base // 2, base)
+
+    effective = EFFECTIVENESS[move_type, defenders.type1[None, :, None], defenders.type2[None, :, None]] # [A, D, M]
+    base = base[..., None]
+    effective = effective[..., None]
+    rolls = ROLLS[None, None, None, :]
+    damage = np.where(
+        effective >= 0,
+        (base * np.maximum(effective, 0) * rolls) // 255,
+        (base // np.maximum(-effective, 1) * rolls) // 255,
+    )
+    damage = np.where(roster.move_fixed[:, None, :, None], roster.level[:, None, None, None], damage)
+    return np.where(roster.damaging[:, None, :, None], damage, 0)
+
+
+def ko_probabilities(damage: np.ndarray, hp: np.ndarray, n_hits: int) -> np.ndarray:
+    """
+    P(KO within k hits) for k = 1..n_hits for every (attacker, defender, move), where
+    each hit picks one of the rolls uniformly.
+
+    The per-hit damage distributions (capped at the defender's HP) of all combinations
+    are convolved together with one batched FFT per extra hit. Mass past the HP is
+    folded back into the HP bin after every step.
+
+    Args:
+        damage: [A, D, M, R] damage tensor
+        hp: [D] defender HP
+
+    Returns:
+        float array of shape [A, D, M, n_hits]
+    """
+    n_attackers, n_defenders, n_moves, n_rolls = damage.shape
+    hp_max = int(hp.max())
+    width = hp_max + 1
+    row_hp = np.broadcast_to(hp[None, :, None], damage.shape[:3]).reshape(-1)
+    capped = np.minimum(damage.reshape(-1, n_rolls), row_hp[:, None])
+
+    rows = np.repeat(np.arange(len(row_hp)), n_rolls)
+    pmf = np.zeros((len(row_hp), width))
+    np.add.at(pmf, (rows, capped.reshape(-1)), 1.0 / n_rolls)
+
+    result = np.empty((len(row_hp), n_hits))
+    row_index = np.arange(len(row_hp))
+    result[:, 0] = pmf[row_index, row_hp]
+    if n_hits > 1:
+        columns = np.arange(width)[None, :]
+        below_hp = columns < row_hp[:, None]
+        fft_size = 2 * width
+        hit_fft = np.fft.rfft(pmf, fft_size, axis=1)
+        total = pmf
+        for k in range(1, n_hits):
+            ko = total[row_index, row_hp]
+            conv = np.fft.irfft(np.fft.rfft(np.where(below_hp, total, 0.0), fft_size, axis=1) * hit_fft, fft_size, axis=1)
+            conv = np.maximum(conv, 0.0)
+            past_hp = np.arange(fft_size)[None, :] >= row_hp[:, None]
+            ko = ko + np.where(past_hp, conv, 0.0).sum(axis=1)
+            total = np.where(below_hp, conv[:, :width], 0.0)
+            total[row_index, row_hp] = ko
+            result[:, k] = ko
+    return np.clip(result, 0.0, 1.0).reshape(n_attackers, n_defenders, n_moves, n_hits)
+
+
+def ko_tables(roster: Roster, damage: np.ndarray = None, n_hits: int = 4, calc_last_resort: bool = False,
+              defenders: Optional[Roster] = None) -> np.ndarray:
+    """
+    Best odds over the attacker's moves of a KO within 1..n_hits hits, as ko_odds
+    computes for a single pair.
+
+    Returns:
+        float array of shape [attackers, defenders, n_hits]
+    """
+    if defenders is None:
+        defenders = roster
+    if damage is None:
+        damage = damage_tensor(roster, defenders=defenders)
+    probabilities = ko_probabilities(damage, defenders.hp, n_hits)
+    usable = roster.move_valid if calc_last_resort else roster.move_valid & ~roster.move_last_resort
+    probabilities = np.where(usable[:, None, :, None], probabilities, 0.0)
+    return probabilities.max(axis=2)
+
+
+# Roster data of the worker processes of parallel_ko_tables. Set once per process by
+# _init_worker; with the fork start method it is inherited rather than pickled.
+_worker_tables = None
+
+
+def _init_worker(roster: Roster, defenders: Roster, n_hits: int, calc_last_resort: bool) -> None:
+    global _worker_tables
+    _worker_tables = (roster, defenders, n_hits, calc_last_resort)
+
+
+def _ko_rows(start: int, stop: int):
+    roster, defenders, n_hits, calc_last_resort = _worker_tables
+    rows = roster.subset(list(range(start, stop)))
+    return start, ko_tables(rows, n_hits=n_hits, calc_last_resort=calc_last_resort, defenders=defenders)
+
+
+def parallel_ko_tables(roster: Roster, n_hits: int = 4, calc_last_resort: bool = False,
+                       defenders: Optional[Roster] = None, workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None, progress: bool = True) -> np.ndarray:
+    """
+    Same result as ko_tables, with the attacker rows split into chunks computed by a
+    pool of worker processes. Every row is independent, so this scales with the
+    number of cores; chunking also bounds the size of the intermediate tensors.
+
+    The roster is handed to each worker once (inherited through fork where available)
+    and each task only sends back its slice of the table.
+
+    Args:
+        workers: Number of processes, defaults to the number of CPUs. With 1 the rows
+            are computed in this process.
+        chunk_size: Attacker rows per task, defaults to about four tasks per worker.
+        progress: Print the number of finished rows to stderr.
+
+    Returns:
+        float array of shape [attackers, defenders, n_hits]
+    """
+    if defenders is None:
+        defenders = roster
+    n = len(roster.names)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-n // (workers * 4)))
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+    odds = np.zeros((n, len(defenders.names), n_hits))
+    done = 0
+
+    def merge(start, rows):
+        nonlocal done
+        odds[start:start + len(rows)] = rows
+        done += len(rows)
+        if progress:
+            print(f"\rKO tables: {done}/{n} attackers", end="" if done < n else "\n", file=sys.stderr, flush=True)
+
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(roster, defenders, n_hits, calc_last_resort)
+        for start, stop in chunks:
+            merge(*_ko_rows(start, stop))
+        return odds
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(roster, defenders, n_hits, calc_last_resort)) as executor:
+        futures = [executor.submit(_ko_rows, start, stop) for start, stop in chunks]
+        for future in as_completed(futures):
+            merge(*future.result())
+    return odds
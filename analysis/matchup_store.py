@@ -0,0 +1,108 @@
+"""
+Building the roster matchup tables.
+
+update_store computes the tables of src.battle.matchup_store from a roster file
+with analysis.damage_tensor, and keeps them up to date: rebuilding after a
+roster edit only recomputes the rows and columns of the Pokemon whose hash (its
+roster entry and move data) changed.
+
+Usage:
+    store = update_store("config/pokemon.yaml", "data/matchups", workers=8)
+    store.nko("Gengar", "Chansey")
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+from typing import Optional
+
+from analysis.damage_tensor import Roster, parallel_ko_tables
+from parse import pokemon_parser
+from src.battle.matchup_store import LIKELY_THRESHOLD, MatchupStore, nkos_from_odds
+
+
+def pokemon_hash(parser: pokemon_parser.PokemonParser, name: str) -> str:
+    """
+    Hash of everything the matchup tables depend on for one Pokemon: its roster
+    entry (type, level, stats, moves) and the data of its moves.
+    """
+    registry = pokemon_parser.get_move_registry()
+    payload = {
+        "pokemon": parser.yaml[name],
+        "moves": {move: registry.get(move) for move in parser.moveset(name)},
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _try_load(store_dir: str) -> Optional[MatchupStore]:
+    try:
+        return MatchupStore.load(store_dir, mmap=False)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def update_store(yaml_file: str, store_dir: str, n_hits: int = 4, threshold: float = LIKELY_THRESHOLD,
+                 force: bool = False, workers: Optional[int] = 1) -> MatchupStore:
+    """
+    Brings the store in store_dir up to date with the roster in yaml_file.
+
+    Only attackers and defenders whose hash changed (or that are new) are recomputed;
+    all other entries are copied from the existing store. Everything is recomputed if
+    the store is missing, was built with other settings, or force is set.
+
+    Attacker rows are computed by `workers` processes (None: one per CPU), see
+    analysis.damage_tensor.parallel_ko_tables.
+
+    Returns:
+        The updated store (in memory)
+    """
+    parser = pokemon_parser.PokemonParser(yaml_file)
+    roster = Roster.from_parser(parser)
+    hashes = {name: pokemon_hash(parser, name) for name in roster.names}
+
+    old = None if force else _try_load(store_dir)
+    if old is not None and (old.n_hits != n_hits or old.threshold != threshold):
+        old = None
+
+    if old is None:
+        changed = list(range(len(roster.names)))
+    else:
+        changed = [i for i, name in enumerate(roster.names) if old.hashes.get(name) != hashes[name]]
+        if not changed and old.names == roster.names:
+            return old
+
+    n = len(roster.names)
+    odds = np.zeros((n, n, n_hits))
+    if old is not None:
+        # Copy every pair that is still valid from the old table
+        kept = [i for i in range(n) if i not in set(changed)]
+        old_idx = np.array([old.index[roster.names[i]] for i in kept], dtype=np.int64)
+        kept = np.array(kept, dtype=np.int64)
+        odds[np.ix_(kept, kept)] = old.odds[np.ix_(old_idx, old_idx)]
+
+    if changed:
+        sub = roster.subset(changed)
+        # Changed attackers against everyone, and everyone against changed defenders
+        odds[changed, :, :] = parallel_ko_tables(sub, n_hits=n_hits, defenders=roster, workers=workers)
+        odds[:, changed, :] = parallel_ko_tables(roster, n_hits=n_hits, defenders=sub, workers=workers)
+
+    store = MatchupStore(roster.names, hashes, odds, nkos_from_odds(odds, threshold), threshold)
+    store.save(store_dir)
+    print(f"Matchup store {store_dir}: recomputed {len(changed)}/{n} Pokemon.")
+    return store
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Build or incrementally update the binary matchup table store")
+    parser.add_argument('--roster', type=str, default='config/pokemon.yaml', help='Roster YAML file')
+    parser.add_argument('--out', type=str, default='data/matchups', help='Store directory')
+    parser.add_argument('--n-hits', type=int, default=4, help='Compute KO odds up to this many hits')
+    parser.add_argument('--force', action='store_true', help='Recompute every entry')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    update_store(args.roster, args.out, n_hits=args.n_hits, force=args.force, workers=args.workers)
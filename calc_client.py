@@ -0,0 +1,189 @@
+"""
+Client for calc_server.js, a long-lived Node process running @smogon/calc.
+
+Requests are written as JSON lines and answered by id, so many requests can be in
+flight on one process (pipelining), and a pool spreads them over several processes.
+
+Usage:
+    with CalcPool(n_workers=2) as pool:
+        futures = pool.submit_many([CalcRequest("Gengar", 50, "Chansey", 50, "Thunderbolt")])
+        print(futures[0].result())
+"""
+
+import atexit
+import itertools
+import json
+import os
+import subprocess
+import threading
+
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_COMMAND = ["node", os.path.join(ROOT_DIR, "calc_server.js")]
+
+Calc = list[int]
+
+
+class CalcError(Exception):
+    pass
+
+
+@dataclass
+class CalcRequest:
+    attacker: str
+    attacking_level: int
+    defender: str
+    defending_level: int
+    move: str
+
+
+class CalcWorker:
+    """
+    One calc server process. Thread-safe; any number of requests may be pending.
+    """
+    def __init__(self, command: Sequence[str] = DEFAULT_COMMAND, cwd: str = ROOT_DIR):
+        self.proc = subprocess.Popen(
+            list(command), cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1)
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="calc-worker-reader", daemon=True)
+        self._reader.start()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, request: CalcRequest) -> Future:
+        return self.submit_many([request])[0]
+
+    def submit_many(self, requests: Sequence[CalcRequest]) -> List[Future]:
+        """
+        Sends all requests in one write, without waiting for earlier answers.
+        """
+        futures = []
+        lines = []
+        with self._lock:
+            if self._closed:
+                raise CalcError("Calc worker is closed")
+            for request in requests:
+                request_id = next(self._ids)
+                future = Future()
+                self._pending[request_id] = future
+                futures.append(future)
+                lines.append(json.dumps({"id": request_id, **asdict(request)}) + "\n")
+        # Written outside self._lock so the reader can keep resolving answers while a big batch is sent
+        with self._write_lock:
+            try:
+                self.proc.stdin.write("".join(lines))
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as e:
+                with self._lock:
+                    self._fail_pending(CalcError(f"Calc server is not running: {e}"))
+        return futures
+
+    def _read_loop(self) -> None:
+        for line in self.proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            with self._lock:
+                future = self._pending.pop(response.get("id"), None)
+            if future is None:
+                continue
+            if "error" in response:
+                future.set_exception(CalcError(response["error"]))
+            else:
+                future.set_result(response["damage"])
+        with self._lock:
+            self._fail_pending(CalcError("Calc server exited"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        # Called with self._lock held
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            with self._write_lock:
+                self.proc.stdin.close()
+            self.proc.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        self._reader.join(timeout=timeout)
+
+
+class CalcPool:
+    """
+    Spreads requests over n_workers calc server processes, least busy first.
+    """
+    def __init__(self, n_workers: int = 1, command: Sequence[str] = DEFAULT_COMMAND):
+        self.workers = [CalcWorker(command) for _ in range(n_workers)]
+
+    def submit(self, request: CalcRequest) -> Future:
+        return min(self.workers, key=lambda w: w.pending).submit(request)
+
+    def submit_many(self, requests: Sequence[CalcRequest]) -> List[Future]:
+        requests = list(requests)
+        chunk = -(-len(requests) // len(self.workers)) if requests else 0
+        futures = []
+        for i, worker in enumerate(self.workers):
+            part = requests[i * chunk:(i + 1) * chunk]
+            if part:
+                futures.extend(worker.submit_many(part))
+        return futures
+
+    def calculate_many(self, requests: Sequence[CalcRequest], timeout: Optional[float] = None) -> List[Calc]:
+        """
+        Returns the damage rolls of every request, [-1] for requests that failed.
+        """
+        results = []
+        for future in self.submit_many(requests):
+            try:
+                results.append(future.result(timeout=timeout))
+            except CalcError:
+                results.append([-1])
+        return results
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.close()
+
+    def __enter__(self) -> 'CalcPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_default_pool: Optional[CalcPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_calc_pool(n_workers: int = 1) -> CalcPool:
+    """
+    Shared pool, started on first use and closed at exit.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = CalcPool(n_workers)
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,49 @@
+// Long-lived damage calc worker. Loads @smogon/calc once and answers requests
+// as JSON lines on stdin/stdout:
+//
+//   > {"id": 1, "attacker": "Gengar", "attacking_level": 50, "defender": "Chansey", "defending_level": 50, "move": "Thunderbolt"}
+//   < {"id": 1, "damage": [38, 39, ...]}
+//   < {"id": 2, "error": "..."}
+//
+// Requests are answered in order. Only responses are written to stdout; logs go to stderr.
+const calc = require("@smogon/calc")
+const readline = require('readline');
+
+const gen = calc.Generations.get(1);
+
+function calculate(request) {
+  // TODO: Take into account dv's / raw stats
+  // TODO: Take into acccount stat boosts.
+  const result = calc.calculate(
+    gen,
+    new calc.Pokemon(gen, request.attacker, {
+      level: parseInt(request.attacking_level),
+    }),
+    new calc.Pokemon(gen, request.defender, {
+      level: parseInt(request.defending_level),
+    }),
+    new calc.Move(gen, request.move)
+  );
+  return Array.isArray(result.damage) ? result.damage : [result.damage];
+}
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  let response;
+  try {
+    const request = JSON.parse(line);
+    try {
+      response = {id: request.id, damage: calculate(request)};
+    } catch (err) {
+      response = {id: request.id, error: String(err)};
+    }
+  } catch (err) {
+    response = {id: null, error: "Invalid request: " + String(err)};
+  }
+  process.stdout.write(JSON.stringify(response) + "\n");
+});
+rl.on('close', () => process.exit(0));
+console.error("calc_server ready");
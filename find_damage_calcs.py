@@ -4,7 +4,7 @@ try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
     from yaml import Loader, Dumper
-import subprocess
+from calc_client import CalcRequest, get_calc_pool
 from parse_movesets import PokemonParser
 
 Calc = list[int]
@@ -32,34 +32,34 @@ class PokemonState:
     status: str = None
     boosts: list[int] = None
     
-# node query_calc.js  --attacker Gengar --al 50 --defender Chansey --dl 50 --move=Recover 
+def _request(your_pokemon: PokemonState, opposing_pokemon: PokemonState, move: str) -> CalcRequest:
+    return CalcRequest(
+        attacker=your_pokemon.name, attacking_level=your_pokemon.level,
+        defender=opposing_pokemon.name, defending_level=opposing_pokemon.level,
+        move=move)
+
+# Runs on the shared calc_server.js worker (see calc_client.py) instead of a node process per call
 def calculate_damage(your_pokemon: PokemonState, opposing_pokemon: PokemonState, move: str) -> Calc :
-    proc = subprocess.Popen(["node", "query_calc.js", 
-                             "--attacker=" + your_pokemon.name, "--attacking_level=" + str(your_pokemon.level), 
-                             "--defender=" + opposing_pokemon.name, "--defending_level=" + str(opposing_pokemon.level),
-                             "--move=" + move], stdout=subprocess.PIPE)
-    exit_code = proc.wait()
-    if exit_code != 0:
-        return [-1]
-    with open("query_result.yaml") as yaml_file:
-        yaml_body = yaml.load(yaml_file, Loader=Loader)
-        result = yaml_body["damage"]
-        return result if type(result) == list else [result,]
-    return [-1]
+    return get_calc_pool().calculate_many([_request(your_pokemon, opposing_pokemon, move)])[0]
 
 
 def calculate_damage_table(your_team: list[str], opposing_team: list[str]) -> DamageTable:
     table = DamageTable(your_team, opposing_team)
+    # Send every calc up front so the worker pipeline stays full, then fill in the table
+    entries = []
     for your_pokemon in your_team:
         for opposing_pokemon in opposing_team:
-            table.your_team[your_pokemon][opposing_pokemon] = {move : calculate_damage(
-                    PokemonState(name=your_pokemon, level=pokemon_table.level(your_pokemon)),
-                    PokemonState(name=opposing_pokemon, level=pokemon_table.level(opposing_pokemon)),
-                    move) for move in pokemon_table.moveset(your_pokemon)}
-            table.opposing_team[opposing_pokemon][your_pokemon] = {move : calculate_damage(
-                    PokemonState(name=opposing_pokemon, level=pokemon_table.level(opposing_pokemon)),
-                    PokemonState(name=your_pokemon, level=pokemon_table.level(your_pokemon)),
-                    move) for move in pokemon_table.moveset(opposing_pokemon)}
+            your_state = PokemonState(name=your_pokemon, level=pokemon_table.level(your_pokemon))
+            opposing_state = PokemonState(name=opposing_pokemon, level=pokemon_table.level(opposing_pokemon))
+            for move in pokemon_table.moveset(your_pokemon):
+                entries.append((table.your_team[your_pokemon][opposing_pokemon], move,
+                                _request(your_state, opposing_state, move)))
+            for move in pokemon_table.moveset(opposing_pokemon):
+                entries.append((table.opposing_team[opposing_pokemon][your_pokemon], move,
+                                _request(opposing_state, your_state, move)))
+    results = get_calc_pool().calculate_many([request for _, _, request in entries])
+    for (row, move, _), result in zip(entries, results):
+        row[move] = result
     return table
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import os
+import yaml
+
+from argparse import ArgumentParser
+from typing import Dict, List
+
+from src.concurrent.supervisor import NodeSpec, Supervisor
+
+'''
+    Starts the capture, state reader and controller nodes as supervised processes.
+
+    Usage:
+        python launch.py --config config/launcher.yaml --cpus capture=0,1 --cpus state_reader=2,3
+'''
+
+def parse_args():
+    parser = ArgumentParser(description="Start the pipeline nodes as supervised processes.")
+    parser.add_argument('--config', type=str, default='config/launcher.yaml', help='Nodes, CPU affinity and frame ring')
+    parser.add_argument('--cpus', type=str, action='append', default=[], help='Override the CPUs of a node, e.g. capture=0,1')
+    parser.add_argument('--only', type=str, action='append', default=None, help='Start only these nodes')
+    parser.add_argument('--max-restarts', type=int, default=5, help='Restarts of a crashing node before giving up')
+    parser.add_argument('--grace', type=float, default=5.0, help='Seconds a node has to exit after SIGINT')
+    return parser.parse_args()
+
+
+def parse_cpus(overrides: List[str]) -> Dict[str, List[int]]:
+    cpus = {}
+    for override in overrides:
+        name, _, values = override.partition('=')
+        if not values:
+            raise ValueError(f"Expected <node>=<cpu>,<cpu>..., got {override!r}.")
+        cpus[name] = [int(cpu) for cpu in values.split(',')]
+    return cpus
+
+
+def load_specs(config: Dict, cpus: Dict[str, List[int]]) -> List[NodeSpec]:
+    specs = []
+    for name, node in config['nodes'].items():
+        specs.append(NodeSpec(
+            name=name,
+            args=[str(arg) for arg in node['args']],
+            cpus=cpus.get(name, node.get('cpus')),
+            env={key: str(value) for key, value in node.get('env', {}).items()},
+            shm=node.get('shm', False),
+            restart=node.get('restart', True),
+            start_delay=float(node.get('start_delay', 0.0)),
+        ))
+    unknown = set(cpus) - {spec.name for spec in specs}
+    if unknown:
+        raise ValueError(f"Unknown nodes {sorted(unknown)}.")
+    return specs
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        with open(args.config, 'r') as file:
+            config = yaml.safe_load(file)
+        specs = load_specs(config, parse_cpus(args.cpus))
+        if args.only:
+            specs = [spec for spec in specs if spec.name in args.only]
+        available = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+        for spec in specs:
+            if available is not None and spec.cpus and not set(spec.cpus) <= available:
+                raise ValueError(f"{spec.name} is pinned to {spec.cpus}, but only CPUs {sorted(available)} are available.")
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+    supervisor = Supervisor(specs, shm_config=config.get('shm'), max_restarts=args.max_restarts, grace=args.grace,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    supervisor.run()
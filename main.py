@@ -1,3 +1,5 @@
+import json
+
 import cv2
 import numpy as np
 
@@ -13,8 +15,11 @@ from src.screen_parsing.box_detection import BoxDetection
 from src.screen_parsing.stadium_mode import StadiumModeParser
 from src.screen_parsing.update_processor import UpdateProcessor
 from src.state.pokestate_defs import ImageUpdate
-from src.utils.shared_image_list import SharedImageList
+from src.utils.shared_image_list import SharedImageList, unlink_segment
 from src.utils.serialization import serialize_image_update
+from src.utils.tracing import TraceContext, span, enable_trace_dump
+from src.utils.metrics import start_metrics_reporting
+from src.utils.profiling import install_profiler_signal
 
 def parse_args():
     parser = ArgumentParser(description="Run on input video feed and monitor game state.")
@@ -24,6 +29,12 @@ def parse_args():
     # TODO: Add debug mode
     parser.add_argument('--debug', action='store_true', help='Enable debug mode [NOT IMPLEMENTED]')
     parser.add_argument('--n-shmem-frames', type=int, default=20, help='Number of frames to keep in shared memory')
+    parser.add_argument('--shm-config', type=str, default=None, help='JSON camera config of a frame ring created by the launcher to attach to')
+    parser.add_argument('--trace-out', type=str, default=None, help='Write per-frame latency spans to this JSONL file on exit')
+    parser.add_argument('--metrics-port', type=int, default=None, help='Serve per-stage metrics on http://127.0.0.1:<port>/metrics')
+    parser.add_argument('--metrics-interval', type=float, default=None, help='Log a per-stage metrics summary every N seconds')
+    parser.add_argument('--profile', choices=['sample', 'cprofile'], default=None, help='Start profiling immediately (toggle with SIGUSR1)')
+    parser.add_argument('--profile-dir', type=str, default='profiles', help='Directory profiles are written to')
     return parser.parse_args()
 
 
@@ -58,26 +69,51 @@ def main(args):
         'dtype': str(initial_frame.dtype),
         'n_shmem_frames': str(args.n_shmem_frames),
     }
-    shm = SharedImageList(camera_config=camera_config, create=True)
-    publish_message_to_topic('image_data', CONFIG, camera_config)
+    if args.shm_config:
+        # The ring was created by the launcher, which also removes it
+        shm_config = json.loads(args.shm_config)
+        if any(str(shm_config[key]) != camera_config[key] for key in ('width', 'height', 'channel', 'dtype')):
+            raise ValueError(f"Frames are {initial_frame.shape} {initial_frame.dtype}, the shared memory ring is {shm_config}.")
+        camera_config = {key: str(value) for key, value in shm_config.items()}
+        shm = SharedImageList(camera_config=camera_config, create=False)
+    else:
+        if unlink_segment(camera_config['name']):
+            print(f"Removed stale shared memory segment {camera_config['name']}.")
+        shm = SharedImageList(camera_config=camera_config, create=True)
+    try:
+        publish_message_to_topic('image_data', CONFIG, camera_config)
+        run_capture(cap, shm, box_detection, stadium_mode_parser, update_processor)
+    finally:
+        shm.close()
+        cv2.destroyAllWindows()
+
+
+def run_capture(cap, shm, box_detection, stadium_mode_parser, update_processor):
     idx=0
 
     # Read a frame from the video source
     while True:
-        ret, frame = cap.read()
+        trace = TraceContext.new(idx)
+        with span("capture", trace):
+            ret, frame = cap.read()
         if not ret:
             print("Exiting...")
             break
 
-        updates = box_detection.update(frame)
-        stadium_mode = stadium_mode_parser.parse(updates)
-        if stadium_mode is not None:
-            update_processor.update_mode(stadium_mode)
-        processed_updates = update_processor.process_updates(updates, idx)
+        with span("box_detection", trace):
+            updates = box_detection.update(frame)
+        for update in updates:
+            update.trace = trace
+        with span("update_processing", trace):
+            stadium_mode = stadium_mode_parser.parse(updates)
+            if stadium_mode is not None:
+                update_processor.update_mode(stadium_mode)
+            processed_updates = update_processor.process_updates(updates, idx)
         for update in processed_updates:
             if isinstance(update, ImageUpdate):
                 # Add the update to the queue for processing
-                publish_message_to_topic('image_data', IMAGE_UPDATE, serialize_image_update(update, shm))
+                with span("publish_image_update", update.trace):
+                    publish_message_to_topic('image_data', IMAGE_UPDATE, serialize_image_update(update, shm))
                 # print(f"Published ImageUpdate: {update.message_type} for player {update.player_id}")
             else:
                 print(f"Unexpected update type: {type(update)}")
@@ -95,10 +131,12 @@ def main(args):
             print("Exiting...")
             break
 
-    cv2.destroyAllWindows()
-
 if __name__ == "__main__":
     args = parse_args()
+    if args.trace_out:
+        enable_trace_dump(args.trace_out)
+    start_metrics_reporting(port=args.metrics_port, interval=args.metrics_interval)
+    install_profiler_signal(mode=args.profile or 'sample', out_dir=args.profile_dir, start=args.profile is not None)
     try:
         check_args(args)
         main(args)
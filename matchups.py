@@ -1,33 +1,38 @@
-from parse import pokemon_parser
-from simulate_attack import ko_odds
+from analysis.damage_tensor import Roster, parallel_ko_tables
+from analysis.matchup_store import MatchupStore, update_store
+from parse.pokemon_parser import get_move_registry
 import csv
 
 LIKELY_THRESHOLD=0.6
 
-def calc_ko_ranges(yaml_file):
-    parser = pokemon_parser.PokemonParser(yaml_file)
-    total_pokemon = parser.get_pokemon_names()
+def calc_ko_ranges(yaml_file, workers=1, store=None):
+    # With a store (see update_store) its tables are used instead of computing them again
+    if store is None:
+        roster = Roster.from_yaml(yaml_file)
+        total_pokemon = roster.names
+        # [attacker, defender, n] odds of a KO within n+1 hits, for every pair at once
+        odds = parallel_ko_tables(roster, n_hits=4, workers=workers)
+    else:
+        total_pokemon = store.names
+        odds = store.odds
     fieldnames = ["Pokemon",] + total_pokemon
     table1 = []
     table2 = []
     table3 = []
     table4 = []
     nkos = []
-    for attacker in total_pokemon: 
-        row1 = {"Pokemon": attacker}
-        row2 = {"Pokemon": attacker}
-        row3 = {"Pokemon": attacker}
-        row4 = {"Pokemon": attacker}
+    for i, attacker in enumerate(total_pokemon):
+        rows = [{"Pokemon": attacker} for _ in range(4)]
         nko_row = {"Pokemon": attacker}
-        for defender in total_pokemon:
-            row1[defender], row2[defender], row3[defender], row4[defender] = ko_odds(attacker, defender, {}, {}, 
-                                               parser)
+        for j, defender in enumerate(total_pokemon):
+            for n, row in enumerate(rows):
+                row[defender] = float(odds[i, j, n])
             # Maxes out at 5
-            nko_row[defender] = sum([int(r[defender] < LIKELY_THRESHOLD) for r in [row1, row2, row3, row4]]) + 1
-        table1.append(row1)
-        table2.append(row2)
-        table3.append(row3)
-        table4.append(row4)
+            nko_row[defender] = sum([int(r[defender] < LIKELY_THRESHOLD) for r in rows]) + 1
+        table1.append(rows[0])
+        table2.append(rows[1])
+        table3.append(rows[2])
+        table4.append(rows[3])
         nkos.append(nko_row)
     return fieldnames, table1, table2, table3, table4, nkos
 
@@ -42,6 +47,12 @@ class Matchup:
             for p2 in pokemon_list:
                 self.matchup[p1][p2] = 0
 
+    def from_store(self, store_dir):
+        store = MatchupStore.load(store_dir)
+        for p1 in self.pokemon_list:
+            for p2 in self.pokemon_list:
+                self.matchup[p1][p2] = store.nko(p1, p2)
+
     def from_csv(self, nkos_file):
         with open(nkos_file, newline='') as csvfile:
             reader = csv.DictReader(csvfile)
@@ -61,7 +72,9 @@ class Matchup:
 
 
 if __name__ == "__main__":
-    fieldnames, table1, table2, table3, table4, nkos = calc_ko_ranges("config/pokemon.yaml")
+    get_move_registry().load_all(cache_path="config/moves/moves.cache.pkl")
+    store = update_store("config/pokemon.yaml", "data/matchups", workers=None)
+    fieldnames, table1, table2, table3, table4, nkos = calc_ko_ranges("config/pokemon.yaml", store=store)
 
     with open("data/ohkos.csv", 'w') as matchup_file:
         writer = csv.DictWriter(matchup_file, fieldnames=fieldnames)
@@ -1,4 +1,6 @@
 import os
+import pickle
+import threading
 import yaml
 from enum import Enum
 try:
@@ -15,12 +17,98 @@ class Stat(Enum):
     SPC=3
     SPD=4
 
+MOVES_DIR = "config/moves"
+MOVE_CACHE_VERSION = 1
+
+
+class MoveRegistry:
+    """
+    Parsed move data, loaded from `<moves_dir>/<name>.yaml` at most once per move.
+
+    Moves are loaded lazily on first use, or all at once with load_all(). load_all()
+    can also keep a pickle of every parsed file, which is reused as long as the
+    files' mtimes and sizes are unchanged.
+    """
+    def __init__(self, moves_dir: str = MOVES_DIR):
+        self.moves_dir = moves_dir
+        self._data: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.moves_dir, name + ".yaml")
+
+    def _parse(self, name: str) -> dict:
+        with open(self._path(name)) as yaml_file:
+            return yaml.load(yaml_file, Loader=Loader)
+
+    def get(self, name: str) -> dict:
+        data = self._data.get(name)
+        if data is None:
+            data = self._parse(name)
+            with self._lock:
+                self._data[name] = data
+        return data
+
+    def names(self) -> list[str]:
+        return sorted(f[:-len(".yaml")] for f in os.listdir(self.moves_dir) if f.endswith(".yaml"))
+
+    def _signature(self, names: list[str]) -> dict[str, tuple[int, int]]:
+        signature = {}
+        for name in names:
+            stat = os.stat(self._path(name))
+            signature[name] = (stat.st_mtime_ns, stat.st_size)
+        return signature
+
+    def load_all(self, cache_path: str = None) -> None:
+        """
+        Loads every move file in moves_dir.
+
+        Args:
+            cache_path: Optional pickle of the parsed files. Entries whose file changed
+                (mtime or size) are re-parsed, and the cache is rewritten if anything changed.
+        """
+        names = self.names()
+        signature = self._signature(names)
+        cached = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "rb") as cache_file:
+                    cache = pickle.load(cache_file)
+                if cache.get("version") == MOVE_CACHE_VERSION:
+                    cached = {
+                        name: data for name, data in cache["moves"].items()
+                        if cache["signature"].get(name) == signature.get(name)
+                    }
+            except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+                cached = {}
+        moves = {name: cached[name] if name in cached else self._parse(name) for name in names}
+        with self._lock:
+            self._data.update(moves)
+        if cache_path is not None and len(cached) != len(names):
+            with open(cache_path, "wb") as cache_file:
+                pickle.dump({"version": MOVE_CACHE_VERSION, "signature": signature, "moves": moves}, cache_file)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_move_registry = MoveRegistry()
+
+
+def get_move_registry() -> MoveRegistry:
+    return _move_registry
+
+
 class Move:
-    def __init__(self, name):
+    """
+    Read-only view of one move's data in a MoveRegistry. Cheap to construct.
+    """
+    __slots__ = ("name", "data")
+
+    def __init__(self, name, registry: MoveRegistry = None):
         self.name = name
-        yaml_filepath = os.path.join("config/moves", name + ".yaml")
-        with open(yaml_filepath) as yaml_file:
-            self.data = yaml.load(yaml_file, Loader=Loader)
+        self.data = (registry or _move_registry).get(name)
 
     def healing(self) -> bool:
         return "heal" in self.data["flags"]
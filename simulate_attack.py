@@ -5,6 +5,8 @@ from analysis.calculate_type_effectiveness import calculate_type_effectiveness
 import numpy as np
 import random
 
+from src.battle.damage import nhko_probabilities
+
 Boost = dict[pokemon_parser.Stat, int]
 
 LOW_ROLL=217
@@ -36,38 +38,66 @@ def calculate_damage(move: pokemon_parser.Move, A: int, D: int, crit: bool, leve
         return (damage // (-effective) * rng) // 255
 
 
-def likelihood_ohko(max_damage: int, defending_hp: int, fixed_damage: bool) -> float:
+N_ROLLS = HIGH_ROLL - LOW_ROLL + 1
+
+
+def damage_rolls(max_damage: int) -> np.ndarray:
+    """
+    The 39 equally likely damage values for a move whose highest roll is max_damage.
+    """
+    return np.arange(LOW_ROLL, HIGH_ROLL+1) * max_damage // HIGH_ROLL
+
+
+def hit_distribution(max_damage: int, defending_hp: int, fixed_damage: bool = False,
+                     crit_damage: int = None, crit_chance: float = 0.0, accuracy: float = 1.0) -> np.ndarray:
+    """
+    Probability mass function of the damage dealt by one use of a move, truncated at
+    defending_hp: entry i is P(damage == i) for i < defending_hp, and the last entry is
+    P(damage >= defending_hp).
+
+    Args:
+        max_damage: Highest non-crit roll (or the damage of a fixed damage move)
+        defending_hp: HP of the defender
+        fixed_damage: Move always deals max_damage
+        crit_damage: Highest crit roll, mixed in with probability crit_chance
+        crit_chance: Probability of a critical hit
+        accuracy: Probability the move hits. A miss deals 0 damage.
+    """
+    pmf = np.zeros(defending_hp + 1)
     if fixed_damage:
-        return 1.0 if max_damage >= defending_hp else 0.0
-    damage_rolls = np.arange(LOW_ROLL, HIGH_ROLL+1) * max_damage // HIGH_ROLL
-    return np.sum(damage_rolls >= defending_hp) / (HIGH_ROLL-LOW_ROLL+1)
+        pmf[min(max_damage, defending_hp)] = 1.0
+    else:
+        np.add.at(pmf, np.minimum(damage_rolls(max_damage), defending_hp), (1.0 - crit_chance) / N_ROLLS)
+        if crit_chance > 0.0:
+            crit_max = max_damage if crit_damage is None else crit_damage
+            np.add.at(pmf, np.minimum(damage_rolls(crit_max), defending_hp), crit_chance / N_ROLLS)
+    if accuracy < 1.0:
+        pmf *= accuracy
+        pmf[0] += 1.0 - accuracy
+    return pmf
+
+
+def likelihood_nhko(max_damage: int, defending_hp: int, fixed_damage: bool, n: int) -> float:
+    return float(nhko_probabilities(hit_distribution(max_damage, defending_hp, fixed_damage), n)[-1])
+
+def likelihood_ohko(max_damage: int, defending_hp: int, fixed_damage: bool) -> float:
+    return likelihood_nhko(max_damage, defending_hp, fixed_damage, 1)
 
 def likelihood_2hko(max_damage: int, defending_hp: int, fixed_damage: bool) -> float:
-    if fixed_damage:
-        return 1.0 if max_damage*2 >= defending_hp else 0.0
-    damage_rolls = np.arange(LOW_ROLL, HIGH_ROLL+1) * max_damage // HIGH_ROLL
-    return np.sum(damage_rolls[np.newaxis,:] + damage_rolls[:,np.newaxis] >= defending_hp) / (HIGH_ROLL - LOW_ROLL + 1)**2
+    return likelihood_nhko(max_damage, defending_hp, fixed_damage, 2)
 
 def likelihood_3hko(max_damage: int, defending_hp: int, fixed_damage: bool) -> float:
-    if fixed_damage:
-        return 1.0 if max_damage*3 >= defending_hp else 0.0
-    damage_rolls = np.arange(LOW_ROLL, HIGH_ROLL+1) * max_damage // HIGH_ROLL
-    turn1, turn2, turn3 = np.meshgrid(damage_rolls, damage_rolls, damage_rolls)
-    return np.sum((turn1 + turn2 + turn3) >= defending_hp) / (HIGH_ROLL - LOW_ROLL + 1)**3
+    return likelihood_nhko(max_damage, defending_hp, fixed_damage, 3)
 
 def likelihood_4hko(max_damage: int, defending_hp: int, fixed_damage: bool) -> float:
-    if fixed_damage:
-        return 1.0 if max_damage*4 >= defending_hp else 0.0
-    damage_rolls = np.arange(LOW_ROLL, HIGH_ROLL+1) * max_damage // HIGH_ROLL
-    turn1, turn2, turn3, turn4 = np.meshgrid(damage_rolls, damage_rolls, damage_rolls, damage_rolls)
-    return np.sum((turn1 + turn2 + turn3 + turn4) >= defending_hp) / (HIGH_ROLL - LOW_ROLL + 1)**4
+    return likelihood_nhko(max_damage, defending_hp, fixed_damage, 4)
 
 
 boost_modification_numerator = [25, 28, 33, 40, 50, 66, 100, 150, 200, 250, 300, 350, 400]
 boost_modification_denominator = 100
 
 def modify_stat(base_stat: int, boost: int) -> int:
-    return (base_state * boost_modification_numerator[boost+6]) // boost_modification_denominator
+    return (base_stat * boost_modification_numerator[boost+6]) // boost_modification_denominator
 
 
 def calc_move_damage(
@@ -76,17 +106,18 @@ def calc_move_damage(
     attacking_stat = pokemon_parser.Stat.SPC if move_data.category() == "Special" else pokemon_parser.Stat.ATK
     A = parser.get_stat(attacking, attacking_stat)
     if attacking_stat in attacking_boost:
-        attacking_stat = modify_stat(attacking_stat, attacking_boost[attacking_stat])
+        A = modify_stat(A, attacking_boost[attacking_stat])
     defending_stat = pokemon_parser.Stat.SPC if move_data.category() == "Special" else pokemon_parser.Stat.DEF
+    D = parser.get_stat(defending, defending_stat)
     if defending_stat in defending_boost:
-        defending_stat = modify_stat(defending_stat, defending_boost[defending_stat])
+        D = modify_stat(D, defending_boost[defending_stat])
     def_type1, def_type2 = parser.type(defending)
     atk_type1, atk_type2 = parser.type(attacking)
     stab = (atk_type1 == move_data.type()) or (atk_type2 == move_data.type())
     return calculate_damage(
             move_data,
-            parser.get_stat(attacking, attacking_stat),
-            parser.get_stat(defending, defending_stat),
+            A,
+            D,
             False,
             parser.level(attacking),
             stab,
@@ -95,13 +126,10 @@ def calc_move_damage(
             calc_weakest=calc_weakest)
 
 
-# Get % likelihood from ohko to 4hko
+# Get % likelihood from ohko to n_hits-hko (4hko by default)
 def ko_odds(attacking: str, defending: str, attacking_boost: Boost, defending_boost: Boost,
-                     parser: pokemon_parser.PokemonParser, calc_last_resort=False) -> float:
-    max_ohko=0
-    max_2hko=0
-    max_3hko=0
-    max_4hko=0
+                     parser: pokemon_parser.PokemonParser, calc_last_resort=False, n_hits: int = 4) -> tuple:
+    best = np.zeros(n_hits)
     defending_hp= parser.get_stat(defending, pokemon_parser.Stat.HP)
     for move in parser.moveset(attacking):
         move_data = pokemon_parser.Move(move)
@@ -109,11 +137,9 @@ def ko_odds(attacking: str, defending: str, attacking_boost: Boost, defending_bo
             continue
         damage = calc_move_damage(move_data, attacking, defending, attacking_boost, defending_boost, 
                             parser, calc_strongest=True) 
-        max_ohko = max(likelihood_ohko(damage, defending_hp, move_data.fixed_damage()), max_ohko)
-        max_2hko = max(likelihood_2hko(damage, defending_hp, move_data.fixed_damage()), max_2hko)
-        max_3hko = max(likelihood_3hko(damage, defending_hp, move_data.fixed_damage()), max_3hko)
-        max_4hko = max(likelihood_4hko(damage, defending_hp, move_data.fixed_damage()), max_4hko)
-    return max_ohko, max_2hko, max_3hko, max_4hko
+        pmf = hit_distribution(damage, defending_hp, move_data.fixed_damage())
+        best = np.maximum(best, nhko_probabilities(pmf, n_hits))
+    return tuple(float(p) for p in best)
 
 if __name__ == "__main__":
     print(calculate_damage(
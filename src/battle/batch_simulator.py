@@ -0,0 +1,657 @@
+"""
+Batched Gen 1 Simulator
+
+Steps N independent battles at once. Each battle is a row of struct-of-arrays
+columns (HP, stats, types, status, stat stages, moves and PP per team slot), and
+both sides' actions are int arrays using the encoding of src.battle.simulator
+(0-3 move, 4 + slot switch). Damage rolls, accuracy checks and status transitions
+are masked NumPy operations over all rows, so the cost per battle drops as N grows.
+
+The mechanics are the part of TurnSimulator that decides most battles: speed and
+priority order, the full damage formula (stages, burn, screens, crits, STAB,
+types, rolls), accuracy, multi-hit, recoil, drain, Selfdestruct / Explosion,
+Hyper Beam recharge, fixed damage and OHKO moves, sleep / freeze / paralysis /
+burn / poison, status and stat stage moves, secondary effects, healing, screens,
+switching and forced switches after a faint. Confusion, flinch, Substitute,
+two-turn and trapping moves, Haze and the crash damage of a missed Jump Kick /
+High Jump Kick are only simulated by TurnSimulator: the batch engine treats
+those moves as if they had no such effect.
+
+A SimState already carrying one of these volatiles (confusion, a substitute, a
+move being charged, a trap) cannot be represented. from_sim_states marks its row
+in BatchState.unsupported, since it may diverge from TurnSimulator from the first
+turn on, or raises ValueError with strict=True.
+
+VectorBattleEnv wraps the engine in a gym-style vectorized environment.
+
+Usage:
+    batch = BatchState.from_battle_states([battle_state] * 1024)
+    sim = BatchSimulator(seed=0)
+    while not batch.done.all():
+        sim.step(batch, sim.random_actions(batch, 0), sim.random_actions(batch, 1))
+    batch.winner    # [N], -1 draw, 0 / 1 winning side
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import src.state.gen1_dex as dex
+import src.state.gen1_moves as moves
+from src.battle import damage
+from src.battle.simulator import (
+    SIM_MOVES, STRUGGLE, N_MOVES, TEAM_SIZE, ATK, DEF, SPC, SPE, DAMAGE, LEVEL, CONSTANT, SUPER_FANG, PSYWAVE, OHKO,
+    INFLICT, BOOST, DROP, HEAL, REST, REFLECT, LIGHT_SCREEN, REST_TURNS, SLEEP_TURNS, SimMove, SimState
+)
+from src.state.pokestate import BattleState
+from src.state.pokestate_defs import Status
+
+N_ACTIONS = N_MOVES + TEAM_SIZE
+NO_TYPE = len(dex.TYPES)
+TYPE_INDEX = {name: i for i, name in enumerate(dex.TYPES)}
+STAGE_TABLE = np.array(damage.STAGE_NUMERATOR, dtype=np.int64)
+MAX_HITS = 5
+
+NONE, POISONED, BURNED, PARALYZED, SLEEP, FROZEN, FAINTED = (status.value for status in (
+    Status.NONE, Status.POISONED, Status.BURNED, Status.PARALYZED, Status.SLEEP, Status.FROZEN, Status.FAINTED))
+
+
+def _type_table() -> np.ndarray:
+    """
+    [move type, defending type or NO_TYPE] -> multiplier in tenths.
+    """
+    table = np.full((len(dex.TYPES), len(dex.TYPES) + 1), 10, dtype=np.int64)
+    for i, attacking in enumerate(dex.TYPES):
+        for j, defending in enumerate(dex.TYPES):
+            table[i, j] = int(dex.get_type_effectiveness(attacking, defending) * 10)
+    return table
+
+
+TYPE_TABLE = _type_table()
+
+
+class MoveTable:
+    """
+    Columns of every SimMove, indexed by move id. Two extra ids: NO_MOVE for empty
+    slots and STRUGGLE_ID.
+    """
+    def __init__(self, sim_moves: Sequence[SimMove]):
+        all_moves = list(sim_moves) + [None, STRUGGLE]
+        n = len(all_moves)
+        self.ids: Dict[str, int] = {move.name: i for i, move in enumerate(all_moves) if move is not None}
+        self.no_move = len(sim_moves)
+        self.struggle = len(sim_moves) + 1
+        self.power = np.zeros(n, dtype=np.int64)
+        self.type = np.zeros(n, dtype=np.int64)
+        self.accuracy = np.zeros(n)
+        self.special = np.zeros(n, dtype=bool)
+        self.high_crit = np.zeros(n, dtype=bool)
+        self.selfdestruct = np.zeros(n, dtype=bool)
+        self.kind = np.full(n, -1, dtype=np.int64)
+        self.status = np.zeros(n, dtype=np.int64) # Status value inflicted by INFLICT moves
+        self.stat = np.zeros(n, dtype=np.int64) # Stat changed by BOOST / DROP moves
+        self.amount = np.zeros(n, dtype=np.int64)
+        self.constant = np.zeros(n, dtype=np.int64)
+        self.priority = np.zeros(n, dtype=np.int64)
+        self.recoil = np.zeros(n, dtype=np.int64)
+        self.drain = np.zeros(n, dtype=bool)
+        self.recharge = np.zeros(n, dtype=bool)
+        self.needs_sleep = np.zeros(n, dtype=bool) # Dream Eater
+        self.secondary_chance = np.zeros(n)
+        self.secondary_kind = np.full(n, -1, dtype=np.int64)
+        self.secondary_status = np.zeros(n, dtype=np.int64)
+        self.secondary_stat = np.zeros(n, dtype=np.int64)
+        self.hit_cdf = np.ones((n, MAX_HITS)) # P(hits <= k + 1)
+        for i, move in enumerate(all_moves):
+            if move is None:
+                continue
+            self.power[i] = move.power
+            self.type[i] = TYPE_INDEX[move.type]
+            self.accuracy[i] = move.accuracy
+            self.special[i] = move.special
+            self.high_crit[i] = move.high_crit
+            self.selfdestruct[i] = move.selfdestruct
+            self.kind[i] = move.kind
+            if move.kind == INFLICT:
+                self.status[i] = move.arg.value
+            elif move.kind in (BOOST, DROP):
+                self.stat[i], self.amount[i] = move.arg
+            elif move.kind == CONSTANT:
+                self.constant[i] = move.arg
+            self.priority[i] = move.priority
+            self.recoil[i] = move.recoil
+            self.drain[i] = move.drain
+            self.recharge[i] = move.recharge
+            self.needs_sleep[i] = move.name == "Dream Eater"
+            if move.secondary is not None:
+                chance, kind, arg = move.secondary
+                self.secondary_chance[i] = chance
+                self.secondary_kind[i] = kind
+                if kind == INFLICT:
+                    self.secondary_status[i] = arg.value
+                elif kind == DROP:
+                    self.secondary_stat[i] = arg[0]
+            pmf = np.zeros(MAX_HITS)
+            for hits, p in move.hits:
+                pmf[hits - 1] = p
+            self.hit_cdf[i] = np.cumsum(pmf)
+
+
+MOVE_TABLE = MoveTable([SIM_MOVES[moves.normalize_move_name(move.name)] for move in moves.GEN1_MOVES])
+
+
+def apply_stage(stat: np.ndarray, stage: np.ndarray) -> np.ndarray:
+    return np.clip(stat * STAGE_TABLE[np.clip(stage, -6, 6) + 6] // 100, 1, 999)
+
+
+def unsupported_volatiles(state: SimState) -> List[str]:
+    """
+    Volatiles of the active Pokemon that BatchState has no column for.
+    """
+    dropped = []
+    for side in (0, 1):
+        mon = state.active_mon(side)
+        if mon is None:
+            continue
+        for name, present in (("confusion", mon.confusion > 0), ("substitute", mon.substitute > 0),
+                              ("two-turn move", mon.charging >= 0), ("trap", mon.trap_turns > 0 or mon.trapped)):
+            if present:
+                dropped.append(f"{name} (side {side})")
+    return dropped
+
+
+class BatchState:
+    """
+    N battles as arrays. Team columns are [N, 2, TEAM_SIZE, ...], active-Pokemon
+    volatile columns are [N, 2, ...]. Empty team slots have exists = False.
+    """
+    def __init__(self, n: int):
+        shape = (n, 2, TEAM_SIZE)
+        self.exists = np.zeros(shape, dtype=bool)
+        self.level = np.ones(shape, dtype=np.int64)
+        self.stats = np.ones(shape + (5,), dtype=np.int64)
+        self.species = np.zeros(shape, dtype=np.int64) # Pokedex number, 0 for empty slots
+        self.types = np.full(shape + (2,), NO_TYPE, dtype=np.int64)
+        self.crit_base = np.zeros(shape, dtype=np.int64)
+        self.max_hp = np.ones(shape, dtype=np.int64)
+        self.hp = np.zeros(shape, dtype=np.int64)
+        self.status = np.full(shape, FAINTED, dtype=np.int64)
+        self.sleep_turns = np.zeros(shape, dtype=np.int64)
+        self.moves = np.full(shape + (N_MOVES,), MOVE_TABLE.no_move, dtype=np.int64)
+        self.pp = np.zeros(shape + (N_MOVES,), dtype=np.int64)
+        self.active = np.zeros((n, 2), dtype=np.int64)
+        self.stages = np.zeros((n, 2, 4), dtype=np.int64)
+        self.reflect = np.zeros((n, 2), dtype=bool)
+        self.light_screen = np.zeros((n, 2), dtype=bool)
+        self.recharging = np.zeros((n, 2), dtype=bool)
+        self.must_switch = np.zeros((n, 2), dtype=bool)
+        self.winner = np.full(n, -2, dtype=np.int64) # -2 while running, -1 draw, 0 / 1 winning side
+        self.turn = np.zeros(n, dtype=np.int64)
+        self.unsupported = np.zeros(n, dtype=bool) # Converted with volatiles the engine drops
+
+    def __len__(self) -> int:
+        return len(self.winner)
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.winner != -2
+
+    def copy(self) -> 'BatchState':
+        other = BatchState.__new__(BatchState)
+        for name, value in vars(self).items():
+            setattr(other, name, value.copy())
+        return other
+
+    def take(self, rows: np.ndarray) -> 'BatchState':
+        """
+        New batch of the given rows (repeats allowed), e.g. one root state tiled N times.
+        """
+        other = BatchState.__new__(BatchState)
+        for name, value in vars(self).items():
+            setattr(other, name, value[rows])
+        return other
+
+    def assign(self, rows: np.ndarray, source: 'BatchState', source_rows: np.ndarray) -> None:
+        for name, value in vars(self).items():
+            value[rows] = getattr(source, name)[source_rows]
+
+    def assign_slot(self, rows: np.ndarray, side: int, slot: int, source: 'BatchState', source_rows: np.ndarray) -> None:
+        """
+        Copies the team columns of one team slot, e.g. to swap in another Pokemon.
+        """
+        for name, value in vars(self).items():
+            if value.ndim >= 3 and value.shape[1:3] == (2, TEAM_SIZE):
+                value[rows, side, slot] = getattr(source, name)[source_rows, side, slot]
+
+    def active_column(self, column: np.ndarray, rows: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        return column[rows, sides, self.active[rows, sides]]
+
+    def active_speed(self, rows: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        """
+        Speed of the active Pokemon after stat stages and paralysis.
+        """
+        slot = self.active[rows, sides]
+        speed = apply_stage(self.stats[rows, sides, slot, 4], self.stages[rows, sides, SPE])
+        paralyzed = self.status[rows, sides, slot] == PARALYZED
+        return np.where(paralyzed, np.maximum(1, speed // 4), speed)
+
+    @staticmethod
+    def from_sim_states(states: Sequence[SimState], strict: bool = False) -> 'BatchState':
+        """
+        Batch of the given battles. A battle whose active Pokemon carry volatiles the
+        batch engine does not simulate is marked unsupported, or raises ValueError
+        with strict.
+        """
+        batch = BatchState(len(states))
+        for row, state in enumerate(states):
+            dropped = unsupported_volatiles(state)
+            if dropped:
+                if strict:
+                    raise ValueError(f"Battle {row} has volatiles the batch engine does not simulate: {', '.join(dropped)}")
+                batch.unsupported[row] = True
+            batch.active[row] = state.active
+            batch.must_switch[row] = state.must_switch
+            batch.winner[row] = -2 if state.winner is None else state.winner
+            batch.turn[row] = state.turn
+            for side, team in enumerate(state.teams):
+                active = state.active_mon(side)
+                if active is not None:
+                    batch.stages[row, side] = active.stages
+                    batch.reflect[row, side] = active.reflect
+                    batch.light_screen[row, side] = active.light_screen
+                    batch.recharging[row, side] = active.recharging
+                for slot, pokemon in enumerate(team):
+                    if pokemon is None:
+                        continue
+                    index = (row, side, slot)
+                    batch.exists[index] = True
+                    batch.species[index] = damage.SPECIES_INDEX[pokemon.species.lower()]
+                    batch.level[index] = pokemon.level
+                    batch.stats[index] = pokemon.stats
+                    batch.types[index] = [TYPE_INDEX[t] for t in pokemon.types] + [NO_TYPE] * (2 - len(pokemon.types))
+                    batch.crit_base[index] = pokemon.crit_base
+                    batch.max_hp[index] = pokemon.max_hp
+                    batch.hp[index] = max(0, pokemon.hp)
+                    batch.status[index] = FAINTED if pokemon.hp <= 0 else pokemon.status.value
+                    batch.sleep_turns[index] = pokemon.sleep_turns
+                    batch.moves[index] = [MOVE_TABLE.no_move if m is None else MOVE_TABLE.ids[m.name] for m in pokemon.moves]
+                    batch.pp[index] = pokemon.pp
+        return batch
+
+    @staticmethod
+    def from_battle_states(battle_states: Sequence[BattleState], strict: bool = False) -> 'BatchState':
+        return BatchState.from_sim_states([SimState.from_battle_state(state) for state in battle_states], strict)
+
+    def hp_fraction(self) -> np.ndarray:
+        """
+        [N, 2] remaining HP of each team as a fraction of its total HP.
+        """
+        total = np.where(self.exists, self.max_hp, 0).sum(axis=2)
+        return np.where(self.exists, self.hp, 0).sum(axis=2) / np.maximum(total, 1)
+
+    def observation(self) -> np.ndarray:
+        """
+        float32 [N, 2 * (3 * TEAM_SIZE + 4)] features per side: HP fraction, status
+        and active flag of every slot, then the active Pokemon's stat stages.
+        """
+        n = len(self)
+        active = np.zeros((n, 2, TEAM_SIZE), dtype=np.float32)
+        active[np.arange(n)[:, None], np.arange(2)[None, :], self.active] = 1.0
+        per_slot = np.stack([self.hp / self.max_hp, self.status / FAINTED, active], axis=-1).reshape(n, 2, -1)
+        return np.concatenate([per_slot, self.stages / 6.0], axis=-1).reshape(n, -1).astype(np.float32)
+
+
+def legal_action_mask(batch: BatchState, side: int) -> np.ndarray:
+    """
+    bool [N, N_ACTIONS]. Mirrors simulator.legal_actions: forced switches only allow
+    switches, a recharging Pokemon only "move 0", and with no PP left "move 0" is Struggle.
+    """
+    n = len(batch)
+    rows = np.arange(n)
+    active = batch.active[:, side]
+    mask = np.zeros((n, N_ACTIONS), dtype=bool)
+    can_switch = batch.exists[:, side] & (batch.hp[:, side] > 0)
+    can_switch[rows, active] = False
+    mask[:, N_MOVES:] = can_switch
+    pp = batch.pp[rows, side, active]
+    usable = (pp > 0) & (batch.moves[rows, side, active] != MOVE_TABLE.no_move)
+    usable[:, 0] |= ~usable.any(axis=1)
+    forced = batch.must_switch[:, side]
+    mask[:, :N_MOVES] = usable & ~forced[:, None]
+    recharging = batch.recharging[:, side] & ~forced
+    mask[recharging] = False
+    mask[recharging, 0] = True
+    mask[batch.done] = False
+    mask[batch.done, 0] = True
+    return mask
+
+
+class BatchSimulator:
+    """
+    Steps every battle of a BatchState that isn't done. All randomness comes from
+    self.rng.
+    """
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+    def random_actions(self, batch: BatchState, side: int) -> np.ndarray:
+        """
+        A uniformly random legal action per battle.
+        """
+        mask = legal_action_mask(batch, side)
+        scores = np.where(mask, self.rng.random(mask.shape), -1.0)
+        return scores.argmax(axis=1)
+
+    def step(self, batch: BatchState, p1_actions: np.ndarray, p2_actions: np.ndarray) -> np.ndarray:
+        """
+        Plays one turn of every running battle in place. Returns batch.winner.
+        """
+        actions = np.stack([np.asarray(p1_actions, dtype=np.int64), np.asarray(p2_actions, dtype=np.int64)], axis=1)
+        running = ~batch.done
+
+        # Battles waiting for a replacement only perform the forced switches
+        forced_rows = running & batch.must_switch.any(axis=1)
+        for side in (0, 1):
+            rows = np.flatnonzero(forced_rows & batch.must_switch[:, side])
+            self._switch(batch, rows, np.full(len(rows), side), actions[rows, side] - N_MOVES)
+            batch.must_switch[rows, side] = False
+
+        rows = np.flatnonzero(running & ~forced_rows)
+        if len(rows) == 0:
+            return batch.winner
+        batch.turn[rows] += 1
+        acts = actions[rows]
+        recharging = batch.recharging[rows]
+        moving = (acts < N_MOVES) | recharging # [R, 2]
+
+        for side in (0, 1):
+            switch = ~moving[:, side]
+            self._switch(batch, rows[switch], np.full(switch.sum(), side), acts[switch, side] - N_MOVES)
+
+        # Order: priority, then speed, then a coin flip
+        move_ids = np.where(moving, self._chosen_moves(batch, rows, acts), MOVE_TABLE.no_move)
+        priority = np.where(moving & ~recharging, MOVE_TABLE.priority[move_ids], 0)
+        speed = np.stack([self._speed(batch, rows, np.full(len(rows), side)) for side in (0, 1)], axis=1)
+        coin = self.rng.random(len(rows)) < 0.5
+        first = np.where(priority[:, 0] != priority[:, 1], priority[:, 1] > priority[:, 0],
+                         np.where(speed[:, 0] != speed[:, 1], speed[:, 1] > speed[:, 0], coin)).astype(np.int64)
+
+        for order in (0, 1):
+            sides = first if order == 0 else 1 - first
+            index = np.arange(len(rows))
+            attacker_alive = batch.active_column(batch.hp, rows, sides) > 0
+            defender_alive = batch.active_column(batch.hp, rows, 1 - sides) > 0
+            go = moving[index, sides] & attacker_alive & defender_alive
+            self._act(batch, rows[go], sides[go], acts[index[go], sides[go]])
+            self._residual(batch, rows[go], sides[go])
+            if order == 0:
+                # A faint ends the turn
+                still = (batch.active_column(batch.hp, rows, sides) > 0) & \
+                        (batch.active_column(batch.hp, rows, 1 - sides) > 0)
+                moving = moving & still[:, None]
+
+        self._faint_and_finish(batch, rows)
+        return batch.winner
+
+    # --- Helpers ---
+
+    def _chosen_moves(self, batch: BatchState, rows: np.ndarray, acts: np.ndarray) -> np.ndarray:
+        result = np.empty(acts.shape, dtype=np.int64)
+        for side in (0, 1):
+            slot = batch.active[rows, side]
+            move_slot = np.minimum(acts[:, side], N_MOVES - 1)
+            move = batch.moves[rows, side, slot, move_slot]
+            pp = batch.pp[rows, side, slot, move_slot]
+            no_pp = ~((batch.pp[rows, side, slot] > 0) & (batch.moves[rows, side, slot] != MOVE_TABLE.no_move)).any(axis=1)
+            result[:, side] = np.where(no_pp, MOVE_TABLE.struggle, np.where(pp > 0, move, MOVE_TABLE.no_move))
+        return result
+
+    def _speed(self, batch: BatchState, rows: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        return batch.active_speed(rows, sides)
+
+    def _switch(self, batch: BatchState, rows: np.ndarray, sides: np.ndarray, slots: np.ndarray) -> None:
+        if len(rows) == 0:
+            return
+        valid = (slots >= 0) & (slots < TEAM_SIZE)
+        ok = valid.copy()
+        ok[valid] = batch.exists[rows[valid], sides[valid], slots[valid]] & \
+            (batch.hp[rows[valid], sides[valid], slots[valid]] > 0) & \
+            (slots[valid] != batch.active[rows[valid], sides[valid]])
+        if not ok.all():
+            bad = np.flatnonzero(~ok)[0]
+            raise ValueError(f"Illegal switch to slot {slots[bad]} for side {sides[bad]} in battle {rows[bad]}")
+        batch.active[rows, sides] = slots
+        batch.stages[rows, sides] = 0
+        batch.reflect[rows, sides] = False
+        batch.light_screen[rows, sides] = False
+        batch.recharging[rows, sides] = False
+
+    def _act(self, batch: BatchState, rows: np.ndarray, sides: np.ndarray, acts: np.ndarray) -> None:
+        if len(rows) == 0:
+            return
+        rng = self.rng
+        T = MOVE_TABLE
+        targets = 1 - sides
+        slot = batch.active[rows, sides]
+        target_slot = batch.active[rows, targets]
+        status = batch.status[rows, sides, slot]
+
+        # Turns lost to recharging, sleep, freeze and full paralysis
+        can = ~batch.recharging[rows, sides]
+        batch.recharging[rows, sides] = False
+        asleep = can & (status == SLEEP)
+        turns = batch.sleep_turns[rows, sides, slot] - asleep
+        woke = asleep & (turns <= 0)
+        batch.sleep_turns[rows, sides, slot] = np.where(asleep, np.maximum(turns, 0), batch.sleep_turns[rows, sides, slot])
+        batch.status[rows, sides, slot] = np.where(woke, NONE, status)
+        can &= ~asleep & (status != FROZEN)
+        can &= ~((status == PARALYZED) & (rng.random(len(rows)) < 0.25))
+
+        move_slot = np.minimum(acts, N_MOVES - 1)
+        pp = batch.pp[rows, sides, slot]
+        has_pp = ((pp > 0) & (batch.moves[rows, sides, slot] != T.no_move)).any(axis=1)
+        chosen = batch.moves[rows, sides, slot, move_slot]
+        if (can & has_pp & (pp[np.arange(len(rows)), move_slot] <= 0)).any():
+            raise ValueError("Illegal move without PP")
+        move = np.where(has_pp, chosen, T.struggle)
+        use_pp = can & has_pp
+        batch.pp[rows[use_pp], sides[use_pp], slot[use_pp], move_slot[use_pp]] -= 1
+
+        rows, sides, targets, slot, target_slot, move = (
+            a[can] for a in (rows, sides, targets, slot, target_slot, move))
+        if len(rows) == 0:
+            return
+        kind = T.kind[move]
+        hp = batch.hp[rows, sides, slot]
+        max_hp = batch.max_hp[rows, sides, slot]
+        target_hp = batch.hp[rows, targets, target_slot]
+        hp = np.where(T.selfdestruct[move], 0, hp)
+
+        # Moves on the user never miss
+        hit = rng.random(len(rows)) < T.accuracy[move]
+        self_kind = (kind == BOOST) | (kind == HEAL) | (kind == REST) | (kind == REFLECT) | (kind == LIGHT_SCREEN)
+        hit |= self_kind
+
+        # Status and stage moves
+        target_status = batch.status[rows, targets, target_slot]
+        inflict = hit & (kind == INFLICT) & (target_status == NONE)
+        electric_immune = (T.type[move] == TYPE_INDEX["Electric"]) & \
+            (TYPE_TABLE[T.type[move][:, None], batch.types[rows, targets, target_slot]] == 0).any(axis=1)
+        poison_immune = (T.status[move] == POISONED) & \
+            (batch.types[rows, targets, target_slot] == TYPE_INDEX["Poison"]).any(axis=1)
+        inflict &= ~electric_immune & ~poison_immune
+        self._inflict(batch, rows[inflict], targets[inflict], target_slot[inflict], T.status[move[inflict]])
+
+        boost = hit & (kind == BOOST)
+        stage = batch.stages[rows[boost], sides[boost], T.stat[move[boost]]]
+        batch.stages[rows[boost], sides[boost], T.stat[move[boost]]] = np.minimum(6, stage + T.amount[move[boost]])
+        drop = hit & (kind == DROP)
+        stage = batch.stages[rows[drop], targets[drop], T.stat[move[drop]]]
+        batch.stages[rows[drop], targets[drop], T.stat[move[drop]]] = np.maximum(-6, stage - T.amount[move[drop]])
+        heal = (kind == HEAL) & (hp < max_hp)
+        hp = np.where(heal, np.minimum(max_hp, hp + max_hp // 2), hp)
+        rest = (kind == REST) & (hp < max_hp)
+        hp = np.where(rest, max_hp, hp)
+        batch.status[rows[rest], sides[rest], slot[rest]] = SLEEP
+        batch.sleep_turns[rows[rest], sides[rest], slot[rest]] = REST_TURNS
+        batch.reflect[rows[kind == REFLECT], sides[kind == REFLECT]] = True
+        batch.light_screen[rows[kind == LIGHT_SCREEN], sides[kind == LIGHT_SCREEN]] = True
+
+        # Damage
+        dealt = self._damage(batch, rows, sides, targets, slot, target_slot, move, target_hp)
+        hit &= ~T.needs_sleep[move] | (target_status == SLEEP)
+        dealt = np.where(hit, np.minimum(dealt, target_hp), 0)
+        target_hp = target_hp - dealt
+        recoil = T.recoil[move]
+        hp = np.where((recoil > 0) & (dealt > 0), hp - np.maximum(1, dealt // np.maximum(recoil, 1)), hp)
+        hp = np.where(T.drain[move] & (dealt > 0), np.minimum(max_hp, hp + np.maximum(1, dealt // 2)), hp)
+        batch.hp[rows, sides, slot] = hp
+        batch.hp[rows, targets, target_slot] = target_hp
+        batch.recharging[rows, sides] = T.recharge[move] & (dealt > 0) & (target_hp > 0)
+
+        # Side effects of damaging moves
+        lands = (dealt > 0) & (target_hp > 0) & (rng.random(len(rows)) < T.secondary_chance[move])
+        burn_thaw = (dealt > 0) & (T.type[move] == TYPE_INDEX["Fire"]) & (target_status == FROZEN)
+        batch.status[rows[burn_thaw], targets[burn_thaw], target_slot[burn_thaw]] = NONE
+        own_type = (batch.types[rows, targets, target_slot] == T.type[move][:, None]).any(axis=1)
+        status_now = batch.status[rows, targets, target_slot]
+        secondary_status = lands & (T.secondary_kind[move] == INFLICT) & (status_now == NONE) & ~own_type
+        self._inflict(batch, rows[secondary_status], targets[secondary_status], target_slot[secondary_status],
+                      T.secondary_status[move[secondary_status]])
+        secondary_drop = lands & (T.secondary_kind[move] == DROP)
+        r, t, s = rows[secondary_drop], targets[secondary_drop], T.secondary_stat[move[secondary_drop]]
+        batch.stages[r, t, s] = np.maximum(-6, batch.stages[r, t, s] - 1)
+
+    def _inflict(self, batch: BatchState, rows: np.ndarray, sides: np.ndarray, slots: np.ndarray,
+                 status: np.ndarray) -> None:
+        batch.status[rows, sides, slots] = status
+        sleeping = status == SLEEP
+        batch.sleep_turns[rows[sleeping], sides[sleeping], slots[sleeping]] = \
+            self.rng.integers(SLEEP_TURNS[0], SLEEP_TURNS[1] + 1, size=sleeping.sum())
+
+    def _damage(self, batch: BatchState, rows: np.ndarray, sides: np.ndarray, targets: np.ndarray,
+                slot: np.ndarray, target_slot: np.ndarray, move: np.ndarray, target_hp: np.ndarray) -> np.ndarray:
+        """
+        Total damage of the move (all hits), before capping at the target's HP. 0 for
+        non-damaging moves and immune targets.
+        """
+        rng = self.rng
+        T = MOVE_TABLE
+        n = len(rows)
+        kind = T.kind[move]
+        special = T.special[move]
+        stats = batch.stats[rows, sides, slot]
+        target_stats = batch.stats[rows, targets, target_slot]
+        level = batch.level[rows, sides, slot]
+
+        high = np.where(T.high_crit[move], batch.crit_base[rows, sides, slot] * 8, batch.crit_base[rows, sides, slot])
+        crit = rng.random(n) < np.minimum(high, 255) / 256.0
+
+        A = np.where(special, stats[:, 3], stats[:, 1])
+        D = np.where(special, target_stats[:, 3], target_stats[:, 2])
+        A_stage = np.where(special, batch.stages[rows, sides, SPC], batch.stages[rows, sides, ATK])
+        D_stage = np.where(special, batch.stages[rows, targets, SPC], batch.stages[rows, targets, DEF])
+        A_mod = apply_stage(A, A_stage)
+        burned = ~special & (batch.status[rows, sides, slot] == BURNED)
+        A_mod = np.where(burned, np.maximum(1, A_mod // 2), A_mod)
+        D_mod = apply_stage(D, D_stage)
+        screen = np.where(special, batch.light_screen[rows, targets], batch.reflect[rows, targets])
+        D_mod = np.where(screen, D_mod * 2, D_mod)
+        A = np.where(crit, A, A_mod)
+        D = np.where(crit, D, D_mod)
+        D = np.where(T.selfdestruct[move], np.maximum(1, D // 2), D)
+        scale = (A > 255) | (D > 255)
+        A = np.where(scale, np.maximum(1, A // 4), A)
+        D = np.where(scale, np.maximum(1, D // 4), D)
+
+        level_term = (2 * np.where(crit, level * 2, level)) // 5 + 2
+        base = np.minimum((level_term * T.power[move] * A // D) // 50, 997) + 2
+        move_type = T.type[move]
+        stab = (batch.types[rows, sides, slot] == move_type[:, None]).any(axis=1)
+        base = np.where(stab, base + base // 2, base)
+        target_types = batch.types[rows, targets, target_slot]
+        base = base * TYPE_TABLE[move_type, target_types[:, 0]] // 10
+        base = base * TYPE_TABLE[move_type, target_types[:, 1]] // 10
+        roll = rng.integers(damage.LOW_ROLL, damage.HIGH_ROLL + 1, size=n)
+        dealt = np.where(base > 1, base * roll // 255, base)
+        hits = (rng.random(n)[:, None] >= T.hit_cdf[move]).sum(axis=1) + 1
+        dealt = dealt * hits
+
+        fixed = np.select(
+            [kind == LEVEL, kind == CONSTANT, kind == SUPER_FANG, kind == PSYWAVE, kind == OHKO],
+            [level, T.constant[move], np.maximum(1, target_hp // 2),
+             (rng.random(n) * np.maximum(1, level * 3 // 2 - 1)).astype(np.int64) + 1,
+             np.where(self._speed(batch, rows, sides) >= self._speed(batch, rows, targets), target_hp, 0)],
+            default=-1,
+        )
+        dealt = np.where(fixed >= 0, fixed, dealt)
+        return np.where((kind == DAMAGE) | (fixed >= 0), dealt, 0)
+
+    def _residual(self, batch: BatchState, rows: np.ndarray, sides: np.ndarray) -> None:
+        slot = batch.active[rows, sides]
+        status = batch.status[rows, sides, slot]
+        hp = batch.hp[rows, sides, slot]
+        hurt = ((status == BURNED) | (status == POISONED)) & (hp > 0)
+        batch.hp[rows, sides, slot] = np.where(hurt, hp - np.maximum(1, batch.max_hp[rows, sides, slot] // 16), hp)
+
+    def _faint_and_finish(self, batch: BatchState, rows: np.ndarray) -> None:
+        for side in (0, 1):
+            slot = batch.active[rows, side]
+            fainted = batch.hp[rows, side, slot] <= 0
+            r, s = rows[fainted], slot[fainted]
+            batch.hp[r, side, s] = 0
+            batch.status[r, side, s] = FAINTED
+            batch.must_switch[r, side] = True
+            batch.stages[r, side] = 0
+            batch.reflect[r, side] = False
+            batch.light_screen[r, side] = False
+            batch.recharging[r, side] = False
+        alive = (batch.exists[rows] & (batch.hp[rows] > 0)).any(axis=2) # [R, 2]
+        winner = np.where(alive[:, 0] & alive[:, 1], -2,
+                          np.where(alive[:, 0], 0, np.where(alive[:, 1], 1, -1)))
+        batch.winner[rows] = winner
+        finished = rows[winner != -2]
+        batch.must_switch[finished] = False
+
+
+Policy = Callable[[BatchState, int], np.ndarray]
+
+
+class VectorBattleEnv:
+    """
+    Gym-style vectorized environment: the agent plays side 0 of N battles against
+    `opponent` (random legal actions by default). Finished battles are reset to a
+    fresh copy of their start state, as gym's vector envs do.
+
+    reset() -> obs [N, F]
+    step(actions [N]) -> obs, reward [N], done [N], info
+    info["action_mask"] holds the legal actions of the next step; reward is +1 / -1
+    for a win / loss on the step a battle ends, 0 otherwise.
+    """
+    def __init__(self, start_states: Sequence[BattleState], opponent: Optional[Policy] = None,
+                 seed: Optional[int] = None, max_turns: int = 500):
+        self.start = BatchState.from_battle_states(start_states)
+        self.sim = BatchSimulator(seed)
+        self.opponent = opponent or self.sim.random_actions
+        self.max_turns = max_turns
+        self.batch = self.start.copy()
+        self.num_envs = len(self.start)
+
+    def reset(self) -> np.ndarray:
+        self.batch = self.start.copy()
+        return self.batch.observation()
+
+    def action_mask(self) -> np.ndarray:
+        return legal_action_mask(self.batch, 0)
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+        batch = self.batch
+        winner = self.sim.step(batch, actions, self.opponent(batch, 1))
+        done = (winner != -2) | (batch.turn >= self.max_turns)
+        reward = np.where(winner == 0, 1.0, np.where(winner == 1, -1.0, 0.0))
+        info = {"winner": winner.copy(), "turn": batch.turn.copy()}
+        finished = np.flatnonzero(done)
+        if len(finished):
+            batch.assign(finished, self.start, finished)
+        info["action_mask"] = self.action_mask()
+        return batch.observation(), reward, done, info
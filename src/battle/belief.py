@@ -0,0 +1,291 @@
+"""
+Opponent Belief Tracking
+
+Keeps a probability distribution over what every team slot of the hidden side
+holds. A candidate is a rental set (species, level and moveset from the roster
+files, config/pokemon.yaml) and each slot has a weight per candidate. Evidence
+rules candidates out:
+
+    species         species of the BattleState's seen Pokemon (revealed or
+                    active, see src.battle.hidden_info), and "Go! X!" messages,
+                    fix a slot's species
+    known moves     moves the BattleState marks known, and "X used Y!" messages,
+                    keep only the candidates of the slot that know them
+
+Species and moves the BattleState holds without having seen them, e.g. those of
+a yaml team, are placeholders: they are not evidence, and the determinizations
+replace them.
+
+The state reader publishes the hidden side's battle messages with each
+BattleState, and the controller node (--belief) feeds them to observe_message()
+before the search agent sync()s the belief with the state it decides on. The
+controller node also reset()s the belief when a new battle starts.
+
+Evidence that would rule out every candidate of a slot (an OCR misread, a move
+missing from the roster) is ignored.
+
+Search agents draw complete teams from the belief. sample() returns an [N,
+TEAM_SIZE] array of candidate indices drawn slot by slot for all N teams at once
+(no species twice per team), and to_batch() turns them into a BatchState for
+the batched engine without building N BattleStates. to_battle_states() gives
+BattleState determinizations for the scalar agents.
+
+Usage:
+    belief = OpponentBelief.from_yaml("config/pokemon.yaml")
+    belief.observe_message("STARMIE used THUNDERBOLT!", battle_state)
+    samples = belief.sample(4096, np.random.default_rng(0))
+    batch = belief.to_batch(battle_state, samples)
+"""
+
+import copy
+import re
+
+import numpy as np
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from rapidfuzz import fuzz, process, utils
+
+from src.battle.batch_simulator import BatchState
+from src.battle.hidden_info import BATTLE_SIZE, RentalPool, _known_move, _move_state, seen_pokemon
+from src.battle.simulator import TEAM_SIZE, SimPokemon, SimState
+from src.state.gen1_moves import normalize_move_name
+from src.state.pokestate import BattleState, PokemonState, TeamState
+
+MATCH_CUTOFF = 70 # rapidfuzz score needed to accept an OCR'd name, as in src.state_reader.phrases
+USED_PATTERN = re.compile(r"^(?:Enemy )?(.+?) used (.+?)!?$", re.IGNORECASE)
+SWITCH_PATTERN = re.compile(r"^(?:Go|Do it)! (.+?)!?$", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class RentalSet:
+    species: str
+    level: int
+    moves: Tuple[str, ...]
+
+
+def _fill_from_set(pokemon: PokemonState, rental: RentalSet) -> None:
+    """
+    Fills an unknown species and every move slot that is not known from the rental
+    set, keeping the moves already known.
+    """
+    if not pokemon.species:
+        pokemon.species = rental.species
+        pokemon.level = rental.level
+        pokemon.hp = 100.0
+        pokemon.in_play = True
+    elif not pokemon.level:
+        pokemon.level = rental.level
+    slots = [s if _known_move(s) else None for s in (pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4)]
+    known = {normalize_move_name(s.name) for s in slots if s is not None}
+    candidates = [m for m in rental.moves if normalize_move_name(m) not in known]
+    for i, slot in enumerate(slots):
+        if (slot is None or not slot.name) and candidates:
+            slots[i] = _move_state(candidates.pop(0))
+    pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4 = slots
+
+
+class OpponentBelief:
+    """
+    [TEAM_SIZE, candidates] weights over the rental sets of the hidden side.
+    """
+    def __init__(self, sets: Sequence[RentalSet], hidden_side: int = 1, battle_size: int = BATTLE_SIZE):
+        self.sets = list(sets)
+        self.hidden_side = hidden_side
+        self.battle_size = battle_size
+        self.species = sorted({s.species for s in self.sets})
+        species_index = {name: i for i, name in enumerate(self.species)}
+        self.set_species = np.array([species_index[s.species] for s in self.sets], dtype=np.int64)
+        self.move_names = sorted({normalize_move_name(m) for s in self.sets for m in s.moves})
+        move_index = {name: i for i, name in enumerate(self.move_names)}
+        self.set_moves = np.zeros((len(self.sets), len(self.move_names)), dtype=bool)
+        for k, rental in enumerate(self.sets):
+            self.set_moves[k, [move_index[normalize_move_name(m)] for m in rental.moves]] = True
+        self._move_index = move_index
+        self.reset()
+
+    @staticmethod
+    def from_pool(pool: RentalPool, **kwargs) -> 'OpponentBelief':
+        return OpponentBelief([RentalSet(name, pool.levels[name], tuple(pool.movesets[name])) for name in pool.species],
+                              **kwargs)
+
+    @staticmethod
+    def from_yaml(*yaml_filepaths: str, **kwargs) -> 'OpponentBelief':
+        """
+        Belief over the sets of one or more roster files. A species listed in several
+        files contributes one candidate per distinct set.
+        """
+        sets = []
+        for path in yaml_filepaths:
+            pool = RentalPool.from_yaml(path)
+            sets.extend(RentalSet(name, pool.levels[name], tuple(pool.movesets[name])) for name in pool.species)
+        return OpponentBelief(list(dict.fromkeys(sets)), **kwargs)
+
+    def reset(self) -> None:
+        self.weights = np.ones((TEAM_SIZE, len(self.sets)))
+        self.present = np.zeros(TEAM_SIZE, dtype=bool) # Slots whose species has been seen
+        self.active = 0
+
+    def _team(self, battle_state: BattleState) -> TeamState:
+        return battle_state.opponent_team if self.hidden_side == 1 else battle_state.player_team
+
+    def _seen(self, battle_state: BattleState) -> List[bool]:
+        active = battle_state.opponent_active_mon if self.hidden_side == 1 else battle_state.player_active_mon
+        return seen_pokemon(self._team(battle_state), active)
+
+    def _restrict(self, slot: int, mask: np.ndarray) -> bool:
+        weights = self.weights[slot] * mask
+        if not weights.any():
+            return False
+        self.weights[slot] = weights
+        return True
+
+    def probabilities(self, slot: int) -> np.ndarray:
+        return self.weights[slot] / self.weights[slot].sum()
+
+    def species_probabilities(self, slot: int) -> np.ndarray:
+        """
+        [len(self.species)] marginal distribution of the slot's species.
+        """
+        return np.bincount(self.set_species, weights=self.probabilities(slot), minlength=len(self.species))
+
+    def observe_species(self, slot: int, species: str) -> bool:
+        known = [i for i, name in enumerate(self.species) if name.lower() == species.lower()]
+        if not known or not self._restrict(slot, self.set_species == known[0]):
+            return False
+        self.present[slot] = True
+        return True
+
+    def observe_move(self, slot: int, move: str) -> bool:
+        index = self._move_index.get(normalize_move_name(move))
+        return index is not None and self._restrict(slot, self.set_moves[:, index])
+
+    def sync(self, battle_state: BattleState) -> None:
+        """
+        Applies everything the BattleState has seen of the hidden side: the species
+        of its seen Pokemon, their known moves and the active slot.
+        """
+        for slot, (pokemon, seen) in enumerate(zip(self._team(battle_state).pk_list, self._seen(battle_state))):
+            if not seen:
+                continue
+            self.observe_species(slot, pokemon.species)
+            for move in (pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4):
+                if _known_move(move):
+                    self.observe_move(slot, move.name)
+        self.active = battle_state.opponent_active_mon if self.hidden_side == 1 else battle_state.player_active_mon
+
+    def observe_message(self, message: str, battle_state: BattleState, change: Optional[Tuple] = None) -> bool:
+        """
+        Updates the belief from one battle message of the hidden side and, if given,
+        the change parse_update_message returned for it. Returns whether the
+        message told anything.
+        """
+        if change is not None and len(change) == 3 and change[1] == "switch":
+            self.active = change[2]
+            return True
+        message = message.strip()
+        used = USED_PATTERN.match(message)
+        if used is not None:
+            name, move = used.groups()
+            species = process.extractOne(name, self.species, scorer=fuzz.ratio, processor=utils.default_process,
+                                         score_cutoff=MATCH_CUTOFF)
+            if species is not None:
+                self.observe_species(self.active, species[0])
+            match = process.extractOne(normalize_move_name(move), self.move_names, scorer=fuzz.ratio,
+                                       score_cutoff=MATCH_CUTOFF)
+            return match is not None and self.observe_move(self.active, match[0])
+        switch = SWITCH_PATTERN.match(message)
+        if switch is not None:
+            match = process.extractOne(switch.group(1), self.species, scorer=fuzz.ratio, processor=utils.default_process,
+                                       score_cutoff=MATCH_CUTOFF)
+            if match is None:
+                return False
+            team = self._team(battle_state).pk_list
+            named = [i for i, p in enumerate(team) if p.species and p.species.lower() == match[0].lower()]
+            seen = self._seen(battle_state)
+            unseen = [i for i in range(TEAM_SIZE) if not self.present[i] and not seen[i]]
+            slots = named or unseen
+            if not slots:
+                return False
+            self.active = slots[0]
+            return self.observe_species(self.active, match[0])
+        return False
+
+    def _slots_to_fill(self, battle_state: Optional[BattleState]) -> List[int]:
+        seen = self._seen(battle_state) if battle_state is not None else [False] * TEAM_SIZE
+        present = [s for s in range(TEAM_SIZE) if self.present[s] or seen[s]]
+        unknown = [s for s in range(TEAM_SIZE) if s not in present]
+        # Revealed slots first, so their species are used before any unknown slot is drawn
+        return present + unknown[:max(0, self.battle_size - len(present))]
+
+    def sample(self, n: int, rng: np.random.Generator, battle_state: Optional[BattleState] = None) -> np.ndarray:
+        """
+        [n, TEAM_SIZE] candidate indices of n sampled teams, -1 for slots left empty
+        (the hidden side brings battle_size Pokemon). The slots whose species was seen
+        are drawn first, then the unknown ones, and a species already drawn for a team
+        is excluded from the slots drawn after it.
+        """
+        samples = np.full((n, TEAM_SIZE), -1, dtype=np.int64)
+        used = np.zeros((n, len(self.species)), dtype=bool)
+        rows = np.arange(n)
+        for slot in self._slots_to_fill(battle_state):
+            weights = np.where(used[:, self.set_species], 0.0, self.weights[slot][None, :])
+            cdf = np.cumsum(weights, axis=1)
+            total = cdf[:, -1]
+            drawn = (cdf < ((1.0 - rng.random(n)) * total)[:, None]).sum(axis=1)
+            drawn = np.where(total > 0, np.minimum(drawn, len(self.sets) - 1), -1)
+            samples[:, slot] = drawn
+            filled = drawn >= 0
+            used[rows[filled], self.set_species[drawn[filled]]] = True
+        return samples
+
+    def _without_placeholders(self, battle_state: BattleState) -> BattleState:
+        """
+        Copy of battle_state where the hidden side's unseen Pokemon are empty.
+        """
+        state = copy.deepcopy(battle_state)
+        team = self._team(state).pk_list
+        for slot, seen in enumerate(self._seen(state)):
+            if not seen:
+                team[slot] = PokemonState()
+        return state
+
+    def to_battle_states(self, battle_state: BattleState, samples: np.ndarray) -> List[BattleState]:
+        """
+        One BattleState per sampled team, with the hidden side filled in.
+        """
+        battle_state = self._without_placeholders(battle_state)
+        states = []
+        for row in samples:
+            state = copy.deepcopy(battle_state)
+            team = self._team(state).pk_list
+            for slot, k in enumerate(row):
+                if k >= 0:
+                    _fill_from_set(team[slot], self.sets[k])
+            states.append(state)
+        return states
+
+    def to_batch(self, battle_state: BattleState, samples: np.ndarray) -> BatchState:
+        """
+        BatchState with one row per sampled team. Every (slot, candidate) pair that
+        occurs is converted once; the rows are then gathered with array indexing.
+        """
+        battle_state = self._without_placeholders(battle_state)
+        base = SimState.from_battle_state(battle_state)
+        team = self._team(battle_state).pk_list
+        side = self.hidden_side
+        candidates = [(slot, int(k)) for slot in range(TEAM_SIZE) for k in np.unique(samples[:, slot]) if k >= 0]
+        variants = []
+        for slot, k in candidates:
+            pokemon = copy.deepcopy(team[slot])
+            _fill_from_set(pokemon, self.sets[k])
+            variant = base.copy()
+            variant.teams[side][slot] = SimPokemon.from_pokemon_state(slot, pokemon)
+            variants.append(variant)
+        table = BatchState.from_sim_states(variants) if variants else None
+        batch = BatchState.from_sim_states([base]).take(np.zeros(len(samples), dtype=np.int64))
+        for row, (slot, k) in enumerate(candidates):
+            rows = np.flatnonzero(samples[:, slot] == k)
+            batch.assign_slot(rows, side, slot, table, np.full(len(rows), row))
+        return batch
@@ -0,0 +1,356 @@
+"""
+Gen 1 Damage Module
+
+Damage calculation between two PokemonStates, covering what BattleState tracks:
+stat stages (Gen 1 stage table), burn, Reflect / Light Screen and critical hits.
+Stats are not part of PokemonState, so they are derived from the species' base
+stats at the Pokemon's level (max DVs and stat exp, as in Stadium rentals) and
+cached per (species, level).
+
+Gen 1 rules applied:
+- Physical/special is decided by the move's type.
+- Crits double the level term and ignore stat stages, burn and screens.
+  Crit chance is base speed / 512 (x8 for high crit moves, capped at 255/256).
+- Explosion / Selfdestruct halve the target's Defense.
+- If either stat is above 255, both are divided by 4.
+- Type multipliers are applied one defending type at a time, then the random
+  217-255 roll (skipped when the damage is 1).
+- Fixed damage moves (Seismic Toss, Night Shade, Sonic Boom, Dragon Rage,
+  Super Fang, Psywave) ignore stats and types.
+- Multi-hit moves repeat the same damage for every hit.
+
+Usage:
+    rolls = damage_rolls(attacker, defender, "Thunderbolt")          # 39 damage values
+    dist = damage_distribution(attacker, defender, "Thunderbolt")    # crits, accuracy, multi-hit
+    dist.ko_chance(current_hp(defender))
+"""
+
+import functools
+import math
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import src.state.gen1_dex as dex
+import src.state.gen1_moves as moves
+from src.state.pokestate import PokemonState
+from src.state.pokestate_defs import Status
+
+LOW_ROLL = 217
+HIGH_ROLL = 255
+ROLLS = np.arange(LOW_ROLL, HIGH_ROLL + 1, dtype=np.int64)
+N_ROLLS = len(ROLLS)
+
+# Stat stage multipliers for stages -6..+6, as numerator / 100
+STAGE_NUMERATOR = (25, 28, 33, 40, 50, 66, 100, 150, 200, 250, 300, 350, 400)
+
+SPECIAL_TYPES = {"Fire", "Water", "Grass", "Electric", "Ice", "Psychic", "Dragon"}
+HIGH_CRIT_MOVES = {"Karate Chop", "Razor Leaf", "Crabhammer", "Slash"}
+SELFDESTRUCT_MOVES = {"Selfdestruct", "Explosion"}
+LEVEL_DAMAGE_MOVES = {"Seismic Toss", "Night Shade"}
+CONSTANT_DAMAGE_MOVES = {"Sonic Boom": 20, "Dragon Rage": 40}
+OHKO_MOVE_NAMES = {"Guillotine", "Horn Drill", "Fissure"}
+# (hits, probability) for multi-hit moves
+TWO_TO_FIVE_HITS = ((2, 3 / 8), (3, 3 / 8), (4, 1 / 8), (5, 1 / 8))
+MULTI_HIT = {
+    "Double Kick": ((2, 1.0),),
+    "Bonemerang": ((2, 1.0),),
+    "Twineedle": ((2, 1.0),),
+    **{name: TWO_TO_FIVE_HITS for name in
+       ("Double Slap", "Comet Punch", "Fury Attack", "Spike Cannon", "Barrage", "Fury Swipes", "Pin Missile")},
+}
+
+# Stadium rental Pokemon have max DVs (15) and max stat exp (65535)
+DV = 15
+STAT_EXP_BONUS = min(255, math.isqrt(65535 - 1) + 1) // 4
+
+
+@dataclass(frozen=True)
+class MoveInfo:
+    name: str
+    type: str
+    power: int
+    accuracy: float # 0-1
+    special: bool
+    high_crit: bool
+    selfdestruct: bool
+    hits: Tuple[Tuple[int, float], ...]
+
+    @property
+    def damaging(self) -> bool:
+        return self.power > 0 or self.name in LEVEL_DAMAGE_MOVES or self.name in CONSTANT_DAMAGE_MOVES \
+            or self.name in ("Super Fang", "Psywave") or self.name in OHKO_MOVE_NAMES
+
+
+def _build_move_table() -> Dict[str, MoveInfo]:
+    table = {}
+    for move in moves.GEN1_MOVES:
+        info = MoveInfo(
+            name=move.name,
+            type=move.type,
+            power=move.power or 0,
+            accuracy=move.accuracy / 100.0,
+            special=move.type in SPECIAL_TYPES,
+            high_crit=move.name in HIGH_CRIT_MOVES,
+            selfdestruct=move.name in SELFDESTRUCT_MOVES,
+            hits=MULTI_HIT.get(move.name, ((1, 1.0),)),
+        )
+        table[moves.normalize_move_name(move.name)] = info
+    return table
+
+
+MOVE_TABLE = _build_move_table()
+SPECIES_INDEX = {name.lower(): dex_num for dex_num, (name, _, _, _) in dex.GEN1_POKEMON.items()}
+
+
+def get_move_info(name: str) -> Optional[MoveInfo]:
+    return MOVE_TABLE.get(moves.normalize_move_name(name))
+
+
+@functools.lru_cache(maxsize=None)
+def species_stats(species: str, level: int) -> Tuple[int, int, int, int, int]:
+    """
+    (HP, Attack, Defense, Special, Speed) of a species at a level, before stat stages.
+    """
+    _, _, _, base = dex.GEN1_POKEMON[SPECIES_INDEX[species.lower()]]
+    stats = [((b + DV) * 2 + STAT_EXP_BONUS) * level // 100 + 5 for b in base]
+    stats[0] += level + 5 # HP: + level + 10 instead of + 5
+    return tuple(stats)
+
+
+@functools.lru_cache(maxsize=None)
+def species_types(species: str) -> Tuple[str, Optional[str]]:
+    _, type1, type2, _ = dex.GEN1_POKEMON[SPECIES_INDEX[species.lower()]]
+    return type1, type2
+
+
+@functools.lru_cache(maxsize=None)
+def base_speed(species: str) -> int:
+    return dex.GEN1_POKEMON[SPECIES_INDEX[species.lower()]][3][4]
+
+
+def _types(pokemon: PokemonState) -> Tuple[str, Optional[str]]:
+    if pokemon.type1:
+        return pokemon.type1, pokemon.type2
+    return species_types(pokemon.species)
+
+
+def max_hp(pokemon: PokemonState) -> int:
+    return species_stats(pokemon.species, pokemon.level)[0]
+
+
+def current_hp(pokemon: PokemonState) -> int:
+    """
+    HP in points, from PokemonState.hp (a percentage).
+    """
+    return int(round(pokemon.hp * max_hp(pokemon) / 100.0))
+
+
+def apply_stage(stat: int, stage: int) -> int:
+    stage = max(-6, min(6, stage))
+    return max(1, min(999, stat * STAGE_NUMERATOR[stage + 6] // 100))
+
+
+def effective_speed(pokemon: PokemonState) -> int:
+    speed = apply_stage(species_stats(pokemon.species, pokemon.level)[4], pokemon.speed_boost)
+    if pokemon.status == Status.PARALYZED:
+        speed = max(1, speed // 4)
+    return speed
+
+
+def crit_chance(attacker: PokemonState, move: MoveInfo) -> float:
+    threshold = base_speed(attacker.species) // 2
+    if move.high_crit:
+        threshold *= 8
+    return min(threshold, 255) / 256.0
+
+
+def type_multipliers(move_type: str, defender: PokemonState) -> Tuple[int, ...]:
+    """
+    Per defending type multipliers, in tenths (0, 5, 10 or 20).
+    """
+    result = []
+    for defending_type in _types(defender):
+        if defending_type:
+            result.append(int(dex.get_type_effectiveness(move_type, defending_type) * 10))
+    return tuple(result)
+
+
+def _attack_defense(attacker: PokemonState, defender: PokemonState, move: MoveInfo, crit: bool) -> Tuple[int, int]:
+    attacker_stats = species_stats(attacker.species, attacker.level)
+    defender_stats = species_stats(defender.species, defender.level)
+    if move.special:
+        A, D = attacker_stats[3], defender_stats[3]
+        if not crit:
+            A = apply_stage(A, attacker.special_boost)
+            D = apply_stage(D, defender.special_boost)
+            if defender.light_screen:
+                D *= 2
+    else:
+        A, D = attacker_stats[1], defender_stats[2]
+        if not crit:
+            A = apply_stage(A, attacker.atk_boost)
+            D = apply_stage(D, defender.def_boost)
+            if attacker.status == Status.BURNED:
+                A = max(1, A // 2)
+            if defender.reflect:
+                D *= 2
+    if move.selfdestruct:
+        D = max(1, D // 2)
+    if A > 255 or D > 255:
+        A = max(1, A // 4)
+        D = max(1, D // 4)
+    return A, D
+
+
+def base_damage(attacker: PokemonState, defender: PokemonState, move: MoveInfo, crit: bool = False) -> int:
+    """
+    Damage before the random roll, including STAB and type effectiveness.
+    """
+    A, D = _attack_defense(attacker, defender, move, crit)
+    level = attacker.level * (2 if crit else 1)
+    damage = min((((2 * level) // 5 + 2) * move.power * A // D) // 50, 997) + 2
+    if move.type in _types(attacker):
+        damage += damage // 2
+    for multiplier in type_multipliers(move.type, defender):
+        damage = damage * multiplier // 10
+    return damage
+
+
+def _fixed_damage(attacker: PokemonState, defender: PokemonState, move: MoveInfo) -> Optional[np.ndarray]:
+    """
+    Equally likely damage values of fixed damage moves, None for regular moves.
+    """
+    if move.name in LEVEL_DAMAGE_MOVES:
+        return np.array([attacker.level])
+    if move.name in CONSTANT_DAMAGE_MOVES:
+        return np.array([CONSTANT_DAMAGE_MOVES[move.name]])
+    if move.name == "Super Fang":
+        return np.array([max(1, current_hp(defender) // 2)])
+    if move.name == "Psywave":
+        return np.arange(1, max(2, attacker.level * 3 // 2))
+    if move.name in OHKO_MOVE_NAMES:
+        # Fails against faster targets
+        hits = effective_speed(attacker) >= effective_speed(defender)
+        return np.array([max_hp(defender) if hits else 0])
+    return None
+
+
+def damage_rolls(attacker: PokemonState, defender: PokemonState, move_name: str, crit: bool = False) -> np.ndarray:
+    """
+    The equally likely damage values of one hit of a move: the 39 rolls, or the
+    range of a variable fixed damage move (Psywave). All 0 for status moves.
+    """
+    move = get_move_info(move_name)
+    if move is None or not move.damaging:
+        return np.zeros(N_ROLLS, dtype=np.int64)
+    fixed = _fixed_damage(attacker, defender, move)
+    if fixed is not None:
+        return np.resize(fixed, N_ROLLS) if len(fixed) == 1 else fixed
+    damage = base_damage(attacker, defender, move, crit)
+    if damage <= 1:
+        return np.full(N_ROLLS, damage, dtype=np.int64)
+    return damage * ROLLS // 255
+
+
+@dataclass
+class DamageDistribution:
+    """
+    Distribution of the total damage dealt by one use of a move. damage is sorted and unique.
+    """
+    damage: np.ndarray
+    prob: np.ndarray
+    crit_chance: float
+    accuracy: float
+
+    def mean(self) -> float:
+        return float(np.dot(self.damage, self.prob))
+
+    def ko_chance(self, hp: int) -> float:
+        return float(self.prob[self.damage >= hp].sum())
+
+    def ko_probabilities(self, hp: int, n_hits: int) -> np.ndarray:
+        """
+        P(KO within k uses) for k = 1..n_hits against a target with `hp` HP left.
+
+        The damage is capped at `hp` and handed to nhko_probabilities.
+        """
+        if hp <= 0:
+            return np.ones(n_hits)
+        single = np.zeros(hp + 1)
+        np.add.at(single, np.minimum(self.damage, hp), self.prob)
+        return nhko_probabilities(single, n_hits)
+
+    def min_damage(self) -> int:
+        return int(self.damage[self.prob > 0].min())
+
+    def max_damage(self) -> int:
+        return int(self.damage[self.prob > 0].max())
+
+
+def nhko_probabilities(hit_pmf: np.ndarray, n: int) -> np.ndarray:
+    """
+    Probabilities of a KO within 1..n hits, given the distribution of a single hit's
+    damage capped at the defender's HP (hp+1 bins, the last one meaning KO).
+
+    The total damage distribution after k hits is the k-fold convolution of the
+    single hit distribution. Damage past the defender's HP is folded into the last
+    bin, so every convolution stays hp+1 long, and each step reuses the previous one.
+
+    Returns:
+        Array of length n where entry k-1 is P(KO within k hits)
+    """
+    hp = len(hit_pmf) - 1
+    result = np.zeros(n)
+    if hp == 0:
+        result[:] = 1.0
+        return result
+    total = hit_pmf
+    result[0] = total[hp]
+    for k in range(1, n):
+        if result[k-1] >= 1.0:
+            result[k:] = 1.0
+            break
+        ko = total[hp]
+        total = np.convolve(total[:hp], hit_pmf)
+        # Anything reaching hp is a KO, whichever hit it came from
+        total[hp] = total[hp:].sum() + ko
+        total = total[:hp+1]
+        result[k] = total[hp]
+    return np.minimum(result, 1.0)
+
+
+def _collect(values: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    unique, inverse = np.unique(values, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+def damage_distribution(attacker: PokemonState, defender: PokemonState, move_name: str,
+                        include_crits: bool = True, include_accuracy: bool = True) -> DamageDistribution:
+    """
+    Full damage distribution of a move: rolls, crits, multi-hit counts and misses.
+    """
+    move = get_move_info(move_name)
+    if move is None or not move.damaging:
+        return DamageDistribution(np.zeros(1, dtype=np.int64), np.ones(1), 0.0, 1.0)
+
+    chance = crit_chance(attacker, move) if include_crits and _fixed_damage(attacker, defender, move) is None else 0.0
+    values = [damage_rolls(attacker, defender, move_name)]
+    weights = [np.full(len(values[0]), (1.0 - chance) / len(values[0]))]
+    if chance > 0.0:
+        crit_values = damage_rolls(attacker, defender, move_name, crit=True)
+        values.append(crit_values)
+        weights.append(np.full(len(crit_values), chance / len(crit_values)))
+    single, single_prob = _collect(np.concatenate(values), np.concatenate(weights))
+
+    # Every hit of a multi-hit move deals the same damage
+    values = [single * hits for hits, _ in move.hits]
+    weights = [single_prob * p for _, p in move.hits]
+    accuracy = move.accuracy if include_accuracy else 1.0
+    if accuracy < 1.0:
+        values = values + [np.zeros(1, dtype=np.int64)]
+        weights = [w * accuracy for w in weights] + [np.array([1.0 - accuracy])]
+    damage, prob = _collect(np.concatenate(values), np.concatenate(weights))
+    return DamageDistribution(damage, prob, chance, accuracy)
@@ -0,0 +1,132 @@
+"""
+Damage Cache Module
+
+LRU memoization in front of src.battle.damage. Search agents evaluate the same
+attacker/defender/move combination many times per turn; the cache keys each query
+by a compact signature holding only the PokemonState fields that affect damage
+(species, level, types, relevant stat stages, burn/paralysis, screens), so
+distributions and n-hit KO odds are computed once per distinct matchup.
+
+Cached values are shared by every caller, so their arrays are read-only; copy
+them before modifying.
+
+Usage:
+    cache = get_damage_cache()
+    dist = cache.distribution(attacker, defender, "Thunderbolt")
+    odds = cache.ko_probabilities(attacker, defender, "Thunderbolt", n_hits=3)
+    print(cache.stats())   # {"hits": ..., "misses": ..., "hit_rate": ..., ...}
+"""
+
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from src.battle.damage import DamageDistribution, damage_distribution, damage_rolls, current_hp
+from src.state.gen1_moves import normalize_move_name
+from src.state.pokestate import PokemonState
+from src.state.pokestate_defs import Status
+
+# Moves whose damage depends on the defender's current HP
+HP_DEPENDENT_MOVES = {"superfang"}
+
+
+def attacker_signature(pokemon: PokemonState) -> Tuple:
+    return (pokemon.species, pokemon.level, pokemon.type1, pokemon.type2,
+            pokemon.atk_boost, pokemon.special_boost, pokemon.speed_boost,
+            pokemon.status == Status.BURNED, pokemon.status == Status.PARALYZED)
+
+
+def defender_signature(pokemon: PokemonState) -> Tuple:
+    return (pokemon.species, pokemon.level, pokemon.type1, pokemon.type2,
+            pokemon.def_boost, pokemon.special_boost, pokemon.speed_boost,
+            pokemon.status == Status.PARALYZED, pokemon.reflect, pokemon.light_screen)
+
+
+def matchup_signature(attacker: PokemonState, defender: PokemonState, move_name: str) -> Tuple:
+    move = normalize_move_name(move_name)
+    hp = current_hp(defender) if move in HP_DEPENDENT_MOVES else None
+    return (attacker_signature(attacker), defender_signature(defender), move, hp)
+
+
+def _freeze(value: Any) -> Any:
+    arrays = (value.damage, value.prob) if isinstance(value, DamageDistribution) else (value,)
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            array.flags.writeable = False
+    return value
+
+
+class DamageCache:
+    """
+    Bounded LRU cache of damage queries with hit/miss statistics.
+    """
+    def __init__(self, maxsize: int = 65536):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = _freeze(compute())
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def distribution(self, attacker: PokemonState, defender: PokemonState, move_name: str) -> DamageDistribution:
+        key = ("dist", matchup_signature(attacker, defender, move_name))
+        return self._get(key, lambda: damage_distribution(attacker, defender, move_name))
+
+    def rolls(self, attacker: PokemonState, defender: PokemonState, move_name: str, crit: bool = False) -> np.ndarray:
+        key = ("rolls", crit, matchup_signature(attacker, defender, move_name))
+        return self._get(key, lambda: damage_rolls(attacker, defender, move_name, crit))
+
+    def ko_probabilities(self, attacker: PokemonState, defender: PokemonState, move_name: str,
+                         n_hits: int = 4, hp: Optional[int] = None) -> np.ndarray:
+        """
+        P(KO within 1..n_hits uses), against the defender's current HP unless `hp` is given.
+        """
+        if hp is None:
+            hp = current_hp(defender)
+        key = ("ko", n_hits, hp, matchup_signature(attacker, defender, move_name))
+        return self._get(key, lambda: self.distribution(attacker, defender, move_name).ko_probabilities(hp, n_hits))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+        }
+
+
+_default_cache = DamageCache()
+
+
+def get_damage_cache() -> DamageCache:
+    return _default_cache
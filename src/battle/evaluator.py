@@ -0,0 +1,143 @@
+"""
+Heuristic Leaf Evaluator
+
+Scores battle states without playing them out, for the leaves of the search
+agents. The score of one side is a value in [0, 1] like a win probability and
+combines three terms:
+
+    material    mean remaining HP fraction of each team, discounted by status
+    duel        the race between the two active Pokemon: hits each needs to KO
+                the other (the nKO matchup table scaled by the target's HP),
+                with a tempo bonus for the faster one
+    team        how well each side's remaining Pokemon answer the other's
+
+The nKO table comes from the matchup store (src.battle.matchup_store), which
+is built and updated by the analysis tooling (matchups.py, analysis.matchup_store).
+It is copied into a [dex, dex] array indexed by Pokedex number when the evaluator
+is created, so evaluating is only array lookups. Pairs missing from the store
+count as even.
+
+Usage:
+    evaluator = HeuristicEvaluator.load("data/matchups")
+    evaluator.evaluate(sim_state, side=0)           # float
+    evaluator.evaluate_batch(batch_state, side=0)   # [N] floats
+"""
+
+import math
+
+import numpy as np
+
+import src.state.gen1_dex as dex
+from src.battle import damage
+from src.battle.batch_simulator import FAINTED, BatchState
+from src.battle.matchup_store import MatchupStore
+from src.battle.simulator import SimState
+from src.state.pokestate import BattleState
+
+# Indexed by Status value: NONE, POISONED, BURNED, PARALYZED, SLEEP, FROZEN, FAINTED
+STATUS_WEIGHT = np.array([1.0, 0.85, 0.8, 0.75, 0.5, 0.3, 0.0])
+
+MATERIAL_WEIGHT = 0.6
+DUEL_WEIGHT = 0.25
+TEAM_WEIGHT = 0.15
+
+
+class HeuristicEvaluator:
+    """
+    Evaluates SimStates and BatchStates from a [attacker, defender] table of hits
+    needed for a likely KO, indexed by Pokedex number.
+    """
+    def __init__(self, nkos: np.ndarray):
+        self.nkos = np.asarray(nkos, dtype=np.float64)
+        self.max_hits = float(self.nkos.max())
+        # Nested lists are faster than NumPy indexing for the few lookups of one state
+        self._nkos = self.nkos.tolist()
+        self._status_weight = STATUS_WEIGHT.tolist()
+
+    @staticmethod
+    def from_store(store: MatchupStore) -> 'HeuristicEvaluator':
+        neutral = store.n_hits + 1
+        nkos = np.full((len(dex.GEN1_POKEMON) + 1,) * 2, neutral, dtype=np.float64)
+        numbers = [damage.SPECIES_INDEX.get(name.lower()) for name in store.names]
+        known = np.array([i for i, number in enumerate(numbers) if number is not None], dtype=np.int64)
+        dex_numbers = np.array([numbers[i] for i in known], dtype=np.int64)
+        nkos[np.ix_(dex_numbers, dex_numbers)] = np.asarray(store.nkos)[np.ix_(known, known)]
+        return HeuristicEvaluator(nkos)
+
+    @staticmethod
+    def load(store_dir: str = "data/matchups") -> 'HeuristicEvaluator':
+        """
+        Evaluator from the store in store_dir.
+        """
+        return HeuristicEvaluator.from_store(MatchupStore.load(store_dir))
+
+    def evaluate(self, state: SimState, side: int) -> float:
+        if state.winner is not None:
+            return 0.5 if state.winner == -1 else float(state.winner == side)
+        nkos, weight, max_hits = self._nkos, self._status_weight, self.max_hits
+
+        alive, material = [], []
+        for team in (state.teams[side], state.teams[1 - side]):
+            members = [p for p in team if p is not None]
+            alive.append([damage.SPECIES_INDEX[p.species.lower()] for p in members if p.hp > 0])
+            total = sum(max(0, p.hp) / p.max_hp * weight[p.status.value] for p in members if p.hp > 0)
+            material.append(total / max(1, len(members)))
+
+        duel = 0.0
+        mine, theirs = state.active_mon(side), state.active_mon(1 - side)
+        if mine is not None and theirs is not None and mine.hp > 0 and theirs.hp > 0:
+            a, d = damage.SPECIES_INDEX[mine.species.lower()], damage.SPECIES_INDEX[theirs.species.lower()]
+            my_hits = nkos[a][d] * theirs.hp / theirs.max_hp
+            their_hits = nkos[d][a] * mine.hp / mine.max_hp
+            speed, other = mine.speed(), theirs.speed()
+            tempo = 0.5 if speed > other else -0.5 if speed < other else 0.0
+            duel = math.tanh(their_hits - my_hits + tempo)
+
+        team = 0.0
+        if alive[0] and alive[1]:
+            # Margin of i against j in hits, positive when i KOs j faster than j KOs i
+            margin = [[(nkos[j][i] - nkos[i][j]) / max_hits for j in alive[1]] for i in alive[0]]
+            answers = sum(max(row[k] for row in margin) for k in range(len(alive[1]))) / len(alive[1])
+            threats = sum(max(-m for m in row) for row in margin) / len(alive[0])
+            team = 0.5 * (answers - threats)
+
+        score = MATERIAL_WEIGHT * (material[0] - material[1]) + DUEL_WEIGHT * duel + TEAM_WEIGHT * team
+        return 0.5 + 0.5 * score
+
+    def evaluate_battle_state(self, battle_state: BattleState, side: int) -> float:
+        return self.evaluate(SimState.from_battle_state(battle_state), side)
+
+    def evaluate_batch(self, batch: BatchState, side: int) -> np.ndarray:
+        """
+        [N] values of `side` for every battle of the batch.
+        """
+        n = len(batch)
+        rows = np.arange(n)
+        order = [side, 1 - side]
+        alive = batch.exists[:, order] & (batch.status[:, order] != FAINTED) & (batch.hp[:, order] > 0)
+        fraction = np.where(alive, batch.hp[:, order] / batch.max_hp[:, order], 0.0)
+        members = np.maximum(1, batch.exists[:, order].sum(axis=2))
+        material = (fraction * STATUS_WEIGHT[batch.status[:, order]]).sum(axis=2) / members
+
+        species = batch.species[:, order]
+        slots = batch.active[:, order]
+        active_species = species[rows[:, None], [0, 1], slots]
+        active_fraction = fraction[rows[:, None], [0, 1], slots]
+        a, d = active_species[:, 0], active_species[:, 1]
+        my_hits = self.nkos[a, d] * active_fraction[:, 1]
+        their_hits = self.nkos[d, a] * active_fraction[:, 0]
+        tempo = 0.5 * np.sign(batch.active_speed(rows, np.full(n, side)) - batch.active_speed(rows, np.full(n, 1 - side)))
+        duel = np.where((active_fraction > 0).all(axis=1), np.tanh(their_hits - my_hits + tempo), 0.0)
+
+        mine, theirs = species[:, 0], species[:, 1]
+        margin = (self.nkos[theirs[:, None, :], mine[:, :, None]] - self.nkos[mine[:, :, None], theirs[:, None, :]]) / self.max_hits
+        pairs = alive[:, 0, :, None] & alive[:, 1, None, :]
+        answers = np.where(pairs, margin, -np.inf).max(axis=1)
+        threats = np.where(pairs, -margin, -np.inf).max(axis=2)
+        answers = np.where(alive[:, 1], answers, 0.0).sum(axis=1) / np.maximum(1, alive[:, 1].sum(axis=1))
+        threats = np.where(alive[:, 0], threats, 0.0).sum(axis=1) / np.maximum(1, alive[:, 0].sum(axis=1))
+        team = np.where(alive.any(axis=2).all(axis=1), 0.5 * (answers - threats), 0.0)
+
+        score = MATERIAL_WEIGHT * (material[:, 0] - material[:, 1]) + DUEL_WEIGHT * duel + TEAM_WEIGHT * team
+        value = 0.5 + 0.5 * score
+        return np.where(batch.winner == -2, value, np.where(batch.winner == -1, 0.5, (batch.winner == side).astype(np.float64)))
@@ -0,0 +1,135 @@
+"""
+Hidden Information Sampling
+
+The opponent's team is only partly visible: species appear as they are sent out
+and moves as they are used. A Pokemon of the hidden side counts as seen once it
+is revealed (PokemonState.revealed) or active, a move once it is known
+(MoveState.known); a species or move filled in beforehand, e.g. by a yaml team,
+is only a placeholder. Search agents plan on determinizations, copies of the
+BattleState where every unseen Pokemon and unknown move is replaced by a sample
+from the rental pool (the roster file, config/pokemon.yaml, which lists each
+species' level and moveset).
+
+Usage:
+    pool = RentalPool.from_yaml("config/pokemon.yaml")
+    sample = determinize(battle_state, hidden_side=1, pool=pool, rng=random.Random(0))
+"""
+
+import copy
+import random
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.battle import damage
+from src.params.yaml_parser import load_roster_from_yaml
+from src.state.gen1_moves import get_move_by_name
+from src.state.pokestate import BattleState, MoveState, PokemonState, TeamState
+
+BATTLE_SIZE = 3 # Pokemon brought to a Stadium battle
+
+
+@dataclass
+class RentalPool:
+    """
+    Species an opponent can bring, with their level and moveset.
+    """
+    levels: Dict[str, int]
+    movesets: Dict[str, List[str]]
+
+    @property
+    def species(self) -> List[str]:
+        return list(self.levels)
+
+    @staticmethod
+    def from_roster(roster: Dict[str, Dict]) -> 'RentalPool':
+        """
+        Pool of the species of a parsed roster file (see load_roster_from_yaml).
+        """
+        names = [name for name in roster if name.lower() in damage.SPECIES_INDEX]
+        return RentalPool(
+            levels={name: roster[name]["level"] for name in names},
+            movesets={name: list(roster[name]["moves"]) for name in names},
+        )
+
+    @staticmethod
+    def from_yaml(yaml_filepath: str) -> 'RentalPool':
+        return RentalPool.from_roster(load_roster_from_yaml(yaml_filepath))
+
+
+def _move_state(name: str) -> MoveState:
+    move = get_move_by_name(name)
+    pp = move.pp if move is not None else 0
+    return MoveState(known=False, name=name, pp=pp, pp_max=pp, disabled=False)
+
+
+def seen_pokemon(team: TeamState, active: int) -> List[bool]:
+    """
+    Per slot, whether the Pokemon has been seen: revealed or active.
+    """
+    return [bool(p.species) and (p.revealed or i == active) for i, p in enumerate(team.pk_list)]
+
+
+def _known_move(move: Optional[MoveState]) -> bool:
+    return move is not None and bool(move.name) and move.known
+
+
+def _fill_moves(pokemon: PokemonState, pool: RentalPool, rng: random.Random) -> None:
+    slots = [pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4]
+    if pokemon.species in pool.movesets:
+        # Placeholders are replaced as well
+        slots = [s if _known_move(s) else None for s in slots]
+    known = {s.name for s in slots if s is not None and s.name}
+    candidates = [m for m in pool.movesets.get(pokemon.species, []) if m not in known]
+    rng.shuffle(candidates)
+    for i, slot in enumerate(slots):
+        if (slot is None or not slot.name) and candidates:
+            slots[i] = _move_state(candidates.pop())
+    pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4 = slots
+
+
+def determinize(battle_state: BattleState, hidden_side: int, pool: RentalPool, rng: random.Random,
+                battle_size: int = BATTLE_SIZE) -> BattleState:
+    """
+    Copy of battle_state where the hidden side's unseen Pokemon and unknown moves are
+    sampled from the pool. Unseen species are drawn without replacement from the
+    species not seen yet, until the side has battle_size Pokemon in play.
+    """
+    sample = copy.deepcopy(battle_state)
+    team: TeamState = sample.opponent_team if hidden_side == 1 else sample.player_team
+    active = sample.opponent_active_mon if hidden_side == 1 else sample.player_active_mon
+    for slot, seen_slot in enumerate(seen_pokemon(team, active)):
+        if not seen_slot:
+            team.pk_list[slot] = PokemonState()
+    seen = {p.species for p in team.pk_list if p.species}
+    unseen = [name for name in pool.species if name not in seen]
+    rng.shuffle(unseen)
+    brought = sum(1 for p in team.pk_list if p.species)
+    for pokemon in team.pk_list:
+        if not pokemon.species:
+            if brought >= battle_size or not unseen:
+                continue
+            pokemon.species = unseen.pop()
+            pokemon.level = pool.levels[pokemon.species]
+            pokemon.hp = 100.0
+            pokemon.in_play = True
+            brought += 1
+        elif not pokemon.level:
+            pokemon.level = pool.levels.get(pokemon.species, 100)
+        _fill_moves(pokemon, pool, rng)
+    return sample
+
+
+def hidden_slots(battle_state: BattleState, hidden_side: int) -> Optional[int]:
+    """
+    Number of unseen Pokemon and unknown moves on the hidden side, 0 when fully revealed.
+    """
+    team = battle_state.opponent_team if hidden_side == 1 else battle_state.player_team
+    active = battle_state.opponent_active_mon if hidden_side == 1 else battle_state.player_active_mon
+    count = 0
+    for pokemon, seen_slot in zip(team.pk_list, seen_pokemon(team, active)):
+        if not seen_slot:
+            count += 1
+            continue
+        count += sum(1 for m in (pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4) if not _known_move(m))
+    return count
@@ -0,0 +1,134 @@
+"""
+Binary store for the roster matchup tables.
+
+The KO odds of every attacker/defender pair of a roster are kept in a directory
+of .npy files (memory-mappable, so several processes can share one copy) plus a
+small JSON index with the roster order and a hash of each Pokemon's roster entry
+and move data. The tables are built and updated by analysis.matchup_store
+(update_store); this module only reads and writes them.
+
+Layout of a store directory:
+    current     symlink to the version directory in use
+    v-*/        one directory per saved version, holding
+        index.json  {"version", "n_hits", "threshold", "names", "hashes"}
+        odds.npy    float64 [attacker, defender, n_hits], P(KO within n+1 hits)
+        nkos.npy    int8    [attacker, defender], hits needed for a likely KO (max n_hits+1)
+
+A save writes a new version directory and then swaps `current` to it with one
+rename, so readers get the files of one version, never a mix of two. A store
+written before versions existed (the files directly in the store directory)
+still loads.
+
+Usage:
+    store = MatchupStore.load("data/matchups")
+    store.nko("Gengar", "Chansey")
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from typing import Dict, List
+
+STORE_VERSION = 1
+LIKELY_THRESHOLD = 0.6
+CURRENT_LINK = "current"
+VERSION_PREFIX = "v-"
+INDEX_FILE = "index.json"
+ODDS_FILE = "odds.npy"
+NKOS_FILE = "nkos.npy"
+
+
+def nkos_from_odds(odds: np.ndarray, threshold: float = LIKELY_THRESHOLD) -> np.ndarray:
+    """
+    Number of hits needed for a likely (>= threshold) KO, n_hits + 1 if none is likely.
+    """
+    return (np.sum(odds < threshold, axis=-1) + 1).astype(np.int8)
+
+
+class MatchupStore:
+    def __init__(self, names: List[str], hashes: Dict[str, str], odds: np.ndarray,
+                 nkos: np.ndarray, threshold: float = LIKELY_THRESHOLD):
+        self.names = names
+        self.hashes = hashes
+        self.odds = odds
+        self.nkos = nkos
+        self.threshold = threshold
+        self.index = {name: i for i, name in enumerate(names)}
+
+    @property
+    def n_hits(self) -> int:
+        return self.odds.shape[-1]
+
+    def ko_odds(self, attacker: str, defender: str) -> np.ndarray:
+        return self.odds[self.index[attacker], self.index[defender]]
+
+    def nko(self, attacker: str, defender: str) -> int:
+        return int(self.nkos[self.index[attacker], self.index[defender]])
+
+    @staticmethod
+    def load(store_dir: str, mmap: bool = True) -> 'MatchupStore':
+        """
+        Loads a store. With mmap the arrays are read-only views of the files.
+        """
+        store_dir = version_dir(store_dir)
+        with open(os.path.join(store_dir, INDEX_FILE), encoding='utf-8') as file:
+            index = json.load(file)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported matchup store version {index.get('version')} in {store_dir}")
+        mmap_mode = 'r' if mmap else None
+        return MatchupStore(
+            names=index["names"],
+            hashes=index["hashes"],
+            odds=np.load(os.path.join(store_dir, ODDS_FILE), mmap_mode=mmap_mode),
+            nkos=np.load(os.path.join(store_dir, NKOS_FILE), mmap_mode=mmap_mode),
+            threshold=index["threshold"],
+        )
+
+    def save(self, store_dir: str) -> None:
+        """
+        Writes the store as a new version and makes it current. The version before
+        it is kept for readers that resolved `current` just before the swap; older
+        ones are removed.
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        new_dir = tempfile.mkdtemp(prefix=VERSION_PREFIX, dir=store_dir)
+        np.save(os.path.join(new_dir, ODDS_FILE), np.ascontiguousarray(self.odds))
+        np.save(os.path.join(new_dir, NKOS_FILE), np.ascontiguousarray(self.nkos))
+        index = {
+            "version": STORE_VERSION,
+            "n_hits": self.n_hits,
+            "threshold": self.threshold,
+            "names": self.names,
+            "hashes": self.hashes,
+        }
+        with open(os.path.join(new_dir, INDEX_FILE), 'w', encoding='utf-8') as file:
+            file.write(json.dumps(index, indent=1))
+        os.chmod(new_dir, 0o755)
+
+        link = os.path.join(store_dir, CURRENT_LINK)
+        previous = os.readlink(link) if os.path.islink(link) else None
+        tmp_link = os.path.join(store_dir, f".{CURRENT_LINK}.{os.getpid()}.tmp")
+        os.symlink(os.path.basename(new_dir), tmp_link)
+        os.replace(tmp_link, link)
+
+        keep = {os.path.basename(new_dir), previous}
+        for entry in os.listdir(store_dir):
+            if entry.startswith(VERSION_PREFIX) and entry not in keep:
+                shutil.rmtree(os.path.join(store_dir, entry), ignore_errors=True)
+        for name in (INDEX_FILE, ODDS_FILE, NKOS_FILE):
+            # Files of an unversioned store
+            if os.path.isfile(os.path.join(store_dir, name)):
+                os.remove(os.path.join(store_dir, name))
+
+
+def version_dir(store_dir: str) -> str:
+    """
+    Directory holding the files of the current version, resolved once so that all
+    of them are read from the same version.
+    """
+    link = os.path.join(store_dir, CURRENT_LINK)
+    return os.path.realpath(link) if os.path.islink(link) else store_dir
@@ -0,0 +1,813 @@
+"""
+Gen 1 Turn Simulator
+
+Advances a battle by one turn given both sides' actions, for search agents that
+need many simulated turns per decision. A BattleState is compiled once into a
+SimState (points of HP, precomputed stats, move table entries and the volatile
+counters BattleState has no room for); turns then mutate the SimState in place.
+Use SimState.copy() before exploring a branch and write_to() to get a
+BattleState back.
+
+Actions use the agents' encoding: "move 0".."move 3" and "switch 0".."switch 5"
+(slot indices of the team), or the equivalent ints from action_index().
+
+Covered mechanics:
+- Switches first, then moves by priority (Quick Attack +1, Counter -1) and
+  speed, ties broken randomly.
+- Damage as in src.battle.damage (stages, burn, screens, crits, STAB, types,
+  217-255 rolls), accuracy with the 1/256 miss, multi-hit, recoil, drain,
+  Selfdestruct / Explosion, Hyper Beam recharge, OHKO and fixed damage moves.
+- Sleep, freeze, paralysis (full paralysis and speed), burn, poison,
+  confusion (self hits), flinch, Substitute, Reflect / Light Screen, Haze,
+  stat stage moves and secondary effects.
+- Two-turn moves (Fly / Dig are invulnerable while charging) and trapping
+  moves (the target can't act, the user repeats the damage for 2-5 turns).
+- Fainting: a side whose active Pokemon fainted must switch; the next step()
+  only performs forced switches.
+
+Moves whose effect is not modelled (Metronome, Mirror Move, Transform, Mimic,
+Disable, Bide, Leech Seed, accuracy / evasion changes, ...) just use PP.
+
+Usage:
+    sim = TurnSimulator(seed=0)
+    state = SimState.from_battle_state(battle_state)
+    branch = state.copy()
+    sim.step(branch, "move 0", "switch 2")
+    branch.winner   # None while both sides have Pokemon left
+"""
+
+import random
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import src.state.gen1_dex as dex
+import src.state.gen1_moves as moves
+from src.battle import damage
+from src.state.pokestate import BattleState, PokemonState
+from src.state.pokestate_defs import Status
+
+N_MOVES = 4
+TEAM_SIZE = 6
+Action = Union[int, str]
+
+# Stat indices of SimPokemon.stages
+ATK, DEF, SPC, SPE = range(4)
+
+# Move kinds
+DAMAGE, LEVEL, CONSTANT, SUPER_FANG, PSYWAVE, OHKO, COUNTER = range(7)
+INFLICT, CONFUSE, BOOST, DROP, HEAL, REST, REFLECT, LIGHT_SCREEN, HAZE, SUBSTITUTE, NO_EFFECT = range(7, 18)
+# Kinds that don't target the opponent, so they can't miss
+SELF_KINDS = frozenset((BOOST, HEAL, REST, REFLECT, LIGHT_SCREEN, HAZE, SUBSTITUTE, NO_EFFECT))
+
+STATUS_MOVES = {
+    **{name: (INFLICT, Status.PARALYZED) for name in ("Thunder Wave", "Stun Spore", "Glare")},
+    **{name: (INFLICT, Status.SLEEP) for name in ("Sleep Powder", "Hypnosis", "Sing", "Spore", "Lovely Kiss")},
+    **{name: (INFLICT, Status.POISONED) for name in ("Poison Powder", "Poison Gas", "Toxic")},
+    "Confuse Ray": (CONFUSE, None),
+    "Supersonic": (CONFUSE, None),
+    "Swords Dance": (BOOST, (ATK, 2)),
+    "Meditate": (BOOST, (ATK, 1)),
+    "Sharpen": (BOOST, (ATK, 1)),
+    "Harden": (BOOST, (DEF, 1)),
+    "Withdraw": (BOOST, (DEF, 1)),
+    "Defense Curl": (BOOST, (DEF, 1)),
+    "Barrier": (BOOST, (DEF, 2)),
+    "Acid Armor": (BOOST, (DEF, 2)),
+    "Growth": (BOOST, (SPC, 1)),
+    "Amnesia": (BOOST, (SPC, 2)),
+    "Agility": (BOOST, (SPE, 2)),
+    "Tail Whip": (DROP, (DEF, 1)),
+    "Leer": (DROP, (DEF, 1)),
+    "Screech": (DROP, (DEF, 2)),
+    "Growl": (DROP, (ATK, 1)),
+    "String Shot": (DROP, (SPE, 1)),
+    "Recover": (HEAL, None),
+    "Softboiled": (HEAL, None),
+    "Rest": (REST, None),
+    "Reflect": (REFLECT, None),
+    "Light Screen": (LIGHT_SCREEN, None),
+    "Haze": (HAZE, None),
+    "Substitute": (SUBSTITUTE, None),
+}
+
+# (chance, effect, argument) of damaging moves' side effects
+SECONDARY = {
+    "Body Slam": (0.3, INFLICT, Status.PARALYZED),
+    "Lick": (0.3, INFLICT, Status.PARALYZED),
+    "Thunder Shock": (0.1, INFLICT, Status.PARALYZED),
+    "Thunderbolt": (0.1, INFLICT, Status.PARALYZED),
+    "Thunder": (0.1, INFLICT, Status.PARALYZED),
+    "Ember": (0.1, INFLICT, Status.BURNED),
+    "Flamethrower": (0.1, INFLICT, Status.BURNED),
+    "Fire Blast": (0.3, INFLICT, Status.BURNED),
+    "Ice Beam": (0.1, INFLICT, Status.FROZEN),
+    "Blizzard": (0.1, INFLICT, Status.FROZEN),
+    "Sludge": (0.3, INFLICT, Status.POISONED),
+    "Smog": (0.4, INFLICT, Status.POISONED),
+    "Psybeam": (0.1, CONFUSE, None),
+    "Confusion": (0.1, CONFUSE, None),
+    "Psychic": (0.33, DROP, (SPC, 1)),
+    "Acid": (0.33, DROP, (DEF, 1)),
+    "Aurora Beam": (0.33, DROP, (ATK, 1)),
+    "Bubble": (0.33, DROP, (SPE, 1)),
+    "Bubble Beam": (0.33, DROP, (SPE, 1)),
+    "Constrict": (0.33, DROP, (SPE, 1)),
+}
+FLINCH = {"Bite": 0.1, "Hyper Fang": 0.1, "Bone Club": 0.1, "Headbutt": 0.3, "Stomp": 0.3,
+          "Rock Slide": 0.3, "Low Kick": 0.3}
+RECOIL = {"Take Down": 4, "Double-Edge": 4, "Submission": 4}
+DRAIN_MOVES = {"Absorb", "Mega Drain", "Leech Life", "Dream Eater"}
+CRASH_MOVES = {"Jump Kick", "High Jump Kick"}
+INVULNERABLE_MOVES = {"Fly", "Dig"}
+PRIORITY = {"Quick Attack": 1, "Counter": -1}
+NEVER_MISS = {"Swift"}
+# (turns, probability) of trapping moves and sleep
+TRAP_TURNS = ((2, 3 / 8), (3, 3 / 8), (4, 1 / 8), (5, 1 / 8))
+CONFUSION_TURNS = (2, 5)
+SLEEP_TURNS = (1, 7)
+REST_TURNS = 2
+
+TWO_TURN_NAMES = {move.name for move in moves.TWO_TURN_MOVES}
+TRAPPING_NAMES = {move.name for move in moves.TRAPPING_MOVES}
+
+
+class SimMove:
+    """
+    Everything the simulator needs about a move, resolved once.
+    """
+    __slots__ = ("name", "type", "power", "accuracy", "special", "high_crit", "selfdestruct", "hits", "kind",
+                 "arg", "priority", "secondary", "flinch", "recoil", "drain", "crash", "recharge", "two_turn",
+                 "invulnerable", "trapping", "pp")
+
+    def __init__(self, move: moves.Move, info: damage.MoveInfo):
+        self.name = move.name
+        self.type = move.type
+        self.power = info.power
+        # Gen 1 hits when a random byte is below accuracy * 255, so even 100% moves miss 1/256 of the time
+        self.accuracy = 2.0 if move.name in NEVER_MISS else (move.accuracy * 255 // 100) / 256.0
+        self.special = info.special
+        self.high_crit = info.high_crit
+        self.selfdestruct = info.selfdestruct
+        self.hits = info.hits
+        if move.name in damage.LEVEL_DAMAGE_MOVES:
+            self.kind, self.arg = LEVEL, None
+        elif move.name in damage.CONSTANT_DAMAGE_MOVES:
+            self.kind, self.arg = CONSTANT, damage.CONSTANT_DAMAGE_MOVES[move.name]
+        elif move.name == "Super Fang":
+            self.kind, self.arg = SUPER_FANG, None
+        elif move.name == "Psywave":
+            self.kind, self.arg = PSYWAVE, None
+        elif move.name in damage.OHKO_MOVE_NAMES:
+            self.kind, self.arg = OHKO, None
+        elif move.name == "Counter":
+            self.kind, self.arg = COUNTER, None
+        elif info.power > 0:
+            self.kind, self.arg = DAMAGE, None
+        else:
+            self.kind, self.arg = STATUS_MOVES.get(move.name, (NO_EFFECT, None))
+        self.priority = PRIORITY.get(move.name, 0)
+        self.secondary = SECONDARY.get(move.name)
+        self.flinch = FLINCH.get(move.name, 0.0)
+        self.recoil = RECOIL.get(move.name, 0)
+        self.drain = move.name in DRAIN_MOVES
+        self.crash = move.name in CRASH_MOVES
+        self.recharge = move.name == "Hyper Beam"
+        self.two_turn = move.name in TWO_TURN_NAMES
+        self.invulnerable = move.name in INVULNERABLE_MOVES
+        self.trapping = move.name in TRAPPING_NAMES
+        self.pp = move.pp
+
+    def __repr__(self) -> str:
+        return f"SimMove({self.name})"
+
+
+def _build_sim_moves() -> Dict[str, SimMove]:
+    return {
+        moves.normalize_move_name(move.name): SimMove(move, damage.get_move_info(move.name))
+        for move in moves.GEN1_MOVES
+    }
+
+
+SIM_MOVES = _build_sim_moves()
+STRUGGLE = SimMove(moves.Move("Struggle", "Normal", 50, 100, 0, "Used when no moves are left."),
+                   damage.MoveInfo("Struggle", "Normal", 50, 1.0, False, False, False, ((1, 1.0),)))
+STRUGGLE.recoil = 2
+# Typeless 40 power physical hit of a confused Pokemon hurting itself
+CONFUSION_HIT = 40
+
+# Type multipliers in tenths, by (move type, defending type)
+TYPE_MULTIPLIER = {
+    (attacking, defending): int(dex.get_type_effectiveness(attacking, defending) * 10)
+    for attacking in dex.TYPES for defending in dex.TYPES
+}
+
+
+class SimPokemon:
+    """
+    Mutable battle view of one Pokemon. Volatile fields are reset on switch out.
+    """
+    __slots__ = ("slot", "species", "level", "types", "stats", "max_hp", "hp", "status", "sleep_turns",
+                 "moves", "pp", "crit_base", "stages", "confusion", "charging", "recharging", "trap_turns",
+                 "trap_move", "trap_damage", "trapped", "substitute", "reflect", "light_screen", "flinched", "damage_taken",
+                 "damage_type")
+
+    def __init__(self, slot: int, species: str, level: int, types: Tuple[str, ...], hp: int,
+                 status: Status, sleep_turns: int, move_list: Sequence[Optional[SimMove]], pp: Sequence[int]):
+        self.slot = slot
+        self.species = species
+        self.level = level
+        self.types = types
+        self.stats = damage.species_stats(species, level)
+        self.max_hp = self.stats[0]
+        self.hp = hp
+        self.status = status
+        self.sleep_turns = sleep_turns
+        self.moves = tuple(move_list)
+        self.pp = list(pp)
+        self.crit_base = damage.base_speed(species) // 2
+        self.reset_volatile()
+
+    def reset_volatile(self) -> None:
+        self.stages = [0, 0, 0, 0]
+        self.confusion = 0 # Turns of confusion left
+        self.charging = -1 # Move slot being charged, -1 if none
+        self.recharging = False
+        self.trap_turns = 0 # Turns left of this Pokemon's trapping move
+        self.trap_move = None
+        self.trap_damage = 0
+        self.trapped = False
+        self.substitute = 0 # HP of the substitute, 0 if none
+        self.reflect = False
+        self.light_screen = False
+        self.flinched = False
+        self.damage_taken = 0 # Damage taken this turn, for Counter
+        self.damage_type = None
+
+    def copy(self) -> 'SimPokemon':
+        other = SimPokemon.__new__(SimPokemon)
+        other.slot = self.slot
+        other.species = self.species
+        other.level = self.level
+        other.types = self.types
+        other.stats = self.stats
+        other.max_hp = self.max_hp
+        other.hp = self.hp
+        other.status = self.status
+        other.sleep_turns = self.sleep_turns
+        other.moves = self.moves
+        other.pp = self.pp[:]
+        other.crit_base = self.crit_base
+        other.stages = self.stages[:]
+        other.confusion = self.confusion
+        other.charging = self.charging
+        other.recharging = self.recharging
+        other.trap_turns = self.trap_turns
+        other.trap_move = self.trap_move
+        other.trap_damage = self.trap_damage
+        other.trapped = self.trapped
+        other.substitute = self.substitute
+        other.reflect = self.reflect
+        other.light_screen = self.light_screen
+        other.flinched = self.flinched
+        other.damage_taken = self.damage_taken
+        other.damage_type = self.damage_type
+        return other
+
+    @property
+    def fainted(self) -> bool:
+        return self.hp <= 0
+
+    def speed(self) -> int:
+        speed = damage.apply_stage(self.stats[4], self.stages[SPE])
+        if self.status is Status.PARALYZED:
+            speed = max(1, speed // 4)
+        return speed
+
+    @staticmethod
+    def from_pokemon_state(slot: int, pokemon: PokemonState) -> Optional['SimPokemon']:
+        """
+        None for slots without a known species.
+        """
+        if not pokemon.species or damage.SPECIES_INDEX.get(pokemon.species.lower()) is None:
+            return None
+        level = pokemon.level or 100
+        move_list, pp = [], []
+        for move_state in (pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4):
+            move = SIM_MOVES.get(moves.normalize_move_name(move_state.name)) \
+                if move_state is not None and move_state.name else None
+            move_list.append(move)
+            pp.append(0 if move is None or move_state.disabled else move_state.pp)
+        types = tuple(t for t in (pokemon.type1, pokemon.type2) if t) if pokemon.type1 \
+            else tuple(t for t in damage.species_types(pokemon.species) if t)
+        max_hp = damage.species_stats(pokemon.species, level)[0]
+        hp = 0 if pokemon.status == Status.FAINTED else int(round(pokemon.hp * max_hp / 100.0))
+        if pokemon.hp > 0 and pokemon.status != Status.FAINTED:
+            hp = max(1, hp)
+        sim = SimPokemon(slot, pokemon.species, level, types, hp, pokemon.status, pokemon.sleep_turns, move_list, pp)
+        sim.stages = [pokemon.atk_boost, pokemon.def_boost, pokemon.special_boost, pokemon.speed_boost]
+        sim.confusion = 2 if pokemon.confused else 0
+        sim.substitute = max(1, sim.max_hp // 4 + 1) if pokemon.substitute else 0
+        sim.reflect = pokemon.reflect
+        sim.light_screen = pokemon.light_screen
+        sim.trapped = pokemon.trapped
+        return sim
+
+    def write_to(self, pokemon: PokemonState) -> None:
+        pokemon.hp = 100.0 * max(0, self.hp) / self.max_hp
+        pokemon.status = Status.FAINTED if self.hp <= 0 else self.status
+        pokemon.sleep_turns = self.sleep_turns
+        pokemon.atk_boost, pokemon.def_boost, pokemon.special_boost, pokemon.speed_boost = self.stages
+        pokemon.confused = self.confusion > 0
+        pokemon.substitute = self.substitute > 0
+        pokemon.reflect = self.reflect
+        pokemon.light_screen = self.light_screen
+        pokemon.trapped = self.trapped
+        pokemon.two_turn_move = self.charging >= 0
+        for move_state, pp in zip((pokemon.move1, pokemon.move2, pokemon.move3, pokemon.move4), self.pp):
+            if move_state is not None and move_state.name:
+                move_state.pp = pp
+
+
+class SimState:
+    """
+    Both teams (lists of TEAM_SIZE slots, None where unknown) and the active slots.
+    winner is None while the battle goes on, then 0, 1, or -1 for a draw.
+    """
+    __slots__ = ("teams", "active", "must_switch", "winner", "turn")
+
+    def __init__(self, teams: List[List[Optional[SimPokemon]]], active: List[int]):
+        self.teams = teams
+        self.active = active
+        self.must_switch = [False, False]
+        self.winner = None
+        self.turn = 0
+        for side in (0, 1):
+            if self.active_mon(side) is None or self.active_mon(side).fainted:
+                self.must_switch[side] = True
+        self._check_winner()
+
+    def active_mon(self, side: int) -> Optional[SimPokemon]:
+        return self.teams[side][self.active[side]]
+
+    def copy(self) -> 'SimState':
+        other = SimState.__new__(SimState)
+        other.teams = [[None if p is None else p.copy() for p in team] for team in self.teams]
+        other.active = self.active[:]
+        other.must_switch = self.must_switch[:]
+        other.winner = self.winner
+        other.turn = self.turn
+        return other
+
+    def _check_winner(self) -> None:
+        alive = [any(p is not None and not p.fainted for p in team) for team in self.teams]
+        if not alive[0] and not alive[1]:
+            self.winner = -1
+        elif not alive[0]:
+            self.winner = 1
+        elif not alive[1]:
+            self.winner = 0
+
+    @staticmethod
+    def from_battle_state(battle_state: BattleState) -> 'SimState':
+        teams = [
+            [SimPokemon.from_pokemon_state(i, p) for i, p in enumerate(team.pk_list)]
+            for team in (battle_state.player_team, battle_state.opponent_team)
+        ]
+        return SimState(teams, [battle_state.player_active_mon, battle_state.opponent_active_mon])
+
+    def write_to(self, battle_state: BattleState) -> None:
+        """
+        Copies the simulated state back into a BattleState. Counters BattleState has no
+        field for (confusion and trap turns, substitute HP) are reduced to flags.
+        """
+        for side, team in enumerate((battle_state.player_team, battle_state.opponent_team)):
+            for sim, pokemon in zip(self.teams[side], team.pk_list):
+                if sim is not None:
+                    sim.write_to(pokemon)
+                pokemon.active = sim is not None and sim.slot == self.active[side]
+        battle_state.player_active_mon, battle_state.opponent_active_mon = self.active
+
+
+_ACTIONS = {**{f"move {i}": i for i in range(N_MOVES)}, **{f"switch {i}": N_MOVES + i for i in range(TEAM_SIZE)}}
+_ACTION_NAMES = {index: name for name, index in _ACTIONS.items()}
+
+
+def action_index(action: Action) -> int:
+    """
+    0-3 for "move 0".."move 3", 4 + slot for "switch <slot>".
+    """
+    return action if isinstance(action, int) else _ACTIONS[action]
+
+
+def action_name(index: int) -> str:
+    return _ACTION_NAMES[index]
+
+
+def trap_slot(mon: SimPokemon) -> int:
+    """
+    Move slot of the trapping move mon keeps using.
+    """
+    for slot, move in enumerate(mon.moves):
+        if move is mon.trap_move:
+            return slot
+    return 0
+
+
+def legal_actions(state: SimState, side: int) -> List[int]:
+    """
+    Action indices the side can choose. Struggle is "move 0" when no move has PP left.
+    """
+    team = state.teams[side]
+    active = state.active[side]
+    switches = [N_MOVES + p.slot for p in team if p is not None and p.slot != active and not p.fainted]
+    if state.must_switch[side]:
+        return switches
+    mon = team[active]
+    if mon.trap_turns > 0:
+        return [trap_slot(mon)]
+    if mon.charging >= 0 or mon.recharging:
+        return [mon.charging if mon.charging >= 0 else 0]
+    usable = [i for i in range(N_MOVES) if mon.moves[i] is not None and mon.pp[i] > 0]
+    return (usable or [0]) + switches
+
+
+class TurnSimulator:
+    """
+    Seedable Gen 1 turn engine. All randomness comes from self.rng, so the same seed
+    and actions always give the same battle.
+    """
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def seed(self, seed: Optional[int]) -> None:
+        self.rng.seed(seed)
+
+    def step(self, state: SimState, p1_action: Action, p2_action: Action) -> Optional[int]:
+        """
+        Plays one turn in place. Returns state.winner.
+        """
+        if state.winner is not None:
+            return state.winner
+        actions = (action_index(p1_action), action_index(p2_action))
+
+        if state.must_switch[0] or state.must_switch[1]:
+            # Replacing fainted Pokemon takes the whole step
+            for side in (0, 1):
+                if state.must_switch[side]:
+                    self._switch(state, side, actions[side] - N_MOVES)
+                    state.must_switch[side] = False
+            return state.winner
+
+        state.turn += 1
+        for side in (0, 1):
+            mon = state.active_mon(side)
+            mon.flinched = False
+            mon.damage_taken = 0
+
+        # A trap released by the target switching out leaves the trapper's turn spent
+        trapping = [state.active_mon(side).trap_turns > 0 for side in (0, 1)]
+
+        # Switches happen before moves
+        movers = []
+        for side in (0, 1):
+            mon = state.active_mon(side)
+            action = actions[side]
+            if action >= N_MOVES and mon.charging < 0 and not mon.recharging and mon.trap_turns == 0:
+                self._switch(state, side, action - N_MOVES)
+            else:
+                movers.append(side)
+
+        if len(movers) == 2:
+            first = self._first_mover(state, actions)
+            movers = [first, 1 - first]
+
+        for side in movers:
+            mon = state.active_mon(side)
+            target = state.active_mon(1 - side)
+            if mon.fainted or target.fainted:
+                continue
+            if trapping[side] and mon.trap_turns == 0:
+                continue
+            self._act(mon, target, actions[side])
+            if not mon.fainted:
+                self._residual(mon)
+            if mon.fainted or target.fainted:
+                break
+
+        for side in (0, 1):
+            if state.active_mon(side).fainted:
+                self._faint(state, side)
+        state._check_winner()
+        if state.winner is not None:
+            state.must_switch = [False, False]
+        return state.winner
+
+    def _first_mover(self, state: SimState, actions: Tuple[int, int]) -> int:
+        keys = []
+        for side in (0, 1):
+            mon = state.active_mon(side)
+            slot = mon.charging if mon.charging >= 0 else actions[side]
+            move = mon.moves[slot] if slot < N_MOVES else None
+            keys.append((move.priority if move is not None else 0, mon.speed()))
+        if keys[0] == keys[1]:
+            return self.rng.randrange(2)
+        return 0 if keys[0] > keys[1] else 1
+
+    def _switch(self, state: SimState, side: int, slot: int) -> None:
+        team = state.teams[side]
+        if not 0 <= slot < len(team) or team[slot] is None or team[slot].fainted or slot == state.active[side]:
+            raise ValueError(f"Illegal switch to slot {slot} for side {side}")
+        outgoing = state.active_mon(side)
+        if outgoing is not None:
+            outgoing.reset_volatile()
+        # A trapping move ends when either Pokemon leaves
+        opponent = state.active_mon(1 - side)
+        if opponent is not None:
+            opponent.trap_turns = 0
+            opponent.trapped = False
+        state.active[side] = slot
+
+    def _faint(self, state: SimState, side: int) -> None:
+        mon = state.active_mon(side)
+        mon.hp = 0
+        mon.status = Status.FAINTED
+        mon.reset_volatile()
+        opponent = state.active_mon(1 - side)
+        opponent.trap_turns = 0
+        opponent.trapped = False
+        state.must_switch[side] = True
+
+    # --- Moves ---
+
+    def _act(self, mon: SimPokemon, target: SimPokemon, action: int) -> None:
+        rng = self.rng
+        if mon.recharging:
+            mon.recharging = False
+            return
+        if mon.status is Status.SLEEP:
+            mon.sleep_turns -= 1
+            if mon.sleep_turns <= 0:
+                mon.sleep_turns = 0
+                mon.status = Status.NONE
+            return
+        if mon.status is Status.FROZEN:
+            return
+        if mon.trapped:
+            return
+        if mon.flinched:
+            return
+
+        if mon.trap_turns > 0:
+            # Trapping moves repeat without further checks
+            mon.trap_turns -= 1
+            self._deal(mon, target, mon.trap_move, mon.trap_damage)
+            if mon.trap_turns == 0:
+                target.trapped = False
+            return
+
+        if mon.confusion > 0:
+            mon.confusion -= 1
+            if mon.confusion > 0 and rng.random() < 0.5:
+                mon.charging = -1
+                self._hurt_self(mon)
+                return
+        if mon.status is Status.PARALYZED and rng.random() < 0.25:
+            mon.charging = -1
+            return
+
+        if mon.charging >= 0:
+            slot = mon.charging
+            move = mon.moves[slot]
+            mon.charging = -1
+        else:
+            slot = action
+            move = mon.moves[slot] if slot < N_MOVES else None
+            if move is None or mon.pp[slot] <= 0:
+                if any(m is not None and p > 0 for m, p in zip(mon.moves, mon.pp)):
+                    raise ValueError(f"Illegal move {slot} for {mon.species}")
+                move = STRUGGLE
+            else:
+                mon.pp[slot] -= 1
+            if move.two_turn:
+                mon.charging = slot
+                return
+        self._use_move(mon, target, move)
+
+    def _use_move(self, mon: SimPokemon, target: SimPokemon, move: SimMove) -> None:
+        rng = self.rng
+        kind = move.kind
+        if move.selfdestruct:
+            mon.hp = 0
+
+        if kind in SELF_KINDS:
+            self._self_effect(mon, target, move)
+            return
+
+        # Moves aimed at the target
+        target_charging = target.charging >= 0 and target.moves[target.charging].invulnerable
+        if target_charging or rng.random() >= move.accuracy:
+            if move.crash:
+                mon.hp -= 1
+            return
+
+        if kind >= INFLICT:
+            if target.substitute:
+                return
+            if kind == INFLICT:
+                if move.type == "Electric" and any(TYPE_MULTIPLIER[move.type, t] == 0 for t in target.types):
+                    return
+                self._inflict(target, move.arg, "Poison" if move.arg is Status.POISONED else None)
+            elif kind == CONFUSE:
+                if target.confusion == 0:
+                    target.confusion = rng.randint(*CONFUSION_TURNS) + 1
+            elif kind == DROP:
+                stat, amount = move.arg
+                target.stages[stat] = max(-6, target.stages[stat] - amount)
+            return
+
+        if move.name == "Dream Eater" and target.status is not Status.SLEEP:
+            return
+        dealt = self._hit_damage(mon, target, move)
+        if dealt <= 0:
+            return
+        hits = 1
+        if move.hits[0][0] > 1:
+            hits = self._pick(move.hits)
+        self._deal(mon, target, move, dealt, hits)
+
+        if move.trapping and not target.fainted:
+            mon.trap_turns = self._pick(TRAP_TURNS) - 1
+            mon.trap_move = move
+            mon.trap_damage = dealt
+            target.trapped = mon.trap_turns > 0
+        if move.recharge and not target.fainted:
+            mon.recharging = True
+
+    def _deal(self, mon: SimPokemon, target: SimPokemon, move: SimMove, dealt: int, hits: int = 1) -> None:
+        """
+        Applies `hits` hits of `dealt` damage, then recoil, drain and side effects.
+        """
+        rng = self.rng
+        total = 0
+        hit_substitute = False
+        for _ in range(hits):
+            if target.substitute:
+                hit_substitute = True
+                if dealt >= target.substitute:
+                    total += target.substitute
+                    target.substitute = 0
+                    break
+                target.substitute -= dealt
+                total += dealt
+            else:
+                done = min(dealt, target.hp)
+                target.hp -= done
+                total += done
+                if target.hp <= 0:
+                    break
+        if not hit_substitute:
+            target.damage_taken = total
+            target.damage_type = move.type
+        if move.recoil:
+            mon.hp -= max(1, total // move.recoil)
+        if move.drain:
+            mon.hp = min(mon.max_hp, mon.hp + max(1, total // 2))
+        if hit_substitute or target.fainted:
+            return
+        if move.secondary is not None:
+            chance, effect, arg = move.secondary
+            if rng.random() < chance:
+                if effect == INFLICT:
+                    self._inflict(target, arg, move.type)
+                elif effect == CONFUSE:
+                    if target.confusion == 0:
+                        target.confusion = rng.randint(*CONFUSION_TURNS) + 1
+                else:
+                    stat, amount = arg
+                    target.stages[stat] = max(-6, target.stages[stat] - amount)
+        if move.flinch and rng.random() < move.flinch:
+            target.flinched = True
+        if move.type == "Fire" and target.status is Status.FROZEN:
+            target.status = Status.NONE
+
+    def _inflict(self, target: SimPokemon, status: Status, immune_type: Optional[str]) -> None:
+        if target.status is not Status.NONE:
+            return
+        # Side effects don't affect Pokemon of the move's own type (Body Slam on Normal, Ember on Fire, ...)
+        # and Poison types can't be poisoned
+        if immune_type in target.types:
+            return
+        target.status = status
+        if status is Status.SLEEP:
+            target.sleep_turns = self.rng.randint(*SLEEP_TURNS)
+
+    def _self_effect(self, mon: SimPokemon, target: SimPokemon, move: SimMove) -> None:
+        kind = move.kind
+        if kind == BOOST:
+            stat, amount = move.arg
+            mon.stages[stat] = min(6, mon.stages[stat] + amount)
+        elif kind == HEAL:
+            if mon.hp < mon.max_hp:
+                mon.hp = min(mon.max_hp, mon.hp + mon.max_hp // 2)
+        elif kind == REST:
+            if mon.hp < mon.max_hp:
+                mon.hp = mon.max_hp
+                mon.status = Status.SLEEP
+                mon.sleep_turns = REST_TURNS
+        elif kind == REFLECT:
+            mon.reflect = True
+        elif kind == LIGHT_SCREEN:
+            mon.light_screen = True
+        elif kind == HAZE:
+            for pokemon in (mon, target):
+                pokemon.stages = [0, 0, 0, 0]
+                pokemon.confusion = 0
+                pokemon.reflect = False
+                pokemon.light_screen = False
+        elif kind == SUBSTITUTE:
+            cost = mon.max_hp // 4
+            if not mon.substitute and mon.hp > cost:
+                mon.hp -= cost
+                mon.substitute = cost + 1
+
+    def _pick(self, choices: Tuple[Tuple[int, float], ...]) -> int:
+        r = self.rng.random()
+        for value, p in choices:
+            r -= p
+            if r < 0:
+                return value
+        return choices[-1][0]
+
+    # --- Damage ---
+
+    def _hit_damage(self, mon: SimPokemon, target: SimPokemon, move: SimMove) -> int:
+        """
+        Damage of one hit, 0 if the move has no effect.
+        """
+        kind = move.kind
+        if kind != DAMAGE:
+            if kind == LEVEL:
+                return mon.level
+            if kind == CONSTANT:
+                return move.arg
+            if kind == SUPER_FANG:
+                return max(1, target.hp // 2)
+            if kind == PSYWAVE:
+                return self.rng.randrange(1, max(2, mon.level * 3 // 2))
+            if kind == OHKO:
+                return target.hp if mon.speed() >= target.speed() else 0
+            if kind == COUNTER:
+                if mon.damage_taken and mon.damage_type in ("Normal", "Fighting"):
+                    return 2 * mon.damage_taken
+                return 0
+
+        multiplier = 10
+        for defending_type in target.types:
+            multiplier = multiplier * TYPE_MULTIPLIER[move.type, defending_type] // 10
+        if multiplier == 0:
+            return 0
+
+        threshold = mon.crit_base * 8 if move.high_crit else mon.crit_base
+        crit = self.rng.random() < min(threshold, 255) / 256.0
+        if move.special:
+            A, D = mon.stats[3], target.stats[3]
+            if not crit:
+                A = damage.apply_stage(A, mon.stages[SPC])
+                D = damage.apply_stage(D, target.stages[SPC])
+                if target.light_screen:
+                    D *= 2
+        else:
+            A, D = mon.stats[1], target.stats[2]
+            if not crit:
+                A = damage.apply_stage(A, mon.stages[ATK])
+                D = damage.apply_stage(D, target.stages[DEF])
+                if mon.status is Status.BURNED:
+                    A = max(1, A // 2)
+                if target.reflect:
+                    D *= 2
+        if move.selfdestruct:
+            D = max(1, D // 2)
+        if A > 255 or D > 255:
+            A = max(1, A // 4)
+            D = max(1, D // 4)
+        level = mon.level * 2 if crit else mon.level
+        dealt = min((((2 * level) // 5 + 2) * move.power * A // D) // 50, 997) + 2
+        if move.type in mon.types:
+            dealt += dealt // 2
+        for defending_type in target.types:
+            dealt = dealt * TYPE_MULTIPLIER[move.type, defending_type] // 10
+        if dealt > 1:
+            dealt = dealt * self.rng.randint(damage.LOW_ROLL, damage.HIGH_ROLL) // 255
+        return dealt
+
+    def _hurt_self(self, mon: SimPokemon) -> None:
+        A = damage.apply_stage(mon.stats[1], mon.stages[ATK])
+        D = damage.apply_stage(mon.stats[2], mon.stages[DEF])
+        if A > 255 or D > 255:
+            A = max(1, A // 4)
+            D = max(1, D // 4)
+        mon.hp -= (((2 * mon.level) // 5 + 2) * CONFUSION_HIT * A // D) // 50 + 2
+
+    def _residual(self, mon: SimPokemon) -> None:
+        if mon.status is Status.BURNED or mon.status is Status.POISONED:
+            mon.hp -= max(1, mon.max_hp // 16)
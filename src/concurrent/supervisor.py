@@ -0,0 +1,196 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.utils.shared_image_list import SharedImageList, unlink_segment
+
+'''
+    Supervisor of the pipeline nodes.
+
+    Each node runs as its own Python process, optionally pinned to a set of CPUs
+    (os.sched_setaffinity, before exec) with its thread pools (OpenMP, MKL, torch) sized to
+    match, so capture and detection do not compete with the OCR workers.
+
+    The shared memory frame ring is created by the supervisor before any node
+    starts, and nodes with `shm` set get its config as `--shm-config <json>` to
+    attach to it. A node that exits with an error is restarted after `backoff`
+    seconds, doubling up to `max_backoff`, at most `max_restarts` times. stop()
+    interrupts the nodes in reverse start order (SIGINT, then SIGTERM and SIGKILL
+    after `grace` seconds) and unlinks the ring, also removing a ring leaked by an
+    earlier run at start.
+
+    Usage:
+        supervisor = Supervisor([NodeSpec("capture", ["main.py", "--camera"], cpus=[0, 1], shm=True)],
+                                shm_config={"name": "video_frames", ...})
+        supervisor.run()    # until every node is done or SIGINT / SIGTERM
+'''
+
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+@dataclass
+class NodeSpec:
+    name: str
+    args: List[str] # Arguments of the Python interpreter, e.g. ["-m", "src.controller.controller_node"]
+    cpus: Optional[List[int]] = None
+    env: Dict[str, str] = field(default_factory=dict)
+    shm: bool = False # Pass --shm-config to attach to the frame ring
+    restart: bool = True # Restart when the node exits with an error
+    start_delay: float = 0.0 # Seconds to wait after starting, e.g. for its queues to be declared
+
+
+class Node:
+    def __init__(self, spec: NodeSpec):
+        self.spec = spec
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self.next_start: Optional[float] = None
+        self.finished = False
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+def affinity_setter(cpus: Optional[List[int]]) -> Optional[Callable[[], None]]:
+    '''
+    Function pinning the calling process to `cpus`, run in the child between fork
+    and exec so the node is pinned from its first instruction. None where CPU
+    affinity is not supported.
+    '''
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return None
+    cpus = list(cpus)
+    return lambda: os.sched_setaffinity(0, cpus)
+
+
+class Supervisor:
+    def __init__(self, specs: List[NodeSpec], shm_config: Optional[Dict[str, str]] = None, max_restarts: int = 5,
+                 backoff: float = 1.0, max_backoff: float = 30.0, grace: float = 5.0, cwd: Optional[str] = None):
+        self.nodes = [Node(spec) for spec in specs]
+        self.shm_config = {key: str(value) for key, value in shm_config.items()} if shm_config else None
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.grace = grace
+        self.cwd = cwd
+        self.shm: Optional[SharedImageList] = None
+        self._stopping = False
+
+    def _command(self, spec: NodeSpec) -> List[str]:
+        command = [sys.executable] + spec.args
+        if spec.shm:
+            if self.shm_config is None:
+                raise ValueError(f"Node {spec.name} attaches to the frame ring, but no shm config was given.")
+            command += ["--shm-config", json.dumps(self.shm_config)]
+        return command
+
+    def _environment(self, spec: NodeSpec) -> Dict[str, str]:
+        env = dict(os.environ)
+        if spec.cpus:
+            for key in THREAD_ENV:
+                env[key] = str(len(spec.cpus))
+        env.update(spec.env)
+        return env
+
+    def _spawn(self, node: Node) -> None:
+        spec = node.spec
+        pin = affinity_setter(spec.cpus)
+        if spec.cpus and pin is None:
+            print(f"[supervisor] CPU affinity is not supported here, {spec.name} is not pinned.")
+        # New process group, so a Ctrl+C in the terminal reaches the supervisor only
+        node.process = subprocess.Popen(self._command(spec), cwd=self.cwd, env=self._environment(spec),
+                                        start_new_session=True, preexec_fn=pin)
+        node.next_start = None
+        print(f"[supervisor] Started {spec.name} (pid {node.process.pid}, cpus {spec.cpus or 'any'}).")
+
+    def start(self) -> None:
+        '''
+        Creates the frame ring, then starts the nodes in order.
+        '''
+        if self.shm_config is not None:
+            if unlink_segment(self.shm_config["name"]):
+                print(f"[supervisor] Removed stale shared memory segment {self.shm_config['name']}.")
+            self.shm = SharedImageList(self.shm_config, create=True)
+        for node in self.nodes:
+            self._spawn(node)
+            if node.spec.start_delay:
+                time.sleep(node.spec.start_delay)
+
+    def poll(self) -> bool:
+        '''
+        Restarts crashed nodes whose backoff has passed. Returns False once no node
+        is running or waiting to be restarted.
+        '''
+        now = time.monotonic()
+        for node in self.nodes:
+            if node.finished:
+                continue
+            if node.next_start is not None:
+                if now >= node.next_start:
+                    node.restarts += 1
+                    self._spawn(node)
+                continue
+            code = node.process.poll()
+            if code is None:
+                continue
+            if code == 0 or not node.spec.restart or node.restarts >= self.max_restarts:
+                node.finished = True
+                print(f"[supervisor] {node.spec.name} exited with code {code}.")
+                continue
+            delay = min(self.backoff * 2 ** node.restarts, self.max_backoff)
+            node.next_start = now + delay
+            print(f"[supervisor] {node.spec.name} exited with code {code}, restarting in {delay:.1f}s.")
+        return any(not node.finished for node in self.nodes)
+
+    def stop(self) -> None:
+        '''
+        Stops the nodes in reverse start order and removes the frame ring.
+        '''
+        self._stopping = True
+        running = [node for node in reversed(self.nodes) if node.running]
+        for node in running:
+            node.process.send_signal(signal.SIGINT)
+        deadline = time.monotonic() + self.grace
+        for node in running:
+            try:
+                node.process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                node.process.terminate()
+                try:
+                    node.process.wait(self.grace)
+                except subprocess.TimeoutExpired:
+                    node.process.kill()
+                    node.process.wait()
+            print(f"[supervisor] Stopped {node.spec.name}.")
+        for node in self.nodes:
+            node.finished = True
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def run(self, interval: float = 0.2) -> None:
+        '''
+        Starts the nodes and supervises them until they are all done, or until the
+        supervisor gets SIGINT or SIGTERM.
+        '''
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: self._request_stop())
+        try:
+            self.start()
+            while not self._stopping and self.poll():
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            signal.signal(signal.SIGTERM, previous)
+
+    def _request_stop(self) -> None:
+        self._stopping = True
+
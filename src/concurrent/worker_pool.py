@@ -0,0 +1,220 @@
+import asyncio
+import time
+
+from asyncio import Queue
+from collections import deque
+from concurrent.futures import Executor
+from enum import Enum
+from typing import TypeVar, Generic, Callable, Awaitable, Optional, Union, Dict, List, Tuple, Any
+
+import numpy as np
+'''
+    Pool of N long-lived asyncio consumers reading from one bounded queue.
+    Workers run until the pool is closed; there is no fixed sleep between items.
+    Blocking work can be offloaded to a thread or process executor.
+'''
+Input = TypeVar('Input')
+TaskFn = Union[Callable[[Input], Awaitable[None]], Callable[[Input], None]]
+
+# Marks the end of the stream for one worker.
+_STOP = object()
+
+
+class _Entry:
+    '''
+    Item put through the pool, stamped with its enqueue time. Items put straight
+    into a queue passed in by the caller are raw and have no stamp.
+    '''
+    __slots__ = ("enqueued", "item")
+
+    def __init__(self, item: Any):
+        self.enqueued = time.monotonic()
+        self.item = item
+
+
+class OverflowPolicy(Enum):
+    BLOCK = 0        # put() waits for a free slot (backpressure)
+    DROP_NEWEST = 1  # the incoming item is discarded
+    DROP_OLDEST = 2  # the oldest queued item is discarded to make room
+
+
+class LatencyStats:
+    '''
+    Running latency statistics for the items processed by a pool.
+    Keeps totals for the whole lifetime and a rolling window for percentiles.
+    '''
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+        self._recent_wait: deque = deque(maxlen=window)
+        self._recent_run: deque = deque(maxlen=window)
+
+    def record(self, wait: float, run: float) -> None:
+        self.count += 1
+        self.total_wait += wait
+        self.total_run += run
+        self.max_run = max(self.max_run, run)
+        self._recent_wait.append(wait)
+        self._recent_run.append(run)
+
+    def percentiles(self, qs: Tuple[float, ...] = (50, 95, 99)) -> Dict[str, Dict[str, float]]:
+        '''
+        Returns the given percentiles (in seconds) of queue wait and run time over the rolling window.
+        '''
+        result = {}
+        for label, values in (("wait", self._recent_wait), ("run", self._recent_run)):
+            if values:
+                p = np.percentile(np.fromiter(values, dtype=np.float64), qs)
+                result[label] = {f"p{q:g}": float(v) for q, v in zip(qs, p)}
+            else:
+                result[label] = {f"p{q:g}": 0.0 for q in qs}
+        return result
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "mean_wait": self.total_wait / self.count if self.count else 0.0,
+            "mean_run": self.total_run / self.count if self.count else 0.0,
+            "max_run": self.max_run,
+            **self.percentiles(),
+        }
+
+
+class WorkerPool(Generic[Input]):
+    def __init__(
+        self,
+        task_fn: TaskFn,
+        n_workers: int = 1,
+        maxsize: int = 0,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        executor: Optional[Executor] = None,
+        queue: Optional[Queue] = None,
+        name: str = "WorkerPool",
+    ):
+        '''
+        Must be created from inside a running event loop.
+
+        Args:
+            task_fn: Called once per item. Coroutine functions are awaited on the loop.
+                Plain functions are run in `executor` if given, otherwise called inline.
+            n_workers: Number of concurrent consumers.
+            maxsize: Queue capacity (0 = unbounded). Ignored if `queue` is given.
+            policy: What put() does when the queue is full.
+            executor: Optional thread/process executor for blocking task functions.
+                With a ProcessPoolExecutor, task_fn and items must be picklable.
+            queue: Optional existing queue to consume from. Items the caller puts in
+                it directly are processed too, but their queue wait is not measured.
+            name: Label used in log messages.
+        '''
+        if n_workers < 1:
+            raise ValueError("n_workers must be at least 1.")
+        self._task_fn = task_fn
+        self._is_coroutine = asyncio.iscoroutinefunction(task_fn)
+        self._executor = executor
+        self._queue: Queue = queue if queue is not None else Queue(maxsize=maxsize)
+        self.policy = policy
+        self.name = name
+        self.stats = LatencyStats()
+        self._closed = False
+        self._workers: List[asyncio.Task] = [
+            asyncio.create_task(self._run_worker()) for _ in range(n_workers)
+        ]
+
+    @property
+    def n_workers(self) -> int:
+        return len(self._workers)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def _call(self, item: Input) -> None:
+        if self._is_coroutine:
+            await self._task_fn(item)
+        elif self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._task_fn, item)
+        else:
+            self._task_fn(item)
+
+    async def _run_worker(self) -> None:
+        while True:
+            entry = await self._queue.get()
+            try:
+                if isinstance(entry, _Entry):
+                    enqueued, item = entry.enqueued, entry.item
+                else:
+                    enqueued, item = time.monotonic(), entry
+                if item is _STOP:
+                    return
+                start = time.monotonic()
+                try:
+                    await self._call(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats.errors += 1
+                    print(f"{self.name}: task failed: {e}")
+                self.stats.record(start - enqueued, time.monotonic() - start)
+            finally:
+                self._queue.task_done()
+
+    def put_nowait(self, item: Input) -> bool:
+        '''
+        Enqueues an item without waiting. Returns False if the item was dropped.
+        With the BLOCK policy, a full queue raises asyncio.QueueFull.
+        '''
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed.")
+        entry = _Entry(item)
+        if self._queue.full():
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                self.stats.dropped += 1
+                return False
+            if self.policy == OverflowPolicy.DROP_OLDEST:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.stats.dropped += 1
+        self._queue.put_nowait(entry)
+        return True
+
+    async def put(self, item: Input) -> bool:
+        '''
+        Puts an item into the queue for processing. Returns False if the item was dropped.
+        With the BLOCK policy, waits until there is room (backpressure).
+        '''
+        if self.policy == OverflowPolicy.BLOCK:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed.")
+            await self._queue.put(_Entry(item))
+            return True
+        return self.put_nowait(item)
+
+    async def join(self):
+        '''
+        Waits for all items in the queue to be processed.
+        '''
+        await self._queue.join()
+
+    async def close(self, drain: bool = True):
+        '''
+        Stops the workers. If drain is True, items already queued are processed first;
+        otherwise the workers are cancelled and the remaining items are discarded.
+        '''
+        if self._closed:
+            return
+        self._closed = True
+        if drain:
+            for _ in self._workers:
+                await self._queue.put(_Entry(_STOP))
+        else:
+            for worker in self._workers:
+                worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
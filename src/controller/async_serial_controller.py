@@ -0,0 +1,191 @@
+"""
+Asynchronous Serial Controller
+
+SerialController.send_command writes each button, sleeps a fixed 100 ms and then
+blocks on the acknowledgement, all on the caller's thread (the RabbitMQ callback
+of OutputControlService). AsyncSerialController moves the serial I/O to a
+dedicated thread:
+
+- send_command / send_buttons only enqueue the button sequence and return a
+  Future, resolved with the round-trip time of each button once all of them are
+  acknowledged.
+- Each button is written as soon as the previous one is acknowledged (the
+  device echoes the button byte when it has pressed it), instead of after a
+  fixed sleep. A missing acknowledgement counts as a timeout after ack_timeout.
+  An echo that arrives late, after its timeout, is discarded rather than taken
+  for the acknowledgement of a later button.
+- Round-trip latencies are kept per button (latency_stats) and reported to the
+  metrics registry as "serial.button_rtt".
+- With a MacroCompiler (src.controller.macros), commands are compiled into the
+  menu's button sequence and sent as one frame with a single acknowledgement.
+  Its cursors are reset when a new battle starts (start_battle).
+
+Usage:
+    controller = AsyncSerialController("/dev/ttyUSB0")
+    future = controller.send_command("move 2")    # returns immediately
+    future.result(timeout=1.0)                     # [rtt A, rtt V] in seconds
+    controller.close()
+"""
+
+import queue
+import threading
+import time
+
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import serial
+
+from src.controller.base import Controller
+from src.controller.macros import FRAME_END, MacroCompiler, encode_frame
+from src.controller.serial_controller import command_to_buttons
+from src.state.pokestate import BattleState
+from src.utils.metrics import Histogram, get_registry
+from src.utils.tracing import span
+
+
+class AsyncSerialController(Controller):
+    def __init__(self, port: str, baudrate: int = 9600, ack_timeout: float = 0.5, startup_delay: float = 1.0,
+                 compiler: Optional[MacroCompiler] = None):
+        """
+        Opens the port and starts the I/O thread. Commands sent during the first
+        startup_delay seconds (the board resets when the port opens) are queued.
+        """
+        self.port = port
+        self.serial_connection = serial.Serial(port, baudrate=baudrate, timeout=ack_timeout)
+        self.ack_timeout = ack_timeout
+        self.compiler = compiler
+        self.startup_delay = startup_delay
+        self.latencies: Dict[str, Histogram] = {}
+        self.timeouts = 0
+        self.mismatches = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[List[str], bool, Future]]]" = queue.Queue()
+        self._last: Optional[Future] = None
+        self._thread = threading.Thread(target=self._run, name="serial-io", daemon=True)
+        self._thread.start()
+
+    def send_command(self, command: str) -> Future:
+        if self.compiler is not None:
+            return self.send_frame(self.compiler.compile(command))
+        return self.send_buttons(command_to_buttons(command))
+
+    def start_battle(self, battle_state: BattleState) -> None:
+        if self.compiler is not None:
+            self.compiler.reset()
+
+    def send_buttons(self, buttons: Sequence[str]) -> Future:
+        """
+        Queues a sequence of buttons, pressed in order after everything queued before.
+        """
+        return self._submit(buttons, framed=False)
+
+    def send_frame(self, buttons: Sequence[str]) -> Future:
+        """
+        Queues a sequence of buttons sent as one frame. The Future resolves with the
+        round-trip time of the whole frame.
+        """
+        return self._submit(buttons, framed=True)
+
+    def _submit(self, buttons: Sequence[str], framed: bool) -> Future:
+        if not self._thread.is_alive():
+            raise RuntimeError("Serial controller is closed.")
+        future: Future = Future()
+        self._last = future
+        self._queue.put((list(buttons), framed, future))
+        return future
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every queued button has been acknowledged (or timed out).
+        """
+        last = self._last
+        if last is None:
+            return True
+        try:
+            last.result(timeout)
+        except TimeoutError:
+            return False
+        except Exception:
+            pass
+        return True
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-button round-trip statistics in seconds.
+        """
+        with self._lock:
+            return {
+                button: {"count": h.count, "mean": h.mean, "p50": h.quantile(0.5), "p95": h.quantile(0.95), "max": h.max}
+                for button, h in self.latencies.items()
+            }
+
+    def close(self) -> None:
+        """
+        Presses what is already queued, then stops the thread and closes the port.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.serial_connection.close()
+
+    def _record(self, key: str, metric: str, rtt: float, ack: bytes, expected: bytes) -> None:
+        registry = get_registry()
+        with self._lock:
+            if not ack:
+                self.timeouts += 1
+                registry.inc("serial.ack_timeouts")
+            elif not ack.endswith(expected):
+                self.mismatches += 1
+                registry.inc("serial.ack_mismatches")
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = Histogram()
+            histogram.observe(rtt)
+        registry.observe(metric, rtt)
+
+    def _press(self, button: str) -> float:
+        expected = button.encode('utf-8')
+        # Late echoes of earlier buttons that timed out
+        self.serial_connection.reset_input_buffer()
+        start = time.perf_counter()
+        self.serial_connection.write(expected)
+        self.serial_connection.flush()
+        # Skips a late echo still on its way, up to this button's
+        ack = self.serial_connection.read_until(expected)
+        rtt = time.perf_counter() - start
+        self._record(button, "serial.button_rtt", rtt, ack, expected)
+        return rtt
+
+    def _press_frame(self, buttons: List[str]) -> float:
+        self.serial_connection.reset_input_buffer()
+        start = time.perf_counter()
+        self.serial_connection.write(encode_frame(buttons))
+        self.serial_connection.flush()
+        # The board answers once, after pressing every button of the frame
+        self.serial_connection.timeout = self.ack_timeout * max(1, len(buttons))
+        try:
+            ack = self.serial_connection.read_until(FRAME_END)
+        finally:
+            self.serial_connection.timeout = self.ack_timeout
+        rtt = time.perf_counter() - start
+        self._record("frame", "serial.frame_rtt", rtt, ack, FRAME_END)
+        return rtt
+
+    def _run(self) -> None:
+        time.sleep(self.startup_delay)
+        self.serial_connection.reset_input_buffer()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            buttons, framed, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with span("serial_sequence"):
+                    rtts = [self._press_frame(buttons)] if framed else [self._press(button) for button in buttons]
+            except (serial.SerialException, OSError) as e:
+                future.set_exception(e)
+            else:
+                future.set_result(rtts)
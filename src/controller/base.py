@@ -6,7 +6,29 @@ class Controller(ABC):
     def send_command(self, command: str) -> None:
         pass
 
+    def start_battle(self, battle_state: BattleState) -> None:
+        '''
+        Called when a new battle starts, before its first command is sent.
+        Controllers that remember where the game's menus were left reset them.
+        '''
+        pass
+
 class Agent(ABC):
     @abstractmethod
     def choose_action(self, battle_state: BattleState) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    def speculate(self, battle_state: BattleState, action: str) -> None:
+        '''
+        Called once `action` has been sent, while the turn plays out. Agents may use
+        the idle time to prepare their next decision.
+        '''
+        pass
+
+    def cancel(self) -> None:
+        '''
+        Called from another thread when the decision in progress is no longer
+        needed. choose_action should return as soon as it can; its result is
+        discarded. Must only signal, never block: it runs on the broker thread.
+        '''
+        pass
@@ -1,29 +1,123 @@
-from typing import Dict, Optional
+import threading
 
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from src.battle.belief import OpponentBelief
 from src.rabbitmq.receive import listen
 from src.utils.battle_state_serialization import BattleStateSerializer
 from src.controller.base import Controller, Agent
+from src.controller.state_inbox import StateInbox
+from src.state.pokestate import BattleState
 from src.rabbitmq.topics import CONTROLLER_EXCHANGE, BATTLE_STATE_UPDATE
+from src.utils.tracing import span, record_since_capture, enable_trace_dump
 
 '''
 Service for handling output controls.
+
+With coalesce (the default), states are handed to a decision thread through a
+StateInbox: only the newest state is acted on, the agent is cancelled when a
+newer state arrives mid-decision, and its now stale action is not sent.
+
+A controller that sends in the background (AsyncSerialController) returns a
+Future; it is waited on, for at most send_timeout seconds, so that the
+controller_send span covers the button presses and serial errors are reported.
+
+With a belief (the OpponentBelief the agent samples from), the battle messages
+published with each state are fed to it before the agent decides. They are kept
+as they arrive, so the messages of states dropped by coalescing are not lost.
+
+A new battle is recognized by the player's team changing. The belief is reset
+and the controller told (Controller.start_battle) before the agent decides.
 '''
 class OutputControlService:
-    def __init__(self, controller: Controller, agent: Agent):
+    def __init__(self, controller: Controller, agent: Agent, coalesce: bool = True, send_timeout: float = 5.0,
+                 belief: Optional[OpponentBelief] = None):
         self.controller = controller
         self.agent = agent
+        self.send_timeout = send_timeout
+        self.belief = belief
         self.battle_state = None
         self.serializer = BattleStateSerializer()
+        self.player_team: Optional[Tuple[str, ...]] = None
+        self.messages: List[Tuple[str, bool, Optional[Tuple]]] = []
+        self.messages_lock = threading.Lock()
+        self.inbox: Optional[StateInbox] = None
+        if coalesce:
+            self.inbox = StateInbox(on_superseded=self.agent.cancel)
+            threading.Thread(target=self._decide_loop, name="decisions", daemon=True).start()
         self.callbacks = {
             BATTLE_STATE_UPDATE: self.update,
         }
         listen(CONTROLLER_EXCHANGE, self.callbacks)
 
+    @property
+    def dropped(self) -> int:
+        return self.inbox.dropped if self.inbox is not None else 0
+
     def update(self, battle_state: Dict[str, str]) -> None:
+        if self.belief is not None:
+            with self.messages_lock:
+                self.messages.extend(self.serializer.messages_from_dict(battle_state))
+        if self.inbox is not None:
+            if not self.inbox.put(battle_state):
+                print(f"Dropped an out of order state ({self.dropped} dropped so far)")
+            return
+        self.act(battle_state)
+
+    def _decide_loop(self) -> None:
+        while True:
+            message = self.inbox.get()
+            if message is None:
+                return
+            try:
+                self.act(message)
+            except Exception as e:
+                self.inbox.done()
+                print(f"Error acting on battle state: {e}")
+
+    def act(self, battle_state: Dict[str, str]) -> None:
+        trace = self.serializer.trace_from_dict(battle_state)
         self.battle_state = self.serializer.from_dict(battle_state)
-        action = self.agent.choose_action(self.battle_state)
+        self.start_battle_if_new(self.battle_state)
+        if self.belief is not None:
+            self.observe_messages(self.battle_state)
+        with span("agent_decision", trace):
+            action = self.agent.choose_action(self.battle_state)
+        if self.inbox is not None and self.inbox.superseded():
+            self.inbox.discard()
+            print(f"Dropped action {action}, a newer state arrived ({self.dropped} dropped so far)")
+            return
         print(f"Chosen action: {action}")
-        self.controller.send_command(action)
+        with span("controller_send", trace):
+            sent = self.controller.send_command(action)
+            if isinstance(sent, Future):
+                try:
+                    sent.result(timeout=self.send_timeout)
+                except Exception as e:
+                    print(f"Error sending action {action}: {e!r}")
+        if self.inbox is not None:
+            self.inbox.done()
+        record_since_capture("end_to_end", trace)
+        # The turn animations run until the next state arrives
+        self.agent.speculate(self.battle_state, action)
+
+    def start_battle_if_new(self, battle_state: BattleState) -> None:
+        team = tuple(p.species for p in battle_state.player_team.pk_list)
+        if team == self.player_team:
+            return
+        self.player_team = team
+        self.controller.start_battle(battle_state)
+        if self.belief is not None:
+            self.belief.reset()
+
+    def observe_messages(self, battle_state: BattleState) -> None:
+        with self.messages_lock:
+            messages, self.messages = self.messages, []
+        hidden_opponent = self.belief.hidden_side == 1
+        for text, opponent, change in messages:
+            if opponent == hidden_opponent:
+                self.belief.observe_message(text, battle_state, change)
 
 
 class MockController(Controller):
@@ -40,13 +134,52 @@ if __name__ == "__main__":
     parser.add_argument("--port", type=str, help="Serial port to connect to")
     parser.add_argument("--mock", action="store_true", help="Use mock controller for testing")
     parser.add_argument("--baudrate", type=int, default=9600, help="Baud rate for serial communication")
+    parser.add_argument("--async-serial", action="store_true",
+                        help="Send buttons from a background thread, paced by the board's acknowledgements")
+    parser.add_argument("--macros", action="store_true",
+                        help="With --async-serial, send each command as one framed button sequence")
+    parser.add_argument("--trace-out", type=str, default=None, help="Write per-frame latency spans to this JSONL file on exit")
+    parser.add_argument("--agent", choices=["random", "mcts", "expectiminimax"], default="random",
+                        help="Agent that chooses the actions")
+    parser.add_argument("--budget-ms", type=int, default=200, help="Decision time budget of search agents")
+    parser.add_argument("--workers", type=int, default=None, help="Search processes (default: one per CPU)")
+    parser.add_argument("--matchups", type=str, default=None,
+                        help="Matchup store directory; search agents score leaves with its nKO tables")
+    parser.add_argument("--belief", type=str, nargs="+", default=None,
+                        help="Roster files; search agents sample the opponent's team from a belief over their sets")
+    parser.add_argument("--speculate", action="store_true",
+                        help="Precompute decisions for likely outcomes while the turn plays out")
+    parser.add_argument("--no-coalesce", action="store_true",
+                        help="Act on every state in arrival order instead of only the newest")
     args = parser.parse_args()
+    if args.trace_out:
+        enable_trace_dump(args.trace_out)
 
     if args.mock:
         controller = MockController()
     else:
         if not args.port:
             raise ValueError("Port must be specified when using serial controller.")
-        controller = SerialController(port=args.port, baudrate=args.baudrate)
-    agent = RandomAgent()  # TODO: Replace with actual agent implementation
-    service = OutputControlService(controller, agent)
+        if args.async_serial:
+            from src.controller.async_serial_controller import AsyncSerialController
+            from src.controller.macros import MacroCompiler
+            controller = AsyncSerialController(port=args.port, baudrate=args.baudrate,
+                                               compiler=MacroCompiler() if args.macros else None)
+        else:
+            controller = SerialController(port=args.port, baudrate=args.baudrate)
+    belief = None
+    if args.belief:
+        belief = OpponentBelief.from_yaml(*args.belief)
+    if args.agent == "mcts":
+        from src.controller.mcts_agent import MCTSAgent
+        agent = MCTSAgent(budget=args.budget_ms / 1000.0, workers=args.workers, matchups=args.matchups,
+                          belief=belief)
+    elif args.agent == "expectiminimax":
+        from src.controller.expectiminimax_agent import ExpectiminimaxAgent
+        agent = ExpectiminimaxAgent(time_limit=args.budget_ms / 1000.0, matchups=args.matchups, belief=belief)
+    else:
+        agent = RandomAgent()
+    if args.speculate:
+        from src.controller.speculative_agent import SpeculativeAgent
+        agent = SpeculativeAgent(agent)
+    service = OutputControlService(controller, agent, coalesce=not args.no_coalesce, belief=belief)
@@ -0,0 +1,331 @@
+import random
+import time
+
+import numpy as np
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.battle.belief import OpponentBelief
+from src.battle.damage_cache import DamageCache, get_damage_cache
+from src.battle.evaluator import HeuristicEvaluator
+from src.battle.hidden_info import RentalPool, determinize
+from src.battle.simulator import N_MOVES, TEAM_SIZE, SimPokemon, SimState, TurnSimulator, action_name, legal_actions
+from src.controller.base import Agent
+from src.controller.mcts_agent import hp_value
+from src.state.pokestate import BattleState, PokemonState
+from src.state.pokestate_defs import PlayerID, Status
+
+'''
+    Depth-limited expectiminimax agent.
+
+    Turns are simultaneous: at every node the agent (side 0 of the search) picks the
+    action with the best worst case over the opponent's replies, and each joint action
+    is scored by the average over a few chance outcomes.
+
+    Chance outcomes are ScenarioRngs: fixed streams of uniform numbers fed to the
+    TurnSimulator in place of its random.Random. Every scenario resolves damage rolls,
+    crits, accuracy and status procs the same way each time it is used, so the
+    search is deterministic and its results can be cached in a transposition table
+    keyed by a Zobrist hash of the compact SimState.
+
+    Leaves are scored by hp_value, or by a HeuristicEvaluator over the matchup
+    tables when one is given.
+
+    The search deepens one turn at a time until the time limit and returns the best
+    action of the deepest finished iteration. Actions are tried in order of the
+    previous iteration's best action, then the expected damage of each move from the
+    shared DamageCache, then switches.
+'''
+
+
+class ScenarioRng:
+    '''
+    random.Random stand-in that replays a fixed stream of uniform numbers. reset()
+    rewinds it before every simulated turn.
+    '''
+    __slots__ = ("values", "position")
+
+    def __init__(self, values: Sequence[float]):
+        self.values = list(values)
+        self.position = 0
+
+    def reset(self) -> None:
+        self.position = 0
+
+    def random(self) -> float:
+        value = self.values[self.position % len(self.values)]
+        self.position += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        return a + min(b - a, int(self.random() * (b - a + 1)))
+
+    def randrange(self, start: int, stop: Optional[int] = None) -> int:
+        if stop is None:
+            start, stop = 0, start
+        return start + min(stop - start - 1, int(self.random() * (stop - start)))
+
+
+def make_scenarios(n: int, length: int = 64, seed: int = 0) -> List[ScenarioRng]:
+    '''
+    n scenarios whose i-th values are stratified over [0, 1): in every position each
+    scenario draws from a different 1/n-wide band, so together they cover both lucky
+    and unlucky outcomes of every random check.
+    '''
+    rng = random.Random(seed)
+    columns = []
+    for _ in range(length):
+        bands = list(range(n))
+        rng.shuffle(bands)
+        columns.append([(band + rng.random()) / n for band in bands])
+    return [ScenarioRng([column[i] for column in columns]) for i in range(n)]
+
+
+class ZobristHasher:
+    '''
+    64-bit Zobrist keys of SimStates: the XOR of one random number per (side, slot,
+    feature, value) over HP, status, sleep turns and PP, the active slots and the
+    active Pokemon's stages and volatile conditions, plus one per (side, slot) for
+    the Pokemon itself (species, level, max HP and moves), so states of different
+    determinizations or battles do not share keys.
+    '''
+    MAX_HP = 1024
+    MAX_PP = 64
+
+    def __init__(self, seed: int = 0):
+        rng = random.Random(seed)
+        bits = lambda *shape: self._table(rng, shape)
+        self.hp = bits(2, TEAM_SIZE, self.MAX_HP)
+        self.status = bits(2, TEAM_SIZE, len(Status))
+        self.sleep = bits(2, TEAM_SIZE, 8)
+        self.pp = bits(2, TEAM_SIZE, N_MOVES, self.MAX_PP)
+        self.active = bits(2, TEAM_SIZE)
+        self.stages = bits(2, 4, 13)
+        self.volatile = bits(2, 9, 8)
+        self.must_switch = bits(2)
+        self.seed = seed
+        self._identities: Dict[Tuple, int] = {}
+
+    @staticmethod
+    def _table(rng: random.Random, shape: Tuple[int, ...]):
+        if len(shape) == 1:
+            return [rng.getrandbits(64) for _ in range(shape[0])]
+        return [ZobristHasher._table(rng, shape[1:]) for _ in range(shape[0])]
+
+    @staticmethod
+    def identity(pokemon: SimPokemon) -> Tuple:
+        return (pokemon.species, pokemon.level, pokemon.max_hp,
+                tuple(move.name if move is not None else None for move in pokemon.moves))
+
+    def roster(self, state: SimState) -> Tuple:
+        '''
+        Identities of every Pokemon in the state, per side and slot.
+        '''
+        return tuple(tuple(None if p is None else self.identity(p) for p in team) for team in state.teams)
+
+    def _identity_bits(self, side: int, slot: int, pokemon: SimPokemon) -> int:
+        key = (side, slot) + self.identity(pokemon)
+        bits = self._identities.get(key)
+        if bits is None:
+            # Seeding with the key keeps the bits the same across runs
+            bits = self._identities[key] = random.Random(repr((self.seed,) + key)).getrandbits(64)
+        return bits
+
+    def hash(self, state: SimState) -> int:
+        key = 0
+        for side in (0, 1):
+            for pokemon in state.teams[side]:
+                if pokemon is None:
+                    continue
+                slot = pokemon.slot
+                key ^= self._identity_bits(side, slot, pokemon)
+                key ^= self.hp[side][slot][max(0, pokemon.hp) % self.MAX_HP]
+                key ^= self.status[side][slot][pokemon.status.value]
+                key ^= self.sleep[side][slot][pokemon.sleep_turns & 7]
+                pp_table = self.pp[side][slot]
+                for i, pp in enumerate(pokemon.pp):
+                    key ^= pp_table[i][pp % self.MAX_PP]
+            key ^= self.active[side][state.active[side]]
+            if state.must_switch[side]:
+                key ^= self.must_switch[side]
+            mon = state.active_mon(side)
+            if mon is None:
+                continue
+            for stat, stage in enumerate(mon.stages):
+                key ^= self.stages[side][stat][stage + 6]
+            volatile = self.volatile[side]
+            for i, value in enumerate((mon.confusion, mon.charging + 1, mon.recharging, mon.trap_turns, mon.trapped,
+                                       mon.substitute > 0, mon.reflect, mon.light_screen, mon.flinched)):
+                key ^= volatile[i][int(value) & 7]
+        return key
+
+
+def _as_pokemon_state(pokemon: SimPokemon) -> PokemonState:
+    types = pokemon.types + (None,) * (2 - len(pokemon.types))
+    return PokemonState(
+        species=pokemon.species, level=pokemon.level, type1=types[0], type2=types[1],
+        hp=100.0 * max(0, pokemon.hp) / pokemon.max_hp, status=pokemon.status,
+        atk_boost=pokemon.stages[0], def_boost=pokemon.stages[1], special_boost=pokemon.stages[2],
+        speed_boost=pokemon.stages[3], reflect=pokemon.reflect, light_screen=pokemon.light_screen,
+    )
+
+
+class _Timeout(Exception):
+    pass
+
+
+class ExpectiminimaxSearch:
+    '''
+    Search from side 0's point of view with a shared transposition table.
+    '''
+    def __init__(self, n_chance: int = 3, seed: int = 0, damage_cache: Optional[DamageCache] = None,
+                 max_entries: int = 200000, evaluator: Optional[HeuristicEvaluator] = None):
+        self.sim = TurnSimulator()
+        self.evaluate = evaluator.evaluate if evaluator is not None else hp_value
+        self.scenarios = make_scenarios(n_chance, seed=seed)
+        self.hasher = ZobristHasher(seed)
+        self.damage_cache = damage_cache or get_damage_cache()
+        self.table: Dict[int, Tuple[int, float, int]] = {} # key -> (depth, value, best side 0 action)
+        self.max_entries = max_entries
+        self.deadline = float("inf")
+        self.nodes = 0
+
+    def _order(self, state: SimState, side: int, actions: List[int], first: Optional[int]) -> List[int]:
+        mon, target = state.active_mon(side), state.active_mon(1 - side)
+        if len(actions) <= 1 or mon is None or target is None or mon.fainted or target.fainted:
+            return actions
+        attacker, defender = _as_pokemon_state(mon), _as_pokemon_state(target)
+
+        def key(action: int) -> float:
+            if action == first:
+                return -1e9
+            if action >= N_MOVES or mon.moves[action] is None:
+                return 0.0
+            return -self.damage_cache.distribution(attacker, defender, mon.moves[action].name).mean()
+
+        return sorted(actions, key=key)
+
+    def _actions(self, state: SimState, side: int) -> List[int]:
+        actions = legal_actions(state, side)
+        if state.must_switch[1 - side] and not state.must_switch[side]:
+            return actions[:1]
+        return actions
+
+    def _expected(self, state: SimState, a0: int, a1: int, depth: int) -> float:
+        total = 0.0
+        for scenario in self.scenarios:
+            child = state.copy()
+            scenario.reset()
+            self.sim.rng = scenario
+            self.sim.step(child, a0, a1)
+            total += self.value(child, depth - 1)
+        return total / len(self.scenarios)
+
+    def value(self, state: SimState, depth: int) -> float:
+        self.nodes += 1
+        if state.winner is not None or depth == 0:
+            return self.evaluate(state, 0)
+        if self.nodes & 63 == 0 and time.time() > self.deadline:
+            raise _Timeout()
+        key = self.hasher.hash(state)
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            return entry[1]
+        best_action, best = self.search_node(state, depth, entry[2] if entry is not None else None)
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        self.table[key] = (depth, best, best_action)
+        return best
+
+    def search_node(self, state: SimState, depth: int, first: Optional[int] = None) -> Tuple[int, float]:
+        mine = self._order(state, 0, self._actions(state, 0), first)
+        theirs = self._order(state, 1, self._actions(state, 1), None)
+        best_action, best = mine[0], -1.0
+        for a0 in mine:
+            worst = 2.0
+            for a1 in theirs:
+                worst = min(worst, self._expected(state, a0, a1, depth))
+                if worst <= best:
+                    # The opponent already has a reply that makes a0 no better than best_action
+                    break
+            if worst > best:
+                best_action, best = a0, worst
+        return best_action, best
+
+    def search(self, state: SimState, time_limit: float, max_depth: int = 8) -> Tuple[int, int]:
+        '''
+        Iterative deepening. Returns (best action, depth reached).
+        '''
+        self.deadline = time.time() + time_limit
+        best_action, reached = legal_actions(state, 0)[0], 0
+        for depth in range(1, max_depth + 1):
+            try:
+                entry = self.table.get(self.hasher.hash(state))
+                best_action, value = self.search_node(state, depth, entry[2] if entry is not None else best_action)
+                self.table[self.hasher.hash(state)] = (depth, value, best_action)
+                reached = depth
+            except _Timeout:
+                break
+            if time.time() > self.deadline:
+                break
+        return best_action, reached
+
+
+class ExpectiminimaxAgent(Agent):
+    '''
+    Agent that returns the expectiminimax action of the deepest search finished
+    within `time_limit` seconds. Unknown opponent Pokemon and moves are filled in
+    once per decision from the rental pool, or sampled from `belief` when given.
+    With `matchups` (a matchup store directory) leaves are scored by the
+    HeuristicEvaluator.
+    '''
+    def __init__(self, player_id: PlayerID = PlayerID.P1, time_limit: float = 0.2, max_depth: int = 8,
+                 n_chance: int = 3, roster: Optional[str] = "config/pokemon.yaml", seed: int = 0,
+                 matchups: Optional[str] = None, belief: Optional[OpponentBelief] = None):
+        self.player_id = player_id
+        self.me = 0 if player_id == PlayerID.P1 else 1
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.pool = RentalPool.from_yaml(roster) if roster else None
+        self.rng = random.Random(seed)
+        self.belief = belief
+        self.np_rng = np.random.default_rng(seed)
+        evaluator = HeuristicEvaluator.load(matchups) if matchups else None
+        self.search = ExpectiminimaxSearch(n_chance=n_chance, seed=seed, evaluator=evaluator)
+        self.last_depth = 0
+        self._roster: Optional[Tuple] = None
+
+    def cancel(self) -> None:
+        '''
+        Ends the search in progress as if its time limit had passed.
+        '''
+        self.search.deadline = 0.0
+
+    def choose_action(self, battle_state: BattleState) -> str:
+        if self.belief is not None:
+            self.belief.sync(battle_state)
+            sample = self.belief.to_battle_states(battle_state, self.belief.sample(1, self.np_rng, battle_state))[0]
+        else:
+            sample = determinize(battle_state, 1 - self.me, self.pool, self.rng) if self.pool else battle_state
+        state = SimState.from_battle_state(sample)
+        if self.me == 1:
+            state.teams.reverse()
+            state.active.reverse()
+            state.must_switch.reverse()
+        actions = legal_actions(state, 0)
+        if not actions:
+            raise ValueError("No valid actions available.")
+        if len(actions) == 1:
+            return action_name(actions[0])
+        roster = self.search.hasher.roster(state)
+        if roster != self._roster:
+            # Values of another determinization or battle are of no use
+            self.search.table.clear()
+            self._roster = roster
+        try:
+            action, self.last_depth = self.search.search(state, self.time_limit, self.max_depth)
+        except ValueError as e:
+            # A simulator bug must not cost the decision, fall back to the first legal action
+            print(f"Expectiminimax search failed: {e}")
+            action, self.last_depth = actions[0], 0
+        return action_name(action)
@@ -0,0 +1,135 @@
+"""
+Input Macros
+
+Compiles agent commands into the buttons that carry them out in the game menus:
+
+    "move i"          A, WAIT while the move menu opens, then the move's button
+    "switch i"        B, WAIT while the switch menu opens, then the path to team
+                      slot i
+    "pick i j k"      team preview: the path to each slot followed by A, lead
+                      first, then START to confirm
+
+Menus are either direct (every option has its own button, as the move menu) or
+cursor grids. The compiler remembers where each grid's cursor was left, since the
+game keeps it there, and moves it along the shortest path, wrapping around the
+edges when the menu does. A new battle starts with every cursor on the first
+option: the controller node calls reset() (through Controller.start_battle) when
+the BattleState shows a new battle, before compiling its first command.
+
+A compiled sequence is sent to the board as one frame, "[" + buttons + "]". The
+board presses the buttons in order, waits one press interval for every WAIT, and
+echoes "]" once the whole frame is done, so a command costs one round trip
+instead of one per button.
+
+Usage:
+    compiler = MacroCompiler()
+    compiler.compile("pick 4 0 2")   # ['V', '>', 'A', '^', '<', 'A', '>', '>', 'A', 'S']
+    encode_frame(compiler.compile("move 1"))   # b'[A.>]'
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Sequence, Union
+
+UP, RIGHT, DOWN, LEFT = '^', '>', 'V', '<'
+A, B, START = 'A', 'B', 'S'
+WAIT = '.'
+
+FRAME_START = b'['
+FRAME_END = b']'
+
+
+@dataclass
+class DirectMenu:
+    """
+    Menu where option i is chosen by pressing buttons[i].
+    """
+    buttons: Sequence[str]
+
+    def __len__(self) -> int:
+        return len(self.buttons)
+
+    def select(self, index: int) -> List[str]:
+        return [self.buttons[index]]
+
+
+@dataclass
+class GridMenu:
+    """
+    Options laid out row by row in a rows x cols grid, chosen by moving a cursor.
+    """
+    rows: int
+    cols: int
+    wrap: bool = False
+    cursor: int = 0
+
+    def __len__(self) -> int:
+        return self.rows * self.cols
+
+    def _axis(self, start: int, stop: int, size: int, forward: str, backward: str) -> List[str]:
+        delta = stop - start
+        if self.wrap and abs(delta) > size // 2:
+            delta -= size if delta > 0 else -size
+        return [forward] * delta if delta > 0 else [backward] * -delta
+
+    def path(self, start: int, stop: int) -> List[str]:
+        """
+        Shortest sequence of directions from option start to option stop.
+        """
+        (row0, col0), (row1, col1) = divmod(start, self.cols), divmod(stop, self.cols)
+        return self._axis(row0, row1, self.rows, DOWN, UP) + self._axis(col0, col1, self.cols, RIGHT, LEFT)
+
+    def select(self, index: int) -> List[str]:
+        buttons = self.path(self.cursor, index)
+        self.cursor = index
+        return buttons
+
+
+@dataclass
+class MacroCompiler:
+    """
+    Default layouts follow SerialController: move i is A then ^ > V <, switch i is
+    B then ^ > V < A B, and team preview is a 2 x 3 grid. menu_wait WAITs are
+    pressed between A or B and the menu they open.
+    """
+    move_menu: DirectMenu = field(default_factory=lambda: DirectMenu([UP, RIGHT, DOWN, LEFT]))
+    switch_menu: Union[DirectMenu, GridMenu] = field(default_factory=lambda: DirectMenu([UP, RIGHT, DOWN, LEFT, A, B]))
+    preview_menu: GridMenu = field(default_factory=lambda: GridMenu(rows=2, cols=3))
+    menu_wait: int = 1
+
+    def reset(self) -> None:
+        """
+        Cursors back to the first option, e.g. when a new battle starts.
+        """
+        for menu in (self.move_menu, self.switch_menu, self.preview_menu):
+            if isinstance(menu, GridMenu):
+                menu.cursor = 0
+
+    @staticmethod
+    def _index(value: str, menu) -> int:
+        if not value.isdigit() or int(value) >= len(menu):
+            raise ValueError(f"Index must be an integer from 0 to {len(menu) - 1}, got {value!r}.")
+        return int(value)
+
+    def compile(self, command: str) -> List[str]:
+        parts = command.strip().split()
+        if not parts:
+            raise ValueError("Empty command.")
+        action, args = parts[0], parts[1:]
+        if action in ("move", "switch"):
+            if len(args) != 1:
+                raise ValueError("Command must be <action> <index>.")
+            menu = self.move_menu if action == "move" else self.switch_menu
+            index = self._index(args[0], menu)
+            return [A if action == "move" else B] + [WAIT] * self.menu_wait + menu.select(index)
+        if action == "pick":
+            if not args or len(set(args)) != len(args):
+                raise ValueError("Pick needs distinct team slots, lead first.")
+            buttons = []
+            for arg in args:
+                buttons += self.preview_menu.select(self._index(arg, self.preview_menu)) + [A]
+            return buttons + [START]
+        raise ValueError("Action must be 'move', 'switch' or 'pick'.")
+
+
+def encode_frame(buttons: Sequence[str]) -> bytes:
+    return FRAME_START + "".join(buttons).encode('utf-8') + FRAME_END
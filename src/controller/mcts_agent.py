@@ -0,0 +1,288 @@
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.battle.belief import OpponentBelief
+from src.battle.evaluator import HeuristicEvaluator
+from src.battle.hidden_info import RentalPool, determinize
+from src.battle.simulator import SimState, TurnSimulator, action_name, legal_actions
+from src.controller.base import Agent
+from src.state.pokestate import BattleState
+from src.state.pokestate_defs import PlayerID
+
+'''
+    Monte Carlo Tree Search agent.
+
+    Each search runs for a fixed wall-clock budget on the scalar TurnSimulator.
+    Turns are simultaneous, so every node keeps separate UCB statistics for each
+    side's actions (decoupled UCT), and the tree is open loop: nodes are keyed by
+    the joint actions only and every iteration replays the turns from a fresh copy
+    of the root, which samples damage rolls, accuracy and status procs.
+
+    The opponent's unknown Pokemon and moves are sampled from the rental pool
+    (src.battle.hidden_info), or from an OpponentBelief (src.battle.belief) when the
+    agent has one; every iteration uses one of a few determinizations.
+
+    With workers > 1 the search is root-parallel: each worker process grows its own
+    tree on its own determinizations until the deadline, and the root visit counts
+    of all trees are summed to pick the action.
+
+    Rollouts end after a few turns and are scored by hp_value, or by a
+    HeuristicEvaluator over the matchup tables when one is given.
+'''
+
+Stats = Dict[int, List[float]] # action -> [visits, total value]
+
+
+def hp_value(state: SimState, side: int) -> float:
+    '''
+    Value in [0, 1] for `side`: the result of a finished battle, otherwise from the
+    remaining HP fractions of both teams.
+    '''
+    if state.winner is not None:
+        return 0.5 if state.winner == -1 else float(state.winner == side)
+    fractions = []
+    for team in state.teams:
+        total = sum(p.max_hp for p in team if p is not None)
+        fractions.append(sum(max(0, p.hp) for p in team if p is not None) / max(1, total))
+    return 0.5 + 0.5 * (fractions[side] - fractions[1 - side])
+
+
+class _Node:
+    __slots__ = ("stats", "children", "visits")
+
+    def __init__(self):
+        self.stats: Tuple[Stats, Stats] = ({}, {})
+        self.children: Dict[Tuple[int, int], '_Node'] = {}
+        self.visits = 0
+
+
+class MCTSSearch:
+    '''
+    One decoupled-UCT tree over a list of root determinizations (side 0 = player team).
+    '''
+    def __init__(self, roots: List[SimState], seed: Optional[int] = None, exploration: float = 0.7,
+                 rollout_depth: int = 8, max_depth: int = 12,
+                 evaluate: Callable[[SimState, int], float] = hp_value):
+        self.roots = roots
+        self.rng = random.Random(seed)
+        self.sim = TurnSimulator(seed)
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.max_depth = max_depth
+        self.evaluate = evaluate
+        self.root = _Node()
+        self.iterations = 0
+
+    def _actions(self, state: SimState, side: int) -> List[int]:
+        actions = legal_actions(state, side)
+        if state.must_switch[1 - side] and not state.must_switch[side]:
+            # Only the fainted side acts; the other action is ignored by step()
+            return actions[:1]
+        return actions
+
+    def _select(self, node: _Node, side: int, actions: List[int]) -> int:
+        stats = node.stats[side]
+        unvisited = [a for a in actions if a not in stats]
+        if unvisited:
+            return self.rng.choice(unvisited)
+        log_n = math.log(node.visits + 1)
+        best, best_score = actions[0], -1.0
+        for a in actions:
+            visits, total = stats[a]
+            score = total / visits + self.exploration * math.sqrt(log_n / visits)
+            if score > best_score:
+                best, best_score = a, score
+        return best
+
+    def _rollout(self, state: SimState) -> float:
+        rng = self.rng
+        for _ in range(self.rollout_depth):
+            if state.winner is not None:
+                break
+            self.sim.step(state, rng.choice(self._actions(state, 0)), rng.choice(self._actions(state, 1)))
+        return self.evaluate(state, 0)
+
+    def iterate(self) -> None:
+        state = self.roots[self.iterations % len(self.roots)].copy()
+        self.iterations += 1
+        node = self.root
+        path = []
+        for _ in range(self.max_depth):
+            if state.winner is not None:
+                break
+            joint = (self._select(node, 0, self._actions(state, 0)), self._select(node, 1, self._actions(state, 1)))
+            path.append((node, joint))
+            self.sim.step(state, *joint)
+            child = node.children.get(joint)
+            if child is None:
+                node.children[joint] = _Node()
+                break
+            node = child
+        value = self._rollout(state)
+        for node, (a0, a1) in path:
+            node.visits += 1
+            for side, action, v in ((0, a0, value), (1, a1, 1.0 - value)):
+                entry = node.stats[side].get(action)
+                if entry is None:
+                    node.stats[side][action] = [1, v]
+                else:
+                    entry[0] += 1
+                    entry[1] += v
+
+    def run(self, deadline: float, stop: Optional[threading.Event] = None) -> Stats:
+        '''
+        Iterates until time.time() passes the deadline, or `stop` is set. Returns the
+        root statistics of side 0.
+        '''
+        while True:
+            # Check the clock every few iterations, an iteration is well below a millisecond
+            for _ in range(16):
+                self.iterate()
+            if time.time() >= deadline or (stop is not None and stop.is_set()):
+                return self.root.stats[0]
+
+
+_worker_pool: Optional[RentalPool] = None
+_worker_evaluator: Optional[HeuristicEvaluator] = None
+
+
+def _init_worker(pool: RentalPool, evaluator: Optional[HeuristicEvaluator]) -> None:
+    global _worker_pool, _worker_evaluator
+    _worker_pool = pool
+    _worker_evaluator = evaluator
+
+
+def _search(battle_state: BattleState, me: int, deadline: float, seed: int, n_determinizations: int,
+            pool: Optional[RentalPool] = None, evaluator: Optional[HeuristicEvaluator] = None,
+            samples: Optional[List[BattleState]] = None,
+            stop: Optional[threading.Event] = None) -> Tuple[Stats, int]:
+    pool = pool if pool is not None else _worker_pool
+    evaluator = evaluator if evaluator is not None else _worker_evaluator
+    rng = random.Random(seed)
+    if not samples:
+        samples = [determinize(battle_state, 1 - me, pool, rng) if pool is not None else battle_state
+                   for _ in range(n_determinizations)]
+    roots = []
+    for sample in samples:
+        state = SimState.from_battle_state(sample)
+        if me == 1:
+            state.teams.reverse()
+            state.active.reverse()
+            state.must_switch.reverse()
+        roots.append(state)
+    search = MCTSSearch(roots, seed=seed, evaluate=evaluator.evaluate if evaluator is not None else hp_value)
+    return search.run(deadline, stop), search.iterations
+
+
+class MCTSAgent(Agent):
+    '''
+    Agent that returns the most visited root action after `budget` seconds. With
+    `matchups` (a matchup store directory) rollouts are scored by the
+    HeuristicEvaluator. With a `belief` the determinizations of all workers are
+    drawn from it in one vectorized sample.
+    '''
+    def __init__(self, player_id: PlayerID = PlayerID.P1, budget: float = 0.2, workers: Optional[int] = None,
+                 roster: Optional[str] = "config/pokemon.yaml", n_determinizations: int = 4,
+                 seed: Optional[int] = None, matchups: Optional[str] = None,
+                 belief: Optional[OpponentBelief] = None):
+        self.player_id = player_id
+        self.me = 0 if player_id == PlayerID.P1 else 1
+        self.budget = budget
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.pool = RentalPool.from_yaml(roster) if roster else None
+        self.evaluator = HeuristicEvaluator.load(matchups) if matchups else None
+        self.n_determinizations = n_determinizations
+        self.rng = random.Random(seed)
+        self.belief = belief
+        self.np_rng = np.random.default_rng(seed)
+        self.last_iterations = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cancelled = threading.Event()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers - 1, mp_context=context,
+                                                 initializer=_init_worker, initargs=(self.pool, self.evaluator))
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def cancel(self) -> None:
+        '''
+        Stops the search in progress; worker trees that are not done are not waited for.
+        '''
+        self._cancelled.set()
+
+    def choose_action(self, battle_state: BattleState) -> str:
+        self._cancelled.clear()
+        start = time.time()
+        # Leave time to merge the trees and send the command
+        deadline = start + self.budget * 0.9
+
+        root = SimState.from_battle_state(battle_state)
+        if self.me == 1:
+            root.teams.reverse()
+            root.active.reverse()
+            root.must_switch.reverse()
+        actions = legal_actions(root, 0)
+        if not actions:
+            raise ValueError("No valid actions available.")
+        if len(actions) == 1:
+            return action_name(actions[0])
+
+        chunks = [None] * self.workers
+        if self.belief is not None:
+            self.belief.sync(battle_state)
+            drawn = self.belief.sample(self.workers * self.n_determinizations, self.np_rng, battle_state)
+            samples = self.belief.to_battle_states(battle_state, drawn)
+            chunks = [samples[i::self.workers] for i in range(self.workers)]
+
+        futures = []
+        if self.workers > 1:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_search, battle_state, self.me, deadline, self.rng.randrange(2 ** 31),
+                                self.n_determinizations, samples=chunks[i + 1])
+                for i in range(self.workers - 1)
+            ]
+        try:
+            totals, iterations = _search(battle_state, self.me, deadline, self.rng.randrange(2 ** 31),
+                                         self.n_determinizations, self.pool, self.evaluator, chunks[0],
+                                         self._cancelled)
+        except ValueError as e:
+            # A simulator bug must not cost the decision, fall back to the first legal action
+            print(f"MCTS search failed: {e}")
+            totals, iterations = {}, 0
+        totals = {a: list(s) for a, s in totals.items()}
+        remaining = 0.0 if self._cancelled.is_set() else max(0.0, start + self.budget - time.time())
+        done, _ = wait(futures, timeout=remaining)
+        for future in done:
+            try:
+                stats, n = future.result()
+            except ValueError as e:
+                print(f"MCTS search failed: {e}")
+                continue
+            iterations += n
+            for action, (visits, value) in stats.items():
+                entry = totals.setdefault(action, [0, 0.0])
+                entry[0] += visits
+                entry[1] += value
+        self.last_iterations = iterations
+
+        legal = set(actions)
+        best = max((a for a in totals if a in legal), key=lambda a: (totals[a][0], totals[a][1]), default=actions[0])
+        return action_name(best)
@@ -3,11 +3,12 @@
 # If switch, it will switch the active mon to the one specified (0-POKEMON_TEAM).
 # If move, it will use the move specified (0-3) on the active mon.
 # This is converted to a set of commands to send to the controller via serial port.
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import serial
 import time
 
 from src.controller.controller_node import Controller
+from src.utils.tracing import span
 
 # Controller maps to the option of the specified index.
 _CHARACTER_MAP = [
@@ -19,6 +20,22 @@ _CHARACTER_MAP = [
     'B',
 ]
 
+def command_to_buttons(command: str) -> List[str]:
+    """
+    Buttons for an agent command: A (move) or B (switch), then the direction of
+    the option's index.
+    """
+    command_list = command.strip().split()
+    if len(command_list) != 2:
+        raise ValueError("Command must be <action> <index>.")
+    action, index = command_list
+    if action not in ["switch", "move"]:
+        raise ValueError("Action must be 'switch' or 'move'.")
+    if not index.isdigit() or int(index) < 0:
+        raise ValueError("Index must be a non-negative integer.")
+    return ["B" if action == "switch" else "A", _CHARACTER_MAP[int(index)]]
+
+
 class SerialController(Controller):
     def __init__(self, port: str, baudrate: int = 9600):
         """
@@ -42,23 +59,12 @@ class SerialController(Controller):
         Args:
             command: The command string to send
         """
-        command_list = command.strip().split()
-        if len(command_list) != 2:
-            raise ValueError("Command must be <action> <index>.")
-        action, index = command_list
-        if action not in ["switch", "move"]:
-            raise ValueError("Action must be 'switch' or 'move'.")
-        if not index.isdigit() or int(index) < 0:
-            raise ValueError("Index must be a non-negative integer.")
-        controller_action = "B" if action == "switch" else "A"
-        self.serial_connection.write(controller_action.encode('utf-8'))
-        self.serial_connection.flush()  # Ensure the command is sent immediately
-        time.sleep(0.1)  # Wait for the controller to process the command
-        print(self.serial_connection.read(1))  # Read response from controller
-        self.serial_connection.write(_CHARACTER_MAP[int(index)].encode('utf-8'))
-        self.serial_connection.flush()  # Ensure the command is sent immediately
-        time.sleep(0.1)  # Wait for the controller to process the command
-        print(self.serial_connection.read(1))  # Read response from controller
+        for button in command_to_buttons(command):
+            with span("serial_write"):
+                self.serial_connection.write(button.encode('utf-8'))
+                self.serial_connection.flush()  # Ensure the command is sent immediately
+                time.sleep(0.1)  # Wait for the controller to process the command
+                print(self.serial_connection.read(1))  # Read response from controller
 
 if __name__ == "__main__":
     import argparse
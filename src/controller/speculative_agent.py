@@ -0,0 +1,177 @@
+import copy
+import threading
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from src.battle.simulator import SimState, TurnSimulator, action_name, legal_actions
+from src.controller.base import Agent
+from src.state.pokestate import BattleState
+from src.state.pokestate_defs import PlayerID
+
+'''
+    Speculative decisions.
+
+    After the controller sends an action, the game spends seconds on the turn
+    animations (EXECUTE mode) before the StateReader publishes the next state. The
+    SpeculativeAgent uses that time: it simulates the turn from the last state with
+    the sent action against every opponent reply, groups the outcomes by a coarse
+    key (HP buckets, status and stat stages of every Pokemon and the active slots),
+    and runs the wrapped agent on the most likely outcomes first.
+
+    When the real state arrives, a decision cached under its key is returned at
+    once. If the key is the one being computed, the agent waits for it; otherwise
+    speculation is stopped and the wrapped agent decides as usual.
+'''
+
+StateKey = Tuple
+CANCEL_INTERVAL = 0.005 # Seconds between cancellations of a speculative decision being stopped
+
+
+def state_key(battle_state: BattleState, hp_buckets: int = 10) -> StateKey:
+    '''
+    Coarse key of the information a decision depends on. HP is bucketed since the
+    HP bar reading is only approximate.
+    '''
+    key: List = [battle_state.player_active_mon, battle_state.opponent_active_mon]
+    for team in (battle_state.player_team, battle_state.opponent_team):
+        for pokemon in team.pk_list:
+            if not pokemon.species:
+                continue
+            key.append((pokemon.species, -int(-pokemon.hp * hp_buckets // 100), pokemon.status.value))
+    for pokemon in (battle_state.get_player_active_mon(), battle_state.get_opponent_active_mon()):
+        key.append((pokemon.atk_boost, pokemon.def_boost, pokemon.special_boost, pokemon.speed_boost))
+    return tuple(key)
+
+
+class SpeculativeAgent(Agent):
+    '''
+    Wraps an agent and precomputes its decisions for the likely outcomes of the
+    turn being played.
+    '''
+    def __init__(self, agent: Agent, player_id: PlayerID = PlayerID.P1, rollouts: int = 8, max_states: int = 16,
+                 hp_buckets: int = 10, seed: Optional[int] = None):
+        self.agent = agent
+        self.me = 0 if player_id == PlayerID.P1 else 1
+        self.rollouts = rollouts
+        self.max_states = max_states
+        self.hp_buckets = hp_buckets
+        self.sim = TurnSimulator(seed)
+        self.cache: Dict[StateKey, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._aborted = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._computing: Optional[StateKey] = None
+
+    def outcomes(self, battle_state: BattleState, action: str) -> List[Tuple[float, BattleState]]:
+        '''
+        Distinct outcomes of playing `action` this turn, most likely first, as
+        (probability, state). Opponent replies are equally likely.
+        '''
+        root = SimState.from_battle_state(battle_state)
+        replies = legal_actions(root, 1 - self.me)
+        counts: Counter = Counter()
+        states: Dict[StateKey, BattleState] = {}
+        for reply in replies:
+            for _ in range(self.rollouts):
+                state = root.copy()
+                joint = (action, action_name(reply)) if self.me == 0 else (action_name(reply), action)
+                self.sim.step(state, *joint)
+                if state.winner is not None:
+                    continue
+                result = copy.deepcopy(battle_state)
+                state.write_to(result)
+                key = state_key(result, self.hp_buckets)
+                counts[key] += 1
+                states.setdefault(key, result)
+        total = len(replies) * self.rollouts
+        return [(n / total, states[key]) for key, n in counts.most_common()]
+
+    def speculate(self, battle_state: BattleState, action: str) -> None:
+        self.cancel()
+        self._join()
+        with self._lock:
+            self.cache.clear()
+        self._stop.clear()
+        self._aborted.clear()
+        self._thread = threading.Thread(target=self._run, args=(battle_state, action), daemon=True)
+        self._thread.start()
+
+    def _run(self, battle_state: BattleState, action: str) -> None:
+        try:
+            outcomes = self.outcomes(battle_state, action)[:self.max_states]
+        except ValueError:
+            return # The sent action is not legal in the simulator, e.g. a stale state
+        for _, state in outcomes:
+            if self._stop.is_set():
+                return
+            key = state_key(state, self.hp_buckets)
+            with self._lock:
+                self._computing = key
+            try:
+                decision = self.agent.choose_action(state)
+            except ValueError as e:
+                print(f"Speculative decision failed: {e}")
+                with self._lock:
+                    self._computing = None
+                continue
+            with self._lock:
+                if not self._aborted.is_set():
+                    # An aborted decision was cut short, do not serve it later
+                    self.cache[key] = decision
+                self._computing = None
+
+    def cancel(self) -> None:
+        '''
+        Stops speculating, cutting the decision in progress short, and cancels the
+        wrapped agent's decision for the current state if there is one. Only
+        signals, the speculation thread ends on its own.
+        '''
+        self._stop.set()
+        self._aborted.set()
+        self.agent.cancel()
+
+    def _join(self) -> None:
+        '''
+        Waits for the cancelled speculation thread. The wrapped agent is cancelled
+        again until it ends: a decision that started after cancel() (the agent
+        resets its cancellation at the start) would otherwise run its full budget.
+        '''
+        thread, self._thread = self._thread, None
+        while thread is not None and thread.is_alive():
+            self.agent.cancel()
+            thread.join(CANCEL_INTERVAL)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        '''
+        Waits for speculation to finish. Returns False on timeout.
+        '''
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def choose_action(self, battle_state: BattleState) -> str:
+        key = state_key(battle_state, self.hp_buckets)
+        with self._lock:
+            cached = self.cache.get(key)
+            pending = key == self._computing
+        if cached is None and pending:
+            # Finish the decision for this very state rather than starting over
+            self._stop.set()
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                thread.join()
+            cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._stop.set()
+            return cached
+        self.misses += 1
+        # The speculative decision is cut short, so the miss costs about one budget
+        self.cancel()
+        self._join()
+        return self.agent.choose_action(battle_state)
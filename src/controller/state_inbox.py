@@ -0,0 +1,117 @@
+import threading
+
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.metrics import get_registry
+
+'''
+    Coalescing inbox of battle states.
+
+    The controller acts on a state long after it was read: the agent thinks for
+    its budget and the buttons take a while to press. When states arrive faster
+    than that, e.g. a backlog flushed after a broker hiccup, acting on each in turn
+    replays obsolete decisions into the game. The inbox keeps only the newest
+    state: a state that arrives while another is waiting replaces it, and a state
+    captured before one already seen is ignored. Both count as dropped.
+
+    States are ordered by the capture time of their trace rather than the frame
+    id, which starts over at 0 whenever the capture node restarts. The capture
+    time is time.monotonic(), one clock for every process on the machine.
+
+    A decision taken from the inbox is superseded once a newer state arrives;
+    `on_superseded` is called at that moment so the agent can stop thinking. It
+    runs on the thread calling put(), the broker's, so it must not block.
+
+    Usage:
+        inbox = StateInbox(on_superseded=agent.cancel)
+        inbox.put(message)              # RabbitMQ callback, returns at once
+        message = inbox.get()           # decision thread, blocks
+        ...
+        if inbox.superseded(): ...      # do not send the action
+'''
+
+Message = Dict[str, Any]
+
+
+def _capture_time(message: Message) -> Optional[float]:
+    trace = message.get("trace")
+    return float(trace["t_capture"]) if trace and "t_capture" in trace else None
+
+
+class StateInbox:
+    def __init__(self, on_superseded: Optional[Callable[[], None]] = None):
+        self.on_superseded = on_superseded
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._pending: Optional[Message] = None
+        self._last_capture: Optional[float] = None
+        self._in_flight = False
+        self._superseded = False
+        self._closed = False
+
+    def put(self, message: Message) -> bool:
+        '''
+        Offers a new state. Returns False if it is older than a state already seen.
+        '''
+        captured = _capture_time(message)
+        with self._condition:
+            if captured is not None and self._last_capture is not None and captured <= self._last_capture:
+                self._drop()
+                return False
+            if captured is not None:
+                self._last_capture = captured
+            if self._pending is not None:
+                self._drop()
+            self._pending = message
+            supersedes = self._in_flight and not self._superseded
+            self._superseded = self._superseded or self._in_flight
+            self._condition.notify()
+        if supersedes and self.on_superseded is not None:
+            self.on_superseded()
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Message]:
+        '''
+        Takes the newest state, waiting for one. Returns None on timeout or once
+        the inbox is closed.
+        '''
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending is not None or self._closed, timeout):
+                return None
+            if self._pending is None:
+                return None
+            message, self._pending = self._pending, None
+            self._in_flight = True
+            self._superseded = False
+            return message
+
+    def superseded(self) -> bool:
+        '''
+        Whether a newer state arrived since the last get().
+        '''
+        with self._condition:
+            return self._superseded
+
+    def done(self) -> None:
+        '''
+        Marks the decision for the last state taken as finished.
+        '''
+        with self._condition:
+            self._in_flight = False
+
+    def discard(self) -> None:
+        '''
+        Counts the last state taken as dropped, its decision was superseded.
+        '''
+        with self._condition:
+            self._in_flight = False
+            self._drop()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        get_registry().inc("controller.dropped_states")
@@ -30,6 +30,21 @@ def load_battle_state_from_yaml(yaml_path: str) -> BattleState:
     return parse_battle_state_from_dict(data)
 
 
+def load_roster_from_yaml(yaml_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load a roster file (config/pokemon.yaml): species name -> type, level, stats
+    and moves.
+
+    Args:
+        yaml_path: Path to the roster YAML file
+
+    Returns:
+        Dictionary of the roster entries, in file order
+    """
+    with open(yaml_path, 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file) or {}
+
+
 def parse_battle_state_from_dict(data: Dict[str, Any]) -> BattleState:
     """
     Parse a BattleState from a dictionary (typically loaded from YAML).
@@ -0,0 +1,306 @@
+"""
+Asyncio-based RabbitMQ listener.
+
+Unlike `listen()` in receive.py, which runs every callback synchronously inside
+`BlockingConnection.start_consuming`, this listener keeps the connection on an
+asyncio event loop and dispatches each delivery as its own task:
+
+- `basic_qos` prefetch is configurable, so the broker keeps several messages in flight.
+- Callbacks run on a WorkerPool of max_workers consumers (blocking ones in an
+  executor), whose per-callback queue wait and run times are in `stats`.
+- Coroutine callbacks are awaited directly on the event loop.
+- Messages are acked only after their callback completes (nacked if it raises).
+- By default, messages on the same topic are handled in arrival order, while
+  different topics are dispatched concurrently. A slow OCR callback therefore no
+  longer stalls delivery on the other topics. `order_key` narrows the ordering,
+  e.g. to one box of the screen, so updates of different boxes run in parallel.
+- Messages on `barrier_topics` (e.g. the camera config) wait for every message
+  received before them, and every message received after waits for them.
+
+Usage:
+    # Same callbacks dict shape as listen()
+    listen_async("image_data", {CONFIG: reader.handle_camera_config,
+                                IMAGE_UPDATE: reader.handle_update_wrapper},
+                 prefetch_count=16, max_workers=4)
+"""
+import asyncio
+import json
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set
+
+import pika
+import pika.channel
+import pika.frame
+import pika.spec
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from src.concurrent.worker_pool import LatencyStats, WorkerPool
+
+
+class AsyncListener:
+    """
+    Consumes messages from a direct exchange and dispatches them concurrently.
+    """
+    def __init__(
+        self,
+        exchange: str,
+        callbacks: Dict[str, Callable[[Dict], None]],
+        prefetch_count: int = 8,
+        max_workers: int = 4,
+        executor: Optional[Executor] = None,
+        preserve_topic_order: bool = True,
+        host: str = 'localhost',
+        order_key: Optional[Callable[[str, Dict], Hashable]] = None,
+        barrier_topics: Iterable[str] = (),
+    ):
+        """
+        Args:
+            exchange: Name of the direct exchange to bind to.
+            callbacks: Mapping of topic names (routing keys) to callbacks. Callbacks
+                may be plain functions (run in the executor) or coroutine functions.
+            prefetch_count: Maximum number of unacked messages the broker delivers at once.
+            max_workers: Maximum number of callbacks running concurrently.
+            executor: Executor for blocking callbacks. Defaults to a ThreadPoolExecutor
+                with `max_workers` threads, which is shut down when the listener stops.
+            preserve_topic_order: If True, messages with the same order key are
+                handled one at a time, in delivery order.
+            host: RabbitMQ host.
+            order_key: Maps (topic, message) to the key messages are ordered by.
+                Defaults to the topic.
+            barrier_topics: Topics whose messages are handled alone, after every
+                earlier message and before every later one.
+        """
+        if prefetch_count < 1:
+            raise ValueError("prefetch_count must be at least 1.")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.exchange = exchange
+        self.callbacks = callbacks
+        self.prefetch_count = prefetch_count
+        self.max_workers = max_workers
+        self.preserve_topic_order = preserve_topic_order
+        self.host = host
+        self.order_key = order_key
+        self.barrier_topics = set(barrier_topics)
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers=max_workers)
+        self._pool: Optional[WorkerPool] = None
+        self._order_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._barrier: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connection: Optional[AsyncioConnection] = None
+        self._channel: Optional[pika.channel.Channel] = None
+        self._closed: Optional[asyncio.Future] = None
+        self._stopping = False
+
+    def _bind_loop(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._pool = WorkerPool(self._call, n_workers=self.max_workers, name="AsyncListener")
+
+    async def run(self) -> None:
+        '''
+        Connects to RabbitMQ and consumes until stop() is called or the connection closes.
+        '''
+        self._bind_loop()
+        self._closed = self._loop.create_future()
+        self._connection = AsyncioConnection(
+            pika.ConnectionParameters(host=self.host),
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_closed,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=self._loop,
+        )
+        try:
+            await self._closed
+        finally:
+            await self.drain()
+            await self._pool.close()
+            if self._owns_executor:
+                self._executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        '''
+        Stops consuming and closes the connection. Safe to call from the event loop thread.
+        '''
+        self._stopping = True
+        if self._connection is not None and not (self._connection.is_closing or self._connection.is_closed):
+            self._connection.close()
+
+    async def drain(self) -> None:
+        '''
+        Waits for every in-flight message to finish processing.
+        '''
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def _on_connection_open(self, connection: AsyncioConnection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_closed(self, _connection: AsyncioConnection, reason: BaseException) -> None:
+        if self._closed is not None and not self._closed.done():
+            if self._stopping:
+                self._closed.set_result(None)
+            else:
+                self._closed.set_exception(
+                    reason if isinstance(reason, BaseException) else ConnectionError(str(reason)))
+
+    def _on_channel_open(self, channel: pika.channel.Channel) -> None:
+        self._channel = channel
+        channel.exchange_declare(
+            exchange=self.exchange,
+            exchange_type='direct',
+            callback=lambda _frame: channel.queue_declare(
+                queue='', exclusive=True, callback=self._on_queue_declared),
+        )
+
+    def _on_queue_declared(self, frame: pika.frame.Method) -> None:
+        queue_name = frame.method.queue
+        for topic in self.callbacks.keys():
+            self._channel.queue_bind(exchange=self.exchange, queue=queue_name, routing_key=topic)
+        self._channel.basic_qos(
+            prefetch_count=self.prefetch_count,
+            callback=lambda _frame: self._start_consuming(queue_name),
+        )
+
+    def _start_consuming(self, queue_name: str) -> None:
+        self._channel.basic_consume(queue=queue_name, on_message_callback=self.on_message, auto_ack=False)
+        print(f" [*] Waiting for messages in topics '{list(self.callbacks.keys())}' "
+              f"(prefetch={self.prefetch_count}, workers={self.max_workers}).")
+
+    def on_message(
+        self,
+        channel: pika.channel.Channel,
+        method_frame: pika.spec.Basic.Deliver,
+        _header_frame: pika.spec.BasicProperties,
+        body: bytes,
+    ) -> None:
+        '''
+        pika delivery callback. Schedules the message for dispatch and returns immediately.
+        '''
+        if self._loop is None:
+            self._bind_loop()
+        # What this message waits for is fixed by the delivery order
+        after = {self._barrier} if self._barrier is not None else set()
+        barrier = method_frame.routing_key in self.barrier_topics
+        if barrier:
+            after |= self._pending
+        task = self._loop.create_task(self._dispatch(channel, method_frame, body, after))
+        if barrier:
+            self._barrier = task
+            task.add_done_callback(self._clear_barrier)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _clear_barrier(self, task: asyncio.Task) -> None:
+        if self._barrier is task:
+            self._barrier = None
+
+    def _lock(self, key: str, message: Dict) -> Optional[asyncio.Lock]:
+        if not self.preserve_topic_order:
+            return None
+        order = self.order_key(key, message) if self.order_key is not None else key
+        lock = self._order_locks.get(order)
+        if lock is None:
+            lock = self._order_locks[order] = asyncio.Lock()
+        return lock
+
+    async def _dispatch(
+        self,
+        channel: pika.channel.Channel,
+        method_frame: pika.spec.Basic.Deliver,
+        body: bytes,
+        after: Set[asyncio.Task] = frozenset(),
+    ) -> None:
+        if after:
+            await asyncio.wait(after)
+        key = method_frame.routing_key
+        callback = self.callbacks.get(key)
+        try:
+            if callback is not None:
+                message = json.loads(body.decode('utf-8'))
+                lock = self._lock(key, message)
+                if lock is not None:
+                    async with lock:
+                        await self._run_callback(callback, message)
+                else:
+                    await self._run_callback(callback, message)
+        except Exception as e:
+            print(f"Error handling message on topic '{key}': {e}")
+            channel.basic_nack(delivery_tag=method_frame.delivery_tag, requeue=False)
+            return
+        channel.basic_ack(delivery_tag=method_frame.delivery_tag)
+
+    @property
+    def stats(self) -> LatencyStats:
+        '''
+        Queue wait and run time of the callbacks.
+        '''
+        return self._pool.stats
+
+    async def _call(self, job) -> None:
+        callback, message, done = job
+        try:
+            if asyncio.iscoroutinefunction(callback):
+                await callback(message)
+            else:
+                await self._loop.run_in_executor(self._executor, callback, message)
+        except Exception as e:
+            self._pool.stats.errors += 1
+            done.set_exception(e)
+        else:
+            done.set_result(None)
+
+    async def _run_callback(self, callback: Callable[[Dict], None], message: Dict) -> None:
+        done = self._loop.create_future()
+        await self._pool.put((callback, message, done))
+        await done
+
+
+def listen_async(
+    exchange: str,
+    callbacks: Dict[str, Callable[[Dict], None]],
+    prefetch_count: int = 8,
+    max_workers: int = 4,
+    executor: Optional[Executor] = None,
+    preserve_topic_order: bool = True,
+    order_key: Optional[Callable[[str, Dict], Hashable]] = None,
+    barrier_topics: Iterable[str] = (),
+) -> None:
+    """
+    Drop-in replacement for `listen()` that dispatches callbacks concurrently.
+    Blocks until interrupted.
+
+    Args:
+        exchange: Name of the direct exchange to bind to.
+        callbacks: A dictionary mapping topic names to callback functions.
+        prefetch_count: Maximum number of unacked messages in flight.
+        max_workers: Maximum number of callbacks running concurrently.
+        executor: Optional executor for blocking callbacks.
+        preserve_topic_order: Handle messages of the same order key one at a time.
+        order_key: Maps (topic, message) to the key messages are ordered by.
+        barrier_topics: Topics whose messages are handled alone, in delivery order.
+    """
+    listener = AsyncListener(
+        exchange,
+        callbacks,
+        prefetch_count=prefetch_count,
+        max_workers=max_workers,
+        executor=executor,
+        preserve_topic_order=preserve_topic_order,
+        order_key=order_key,
+        barrier_topics=barrier_topics,
+    )
+
+    async def _main():
+        try:
+            await listener.run()
+        except asyncio.CancelledError:
+            listener.stop()
+            await listener.drain()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        print("Exiting...")
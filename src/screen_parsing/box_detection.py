@@ -5,6 +5,7 @@ from typing import List, Tuple, Sequence, Optional
 
 from src.state.pokestate_defs import ImageUpdate, Rectangle, PlayerID, MessageType
 from src.utils.box_average_filter import BoxAverageFilter
+from src.utils.metrics import timed, timer
 
 # Constants for box detection
 # Ratios for different boxes
@@ -132,7 +133,8 @@ class BoxDetection:
         blurred = cv2.GaussianBlur(normalized_img, (5,5), 1.0)  # Apply median blur to the image
         # Perform Canny edge detection on the input image
         # edges = cv2.Canny(blurred, threshold1=120, threshold2=300)
-        edges = cv2.Canny(blurred, threshold1=100, threshold2=300)
+        with timer("box_detection.canny"):
+            edges = cv2.Canny(blurred, threshold1=100, threshold2=300)
 
         morphed_img = _apply_morphology(edges, kernel_size=(3, 3))  # Apply morphology to enhance edges
 
@@ -149,6 +151,7 @@ class BoxDetection:
         contours_unique = _filter_unique_contours(contours_filtered, min_iou=0.3)
         return contours_unique
 
+    @timed("box_detection.update")
     def update(self, input_img: np.ndarray) -> Sequence[ImageUpdate]:
         contours_unique = self._detect_contours(input_img)
         ratio_shift = 1.0 # Ratio shift to account for different screen sizes or resolutions
@@ -1,6 +1,7 @@
 from typing import Sequence, Optional
 
 from src.state.pokestate_defs import StadiumMode, ImageUpdate, MessageType, PlayerID
+from src.utils.metrics import timed
 
 class StadiumModeParser: 
     """Parses the stadium mode from the box updates.
@@ -8,6 +9,7 @@ class StadiumModeParser:
     def __init__(self):
         self.prev_mode = StadiumMode.INVALID
 
+    @timed("stadium_mode.parse")
     def parse(self, box_updates: Sequence[ImageUpdate]) -> Optional[StadiumMode]:
         """Parses the stadium mode from the box updates.
         
@@ -1,6 +1,7 @@
 from typing import Sequence
 
 from src.state.pokestate_defs import ImageUpdate, MessageType
+from src.utils.metrics import timed
 from .stadium_mode import StadiumMode, PlayerID
 
 '''
@@ -44,6 +45,7 @@ class UpdateProcessor:
             self.done = False
         self.mode = mode
 
+    @timed("update_processor.process_updates")
     def process_updates(self, updates: Sequence[ImageUpdate], i_frame: int) -> Sequence[ImageUpdate]:
         if self.mode == StadiumMode.CHOOSE_MOVE:
             for update in updates:
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Tuple
+from typing import Tuple, Optional
 
 import numpy as np
 
+from src.utils.tracing import TraceContext
+
 class Status(Enum):
     NONE = 0
     POISONED = 1
@@ -64,10 +66,12 @@ class Rectangle:
     - ROI : cv2.Rectangle of the section to analyze
     - StadiumMode : Enum Which mode the game is in for that frame
     - player_id : ID of the player that is currently being analyzed. Imporatant for which side to update.
+    - trace : Frame ID and capture timestamp, for latency tracing
 '''
 @dataclass
 class ImageUpdate:
     image: np.ndarray
     roi: Rectangle
     message_type: MessageType
-    player_id: PlayerID
\ No newline at end of file
+    player_id: PlayerID
+    trace: Optional[TraceContext] = None
\ No newline at end of file
@@ -5,6 +5,7 @@ from rapidfuzz import process, fuzz
 from src.state.pokestate_defs import Status
 from src.state.pokestate import MoveState, BattleState
 from src.state.gen1_moves import TRAPPING_MOVES, TWO_TURN_MOVES, normalize_move_name
+from src.utils.metrics import timed
 
 
 class Messages(Enum):
@@ -112,6 +113,7 @@ SWITCHOUT = [
     "Do it! {}!",
 ]
 
+@timed("phrases.parse_update_message")
 def parse_update_message(message: str, battle_state: BattleState, opponent: bool = False):
     message_map: Dict[str, Optional[Tuple]] = {m: None for m in no_effect_messages}
     message_map.update(actor_effect_messages)
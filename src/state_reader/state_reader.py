@@ -1,8 +1,10 @@
+import threading
+
 from asyncio import Queue
 from copy import copy
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 
 import numpy as np
 
@@ -15,7 +17,10 @@ from src.state_reader.hp_reader import get_hp
 from src.utils.shared_image_list import SharedImageList
 from src.utils.serialization import deserialize_image_update
 from src.utils.battle_state_serialization import BattleStateSerializer
-from src.rabbitmq.receive import listen
+from src.utils.tracing import span, enable_trace_dump
+from src.utils.metrics import start_metrics_reporting
+from src.utils.profiling import install_profiler_signal
+from src.rabbitmq.async_receive import listen_async
 from src.rabbitmq.send import publish_message_to_topic
 from src.rabbitmq.topics import CONFIG, IMAGE_UPDATE, BATTLE_STATE_UPDATE, CONTROLLER_EXCHANGE
     
@@ -28,6 +33,8 @@ class BattleStateUpdate:
             self._state = create_default_battle_state()
         else:
             self._state = battle_state
+        # Updates of different boxes are read concurrently, only applying them is serialized
+        self.lock = threading.Lock()
 
     def get_active_pokemon(self, player_id: PlayerID) -> PokemonState:
         if player_id == PlayerID.P1:
@@ -48,6 +55,10 @@ class BattleStateUpdate:
 '''
 class BattleConditionReader:
     updated: bool = False
+
+    def __init__(self):
+        # (text, opponent, change) of the messages read since the last take_messages()
+        self.messages: List[Tuple[str, bool, Optional[Tuple]]] = []
     
     '''
         Update the battle condition based on the condition message.
@@ -55,14 +66,24 @@ class BattleConditionReader:
     def update_condition(self, battle_state: BattleStateUpdate, message: str, pid: PlayerID) -> None:
         opponent = pid != PlayerID.P1
         state = battle_state.get_state()
-        change = parse_update_message(message, state, opponent)
-        if change is None:
-            print(f"No change parsed from message: {message}")
-        else:
-            print(f"Applying change: {change} for player {pid}")
-            # Apply the changes to the battle state
-            enact_changes(state, change, opponent)
-            self.updated = True
+        with battle_state.lock:
+            change = parse_update_message(message, state, opponent)
+            self.messages.append((message, opponent, change))
+            if change is None:
+                print(f"No change parsed from message: {message}")
+            else:
+                print(f"Applying change: {change} for player {pid}")
+                # Apply the changes to the battle state
+                enact_changes(state, change, opponent)
+                self.updated = True
+
+    '''
+        Returns the messages read since the last call and forgets them.
+        Called under the BattleStateUpdate lock.
+    '''
+    def take_messages(self) -> List[Tuple[str, bool, Optional[Tuple]]]:
+        messages, self.messages = self.messages, []
+        return messages
         
 
     
@@ -119,7 +140,8 @@ class PlayerHPReader:
         # TODO: Have some filtering on the read HP
         state = battle_state.get_state()
         opponent = update.player_id != PlayerID.P1
-        enact_changes(state, ("actor","hp",hp), opponent)
+        with battle_state.lock:
+            enact_changes(state, ("actor","hp",hp), opponent)
         self.updated = True
 
     
@@ -154,15 +176,21 @@ class StateReader:
         if update is None:
             print("Failed to deserialize ImageUpdate, skipping.")
             return
-        self.handle_update(update)
+        with span(f"read_{update.message_type.name.lower()}", update.trace):
+            self.handle_update(update)
         # This is assuming the HP update is before a decision needs to be made.
         # TODO: Find another way to handle this.
         if update.message_type == MessageType.HP:
-            publish_message_to_topic(
-                exchange=CONTROLLER_EXCHANGE,
-                topic=BATTLE_STATE_UPDATE,
-                message=self.serializer.to_dict(self.state.get_state())
-            )
+            with span("publish_battle_state", update.trace):
+                with self.state.lock:
+                    # The battle messages go along, so the controller's opponent belief sees them
+                    message = self.serializer.to_dict(self.state.get_state(), trace=update.trace,
+                                                      messages=self.condition_reader.take_messages())
+                publish_message_to_topic(
+                    exchange=CONTROLLER_EXCHANGE,
+                    topic=BATTLE_STATE_UPDATE,
+                    message=message
+                )
 
     def handle_camera_config(self, config: Dict[str, str]):
         self.shm = SharedImageList(config, create=False)
@@ -186,6 +214,13 @@ class StateReader:
     
     
 
+def image_update_order_key(topic: str, message: Dict[str, str]) -> Tuple[str, str, str]:
+    '''
+    Updates of the same box are handled in order, different boxes concurrently.
+    '''
+    return topic, message.get("player_id", ""), message.get("message_type", "")
+
+
 if __name__ == "__main__":
     from src.params.yaml_parser import load_battle_state_from_yaml
 
@@ -195,13 +230,35 @@ if __name__ == "__main__":
     def parse_args():
         parser = ArgumentParser(description="Reads state from continuous updates")
         parser.add_argument('--config', type=str, default='config/example.yaml', help='Path to the configuration YAML file')
+        parser.add_argument('--prefetch', type=int, default=16, help='Number of unacked messages to prefetch from RabbitMQ')
+        parser.add_argument('--workers', type=int, default=4, help='Maximum number of updates handled concurrently')
+        parser.add_argument('--shm-config', type=str, default=None, help='JSON camera config of the frame ring to attach to at startup')
+        parser.add_argument('--trace-out', type=str, default=None, help='Write per-frame latency spans to this JSONL file on exit')
+        parser.add_argument('--metrics-port', type=int, default=None, help='Serve per-stage metrics on http://127.0.0.1:<port>/metrics')
+        parser.add_argument('--metrics-interval', type=float, default=None, help='Log a per-stage metrics summary every N seconds')
+        parser.add_argument('--profile', choices=['sample', 'cprofile'], default=None,
+                            help='Start profiling immediately (toggle with SIGUSR1). cprofile only sees the main thread, '
+                                 'not the updates handled on the worker threads')
+        parser.add_argument('--profile-dir', type=str, default='profiles', help='Directory profiles are written to')
         return parser.parse_args()
 
     args = parse_args()
+    if args.trace_out:
+        enable_trace_dump(args.trace_out)
+    start_metrics_reporting(port=args.metrics_port, interval=args.metrics_interval)
+    install_profiler_signal(mode=args.profile or 'sample', out_dir=args.profile_dir, start=args.profile is not None)
     battle_state = load_battle_state_from_yaml(args.config)
     reader = StateReader(battle_state)
+    if args.shm_config:
+        # Started by the launcher: the ring exists already, so a restarted reader
+        # does not have to wait for the capture node to publish its config again
+        import json
+        reader.handle_camera_config(json.loads(args.shm_config))
     callbacks = {
         CONFIG: reader.handle_camera_config,
         IMAGE_UPDATE: reader.handle_update_wrapper        
     }
-    listen("image_data", callbacks)
+    # The camera config is applied before any later update, and updates are
+    # ordered per box (player and message type) so OCR of different boxes overlaps
+    listen_async("image_data", callbacks, prefetch_count=args.prefetch, max_workers=args.workers,
+                 order_key=image_update_order_key, barrier_topics=(CONFIG,))
@@ -4,8 +4,10 @@ State updater module for applying parsed changes to the battle state.
 from typing import Optional, Tuple
 from src.state.pokestate import BattleState, PokemonState
 from src.state.pokestate_defs import Status
+from src.utils.metrics import timed
 
 
+@timed("state_updater.enact_changes")
 def enact_changes(battle_state: BattleState, changes: Optional[Tuple], opponent: bool = False) -> None:
     """
     Apply parsed changes to the battle state.
@@ -71,8 +73,10 @@ def enact_changes(battle_state: BattleState, changes: Optional[Tuple], opponent:
         if target == "actor":
             if opponent:
                 battle_state.opponent_active_mon = value
+                battle_state.opponent_team.pk_list[value].revealed = True
             else:
                 battle_state.player_active_mon = value
+                battle_state.player_team.pk_list[value].revealed = True
         else:
             print(f"Warning: Switch target '{target}' not supported")
     elif property_name in ["attack_boost", "defense_boost", "special_boost", "speed_boost"]:
@@ -9,8 +9,11 @@ if sys.platform.startswith('win'):
 
 from typing import Tuple, Optional, List
 
+from src.utils.metrics import timed, timer
+
 i=0
 
+@timed("tesseract.read_text_from_roi")
 def read_text_from_roi(
     image: np.ndarray,
     roi: Tuple[Tuple[int, int], Tuple[int, int]],
@@ -59,7 +62,8 @@ def read_text_from_roi(
 
     # Read text using Tesseract
     try:
-        raw_text = pytesseract.image_to_string(roi_image, config=tesseract_config)
+        with timer("tesseract.image_to_string"):
+            raw_text = pytesseract.image_to_string(roi_image, config=tesseract_config)
         # Clean up the text
         lines = raw_text.strip().splitlines()
         matches = []
@@ -10,6 +10,9 @@ Key Features:
 - Preserves all battle state metadata (active Pokemon, stats, conditions)
 - Supports both convenience functions and class-based approach
 - Handles nested structures (BattleState -> TeamState -> PokemonState -> MoveState)
+- Optionally carries the TraceContext of the frame the state was read from
+- Optionally carries the battle messages read since the last published state,
+  with the change parsed from each
 
 Usage:
     # Quick serialization
@@ -22,11 +25,13 @@ Usage:
     restored = serializer.from_dict(data)
 """
 
-from typing import Dict, List, Optional, Any
+from enum import Enum
+from typing import Dict, List, Optional, Any, Tuple
 import json
 
 from src.state.pokestate import BattleState, TeamState, PokemonState, MoveState
 from src.state.pokestate_defs import Status, MessageType, PlayerID
+from src.utils.tracing import TraceContext
 
 
 class BattleStateSerializer:
@@ -34,22 +39,34 @@ class BattleStateSerializer:
     Serializes BattleState objects to/from JSON format.
     """
     
-    def to_dict(self, battle_state: BattleState) -> Dict[str, Any]:
+    def to_dict(self, battle_state: BattleState, trace: Optional[TraceContext] = None,
+                messages: Optional[List[Tuple[str, bool, Optional[Tuple]]]] = None) -> Dict[str, Any]:
         """
         Convert BattleState to JSON-serializable dictionary.
         
         Args:
             battle_state: BattleState instance to serialize
+            trace: Optional trace context of the frame this state was read from
+            messages: Optional (text, opponent, change) of the battle messages read
+                      since the last state, change being None when none was parsed
         
         Returns:
             Dictionary containing serialized BattleState data
         """
-        return {
+        data = {
             "player_active_mon": battle_state.player_active_mon,
             "opponent_active_mon": battle_state.opponent_active_mon,
             "player_team": self._serialize_team_state(battle_state.player_team),
             "opponent_team": self._serialize_team_state(battle_state.opponent_team)
         }
+        if trace is not None:
+            data["trace"] = trace.to_dict()
+        if messages is not None:
+            data["messages"] = [
+                {"text": text, "opponent": opponent, "change": self._serialize_change(change)}
+                for text, opponent, change in messages
+            ]
+        return data
     
     def from_dict(self, data: Dict[str, Any]) -> BattleState:
         """
@@ -68,6 +85,28 @@ class BattleStateSerializer:
             opponent_team=self._deserialize_team_state(data["opponent_team"])
         )
     
+    def trace_from_dict(self, data: Dict[str, Any]) -> Optional[TraceContext]:
+        """
+        Extract the trace context from a serialized BattleState, if present.
+        """
+        return TraceContext.from_dict(data.get("trace"))
+
+    def messages_from_dict(self, data: Dict[str, Any]) -> List[Tuple[str, bool, Optional[Tuple]]]:
+        """
+        Extract the (text, opponent, change) battle messages of a serialized BattleState.
+        Enum values of the changes come back as their values.
+        """
+        return [
+            (m["text"], m["opponent"], tuple(m["change"]) if m["change"] is not None else None)
+            for m in data.get("messages", [])
+        ]
+
+    def _serialize_change(self, change: Optional[Tuple]) -> Optional[List[Any]]:
+        """Serialize a parsed (target, property, value) change to a list."""
+        if change is None:
+            return None
+        return [v.value if isinstance(v, Enum) else v for v in change]
+    
     def _serialize_team_state(self, team_state: TeamState) -> Dict[str, Any]:
         """Serialize TeamState to dictionary."""
         return {
@@ -0,0 +1,241 @@
+"""
+Pipeline Metrics Module
+
+Always-on counters and latency histograms for the vision pipeline stages.
+Unlike tracing (src.utils.tracing), which follows individual frames, metrics are
+aggregated in-process and cheap enough to leave enabled (one dict lookup and a
+bisect per observation).
+
+The metrics can be exposed as:
+- a plain-text HTTP endpoint (`GET /metrics`), or
+- a periodic log line.
+
+Usage:
+    @timed("box_detection.update")
+    def update(self, input_img): ...
+
+    with timer("box_detection.canny"):
+        edges = cv2.Canny(...)
+
+    start_metrics_reporting(port=9100, interval=10.0)
+    # curl localhost:9100/metrics
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, Optional, TypeVar, Any
+
+# Histogram bucket upper bounds, in seconds (50us to ~26s, x2 per bucket)
+DEFAULT_BUCKETS = tuple(50e-6 * 2 ** i for i in range(20))
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations in seconds.
+    """
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-th quantile (0-1) as the upper bound of the bucket containing it.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= rank and n > 0:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of named counters and histograms.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns a copy of the current values. Histogram times are in seconds.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: {
+                        "count": h.count,
+                        "mean": h.mean,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                        "max": h.max,
+                    }
+                    for name, h in self.histograms.items()
+                },
+            }
+
+    def format_text(self) -> str:
+        """
+        Formats the metrics as `name{stat="..."} value` lines (times in milliseconds).
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name}_total {value}")
+        for name, stats in sorted(snapshot["histograms"].items()):
+            lines.append(f"{name}_count {stats['count']}")
+            for stat in ("mean", "p50", "p95", "p99", "max"):
+                lines.append(f'{name}_ms{{stat="{stat}"}} {stats[stat] * 1000.0:.3f}')
+        return "\n".join(lines) + "\n"
+
+    def format_log_line(self) -> str:
+        """
+        One-line summary: calls and p50/p95 (ms) per stage.
+        """
+        snapshot = self.snapshot()
+        parts = [
+            f"{name}: n={stats['count']} p50={stats['p50'] * 1000.0:.2f} p95={stats['p95'] * 1000.0:.2f}"
+            for name, stats in sorted(snapshot["histograms"].items())
+        ]
+        return "[metrics] " + " | ".join(parts)
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _default_registry
+
+
+def timer(name: str) -> Any:
+    """
+    Context manager recording the duration of the enclosed block in the default registry.
+    """
+    return _default_registry.timer(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """
+    Decorator recording the call count and duration of a function in the default registry.
+    """
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _default_registry.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = _default_registry
+
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.format_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Don't log every scrape
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """
+    Serves the registry as text on http://host:port/metrics from a daemon thread.
+    Use port 0 to pick a free port (see server.server_address).
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or _default_registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def log_metrics_periodically(interval: float, registry: Optional[MetricsRegistry] = None,
+                             log: Callable[[str], None] = print) -> threading.Event:
+    """
+    Logs a metrics summary line every `interval` seconds from a daemon thread.
+
+    Returns:
+        Event that stops the logger when set
+    """
+    target = registry or _default_registry
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            log(target.format_log_line())
+
+    threading.Thread(target=run, name="metrics-log", daemon=True).start()
+    return stop
+
+
+def start_metrics_reporting(port: Optional[int] = None, interval: Optional[float] = None) -> None:
+    """
+    Starts whichever reporters are configured. Both arguments are optional.
+    """
+    if port is not None:
+        server = serve_metrics(port)
+        print(f"Serving metrics on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    if interval:
+        log_metrics_periodically(interval)
@@ -0,0 +1,184 @@
+"""
+Runtime Profiling Module
+
+Profilers that can be switched on and off in a running node, without a debugger:
+
+- "sample": a background thread samples the stacks of every thread every few
+  milliseconds. Works for callbacks running in executor threads. Output is in
+  collapsed-stack format (one `frame;frame;frame count` line per stack), which
+  flamegraph.pl / speedscope can read.
+- "cprofile": deterministic cProfile of the thread that enabled it. Output is a
+  .prof file for pstats / snakeviz. The signal handler runs on the main thread,
+  so callbacks running in worker threads (e.g. the state reader's OCR) are not
+  profiled; use "sample" for those nodes.
+
+A profile still running when the process exits is written at exit.
+
+Usage:
+    # Toggle with `kill -USR1 <pid>`; each stop writes a profile to out_dir
+    install_profiler_signal(mode="sample", out_dir="profiles")
+
+    # Or start profiling right away (e.g. from a --profile flag)
+    install_profiler_signal(mode="sample", out_dir="profiles", start=True)
+"""
+
+import atexit
+import cProfile
+import os
+import signal
+import sys
+import threading
+import time
+
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the Python stacks of all threads (except its own).
+    """
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def top_functions(self, n: int = 15) -> str:
+        """
+        Returns the functions that appear most often at the top of the sampled stacks.
+        """
+        leaf_counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaf_counts.values()) or 1
+        return "\n".join(
+            f"{100.0 * count / total:6.2f}%  {name}" for name, count in leaf_counts.most_common(n)
+        )
+
+
+class ProfilerToggle:
+    """
+    Starts/stops a profiler and writes its output to `out_dir` each time it is stopped.
+    """
+    def __init__(self, mode: str = "sample", out_dir: str = "profiles", interval: float = 0.005):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        self.mode = mode
+        self.out_dir = out_dir
+        self.interval = interval
+        self._sampler: Optional[SamplingProfiler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None or self._cprofile is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if self.mode == "sample":
+            self._sampler = SamplingProfiler(self.interval)
+            self._sampler.start()
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        print(f"Profiler ({self.mode}) started.")
+
+    def stop(self) -> Optional[str]:
+        """
+        Stops profiling and writes the profile.
+
+        Returns:
+            Path of the written profile, or None if the profiler was not running
+        """
+        if not self.running:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self._sampler is not None:
+            self._sampler.stop()
+            path = os.path.join(self.out_dir, f"{os.getpid()}-{stamp}.collapsed")
+            self._sampler.write_collapsed(path)
+            print(self._sampler.top_functions())
+            self._sampler = None
+        else:
+            self._cprofile.disable()
+            path = os.path.join(self.out_dir, f"{os.getpid()}-{stamp}.prof")
+            self._cprofile.dump_stats(path)
+            self._cprofile = None
+        print(f"Profiler ({self.mode}) stopped, wrote {path}")
+        return path
+
+    def toggle(self, *_args) -> None:
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+
+def install_profiler_signal(
+    mode: str = "sample",
+    out_dir: str = "profiles",
+    start: bool = False,
+    signum: Optional[int] = None,
+) -> ProfilerToggle:
+    """
+    Installs a signal handler (SIGUSR1 by default) that toggles the profiler, and
+    writes the profile of a profiler still running at exit. Must be called from the
+    main thread. On platforms without SIGUSR1, only `start` applies.
+
+    Args:
+        mode: "sample" or "cprofile"
+        out_dir: Directory to write profiles to
+        start: Start profiling immediately
+        signum: Signal that toggles profiling
+    """
+    toggle = ProfilerToggle(mode=mode, out_dir=out_dir)
+    if signum is None:
+        signum = getattr(signal, "SIGUSR1", None)
+    if signum is not None:
+        signal.signal(signum, toggle.toggle)
+        print(f"Profiler ({mode}) toggled by signal {signum} (pid {os.getpid()}).")
+    atexit.register(toggle.stop)
+    if start:
+        toggle.start()
+    return toggle
@@ -7,7 +7,7 @@ instances to/from JSON-compatible dictionaries for storage, transmission, or cac
 
 Key Features:
 - Converts numpy image arrays to indices for use with SharedImageList
-- Preserves all ImageUpdate metadata (ROI, message type, player ID)
+- Preserves all ImageUpdate metadata (ROI, message type, player ID, trace context)
 - Supports both convenience functions and class-based approach
 - Handles cases where SharedImageList is not available
 
@@ -30,6 +30,7 @@ import numpy as np
 
 from ..state.pokestate_defs import ImageUpdate, Rectangle, MessageType, PlayerID
 from .shared_image_list import SharedImageList
+from .tracing import TraceContext
 
 
 class ImageUpdateSerializer:
@@ -69,7 +70,7 @@ class ImageUpdateSerializer:
             # If no SharedImageList is available, we'll store minimal image metadata
             image_index = -1  # Indicates image is not stored in shared memory
         
-        return {
+        data = {
             "image_index": str(image_index),
             "image_dtype": str(image_update.image.dtype) if image_update.image is not None else "",
             "x1": str(image_update.roi.x1),
@@ -79,6 +80,10 @@ class ImageUpdateSerializer:
             "message_type": str(image_update.message_type.value),
             "player_id": str(image_update.player_id.value)
         }
+        if image_update.trace is not None:
+            data["frame_id"] = str(image_update.trace.frame_id)
+            data["t_capture"] = repr(image_update.trace.t_capture)
+        return data
     
     def from_dict(self, data: Dict[str, str]) -> ImageUpdate:
         """
@@ -117,7 +122,8 @@ class ImageUpdateSerializer:
             image=image,
             roi=roi,
             message_type=message_type,
-            player_id=player_id
+            player_id=player_id,
+            trace=TraceContext.from_dict(data)
         )
     
     def set_shared_image_list(self, shared_image_list: SharedImageList):
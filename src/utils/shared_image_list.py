@@ -1,12 +1,34 @@
+import sys
+
 import numpy as np
 
-from multiprocessing import shared_memory
+from multiprocessing import resource_tracker, shared_memory
 from typing import Dict
 
 
+def unlink_segment(name: str) -> bool:
+    '''
+    Removes the shared memory segment `name`, e.g. one leaked by a crashed run.
+    Returns False if there was none.
+    '''
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=False)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    shm.unlink()
+    return True
+
+
 class SharedImageList:
+    '''
+    Ring of n_shmem_frames images in shared memory. Only the creator owns the
+    segment: processes that attach (create=False) never unlink it, so a consumer
+    exiting does not pull the ring from under the others.
+    '''
     def __init__(self, camera_config: Dict[str, str], create: bool = True):
         self.camera_config = camera_config
+        self.owner = create
         try:
             self.memory = self._load_memory_from_config(camera_config, create=create)
         except FileNotFoundError:
@@ -24,7 +46,13 @@ class SharedImageList:
         )
         dtype = np.dtype(config['dtype'])
         n_bytes = int(np.prod(image_shape)) * dtype.itemsize
-        self.shm = shared_memory.SharedMemory(create=create, name=config['name'], size=n_bytes)
+        if create or sys.version_info < (3, 13):
+            self.shm = shared_memory.SharedMemory(create=create, name=config['name'], size=n_bytes)
+            if not create:
+                # Before 3.13 attaching registers the segment, and the resource tracker unlinks it at exit
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        else:
+            self.shm = shared_memory.SharedMemory(create=False, name=config['name'], size=n_bytes, track=False)
         self.buffer = np.ndarray(
              image_shape,
             dtype=dtype,
@@ -44,4 +72,17 @@ class SharedImageList:
     @property 
     def current_index(self) -> int:
         return self._i
+
+    def close(self) -> None:
+        '''
+        Detaches from the segment, and removes it if this list created it.
+        '''
+        self.buffer = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+            self.owner = False
         
\ No newline at end of file
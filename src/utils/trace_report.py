@@ -0,0 +1,67 @@
+"""
+Summarizes span files written by src.utils.tracing.
+
+Usage:
+    python -m src.utils.trace_report traces/*.jsonl
+"""
+
+import json
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Any
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_spans(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    spans = []
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    spans.append(json.loads(line))
+    return spans
+
+
+def summarize(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Computes count, mean and p50/p95/p99 durations (in milliseconds) per stage.
+    """
+    durations = defaultdict(list)
+    for record in spans:
+        durations[record["stage"]].append(record["duration"])
+    summary = {}
+    for stage, values in durations.items():
+        values_ms = np.asarray(values, dtype=np.float64) * 1000.0
+        p = np.percentile(values_ms, PERCENTILES)
+        summary[stage] = {
+            "count": len(values_ms),
+            "mean": float(values_ms.mean()),
+            **{f"p{q}": float(v) for q, v in zip(PERCENTILES, p)},
+        }
+    return summary
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'stage':<24}{'count':>8}{'mean':>10}" + "".join(f"{f'p{q}':>10}" for q in PERCENTILES)
+    lines = [header, "-" * len(header)]
+    # Slowest stages first
+    for stage, stats in sorted(summary.items(), key=lambda kv: -kv[1]["p50"]):
+        lines.append(
+            f"{stage:<24}{stats['count']:>8}{stats['mean']:>10.2f}"
+            + "".join(f"{stats[f'p{q}']:>10.2f}" for q in PERCENTILES)
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Print per-stage latency percentiles (ms) from trace JSONL files")
+    parser.add_argument('paths', nargs='+', help='Trace JSONL files written by the pipeline nodes')
+    args = parser.parse_args()
+
+    print(format_summary(summarize(load_spans(args.paths))))
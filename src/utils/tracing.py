@@ -0,0 +1,134 @@
+"""
+Frame Tracing Module
+
+Lightweight latency tracing from frame capture to controller command.
+
+Each captured frame gets a TraceContext (frame ID + monotonic capture timestamp)
+which travels with the ImageUpdate and BattleState messages. Every stage that
+handles the frame records a span (stage name, start, duration) into a local
+in-memory ring buffer, which can be dumped to JSONL and summarized with
+`python -m src.utils.trace_report`.
+
+Timestamps come from time.monotonic(). On Linux this is CLOCK_MONOTONIC, which is
+shared by all processes on the host, so spans from different nodes can be
+compared against the capture timestamp.
+
+Usage:
+    trace = TraceContext.new(frame_id)
+    with span("box_detection", trace):
+        updates = box_detection.update(frame)
+
+    # At the end of the pipeline
+    record_since_capture("end_to_end", trace)
+
+    # Dump this process' spans when it exits
+    enable_trace_dump("traces/controller.jsonl")
+"""
+
+import atexit
+import json
+import os
+import time
+
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, List, Optional
+
+
+@dataclass
+class TraceContext:
+    frame_id: int
+    t_capture: float # time.monotonic() when the frame was captured
+
+    @staticmethod
+    def new(frame_id: int) -> 'TraceContext':
+        return TraceContext(frame_id=frame_id, t_capture=time.monotonic())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"frame_id": self.frame_id, "t_capture": self.t_capture}
+
+    @staticmethod
+    def from_dict(data: Optional[Dict[str, Any]]) -> Optional['TraceContext']:
+        if not data or "frame_id" not in data:
+            return None
+        return TraceContext(frame_id=int(data["frame_id"]), t_capture=float(data["t_capture"]))
+
+
+class SpanSink:
+    """
+    Fixed-size ring buffer of span records. Old spans are evicted once full.
+    """
+    def __init__(self, capacity: int = 65536):
+        self._spans: deque = deque(maxlen=capacity)
+
+    def record(self, stage: str, frame_id: Optional[int], start: float, duration: float) -> None:
+        self._spans.append({
+            "stage": stage,
+            "frame_id": frame_id,
+            "start": start,
+            "duration": duration,
+            "pid": os.getpid(),
+        })
+
+    def spans(self) -> List[Dict[str, Any]]:
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def dump_jsonl(self, path: str) -> int:
+        """
+        Appends all buffered spans to a JSONL file and clears the buffer.
+
+        Returns:
+            Number of spans written
+        """
+        spans = self.spans()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as file:
+            for record in spans:
+                file.write(json.dumps(record) + "\n")
+        self.clear()
+        return len(spans)
+
+
+_default_sink = SpanSink()
+
+
+def get_sink() -> SpanSink:
+    return _default_sink
+
+
+@contextmanager
+def span(stage: str, trace: Optional[TraceContext] = None, sink: Optional[SpanSink] = None) -> Iterator[None]:
+    """
+    Records the duration of the enclosed block as a span for the given stage.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        (sink if sink is not None else _default_sink).record(stage, trace.frame_id if trace else None, start, time.monotonic() - start)
+
+
+def record_since_capture(stage: str, trace: Optional[TraceContext], sink: Optional[SpanSink] = None) -> None:
+    """
+    Records a span from the frame's capture time until now.
+    """
+    if trace is None:
+        return
+    (sink if sink is not None else _default_sink).record(stage, trace.frame_id, trace.t_capture, time.monotonic() - trace.t_capture)
+
+
+def enable_trace_dump(path: str, sink: Optional[SpanSink] = None) -> None:
+    """
+    Dumps the sink to `path` (JSONL) when the process exits.
+    """
+    target = sink if sink is not None else _default_sink
+    atexit.register(lambda: print(f"Wrote {target.dump_jsonl(path)} spans to {path}"))
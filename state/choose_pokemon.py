@@ -53,14 +53,21 @@ def pick_3(your_team: List[str], opposing_team: List[str],
 
 
 if __name__ == "__main__":
+    from analysis.matchup_store import MatchupStore
+    from state.team_selection import TeamSelector
+
     parser = pokemon_parser.PokemonParser("config/pokemon.yaml")
     team1, team2 = choose_random_teams(parser)
     matchup = Matchup(parser.get_pokemon_names())
-    matchup.from_csv("data/nkos.csv")
+    matchup.from_store("data/matchups")
+    selector = TeamSelector.from_store(MatchupStore.load("data/matchups"), parser)
     print(team1)
     print(pick_3(team1, team2, parser, matchup))
+    print(selector.select(team1, team2))
     print(team2)
     print(pick_3(team2, team1, parser, matchup))
+    print(selector.select(team2, team1))
+    print(selector.best_teams(parser=parser))
 
 
     
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+
+import numpy as np
+
+from typing import List, Optional, Sequence, Tuple
+
+from analysis.matchup_store import MatchupStore
+from parse import pokemon_parser
+from state.choose_pokemon import type_criteria
+
+'''
+    Team preview selection.
+
+    Every 1v1 pairing gets a score in (-1, 1) from the nKO matchup table and speed,
+    the same rule as Matchup.favorable_matchup made continuous: the difference in
+    hits needed to KO each other, plus half a hit for the faster Pokemon.
+
+    A pick is a lead and two back Pokemon out of the six at team preview, 60 picks
+    per side. The value of a pick against an opposing pick weighs the lead pairing
+    and how well each side's three answer the other's. All 60 x 60 values are
+    computed as one gather from the pairing scores, giving a zero-sum game whose
+    maximin (pure) or equilibrium (mixed) strategy is the selection.
+
+    best_teams() searches the roster for six Pokemon with the best coverage of the
+    possible opponents, by branch and bound over the strongest candidates.
+
+    Usage:
+        selector = TeamSelector.from_store(MatchupStore.load("data/matchups"), parser)
+        selector.select(your_team, opposing_team)    # [lead, second, third]
+        selector.best_teams(n_best=5)                # [(score, team), ...]
+'''
+
+PICK_SIZE = 3
+LEAD_WEIGHT = 0.4
+
+
+def _picks(team_size: int) -> np.ndarray:
+    '''
+    [team_size * C(team_size - 1, 2), 3] team indices of every pick, lead first.
+    '''
+    picks = []
+    for lead in range(team_size):
+        others = [i for i in range(team_size) if i != lead]
+        picks.extend((lead,) + back for back in itertools.combinations(others, PICK_SIZE - 1))
+    return np.array(picks, dtype=np.int64)
+
+
+def solve_zero_sum(matrix: np.ndarray, iterations: int = 2000) -> Tuple[np.ndarray, np.ndarray, float]:
+    '''
+    Approximate equilibrium of the zero-sum game `matrix` (row player maximizes)
+    by both players running multiplicative weights against each other.
+
+    Returns:
+        (row strategy, column strategy, value of the game)
+    '''
+    rows, cols = matrix.shape
+    eta = np.sqrt(8 * np.log(max(rows, cols)) / iterations)
+    row_gain, col_loss = np.zeros(rows), np.zeros(cols)
+    row_avg, col_avg = np.zeros(rows), np.zeros(cols)
+    for _ in range(iterations):
+        x = np.exp(eta * (row_gain - row_gain.max()))
+        y = np.exp(-eta * (col_loss - col_loss.min()))
+        x /= x.sum()
+        y /= y.sum()
+        row_gain += matrix @ y
+        col_loss += x @ matrix
+        row_avg += x
+        col_avg += y
+    row_avg /= iterations
+    col_avg /= iterations
+    return row_avg, col_avg, float(row_avg @ matrix @ col_avg)
+
+
+class TeamSelector:
+    def __init__(self, names: Sequence[str], nkos: np.ndarray, speeds: np.ndarray, types: Sequence[Tuple]):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.types = list(types)
+        nkos = np.asarray(nkos, dtype=np.float64)
+        speeds = np.asarray(speeds)
+        margin = nkos.T - nkos + 0.5 * np.sign(speeds[:, None] - speeds[None, :])
+        self.scores = np.tanh(margin) # [mine, theirs]
+
+    @staticmethod
+    def from_store(store: MatchupStore, parser: pokemon_parser.PokemonParser) -> 'TeamSelector':
+        names = [name for name in store.names if name in parser.yaml]
+        index = np.array([store.index[name] for name in names], dtype=np.int64)
+        return TeamSelector(
+            names,
+            np.asarray(store.nkos)[np.ix_(index, index)],
+            np.array([parser.get_stat(name, pokemon_parser.Stat.SPD) for name in names]),
+            [parser.type(name) for name in names],
+        )
+
+    def _indices(self, team: Sequence[str]) -> np.ndarray:
+        return np.array([self.index[name] for name in team], dtype=np.int64)
+
+    def game_matrix(self, team: Sequence[str], opposing_team: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Values of every pick of `team` against every pick of `opposing_team`.
+
+        Returns:
+            (matrix [my picks, their picks], my picks, their picks), picks as team indices
+        '''
+        pairs = self.scores[np.ix_(self._indices(team), self._indices(opposing_team))]
+        mine, theirs = _picks(len(team)), _picks(len(opposing_team))
+        lead = pairs[mine[:, 0][:, None], theirs[:, 0][None, :]]
+        # [my pick, my member, their pick, their member]
+        grid = pairs[mine[:, :, None, None], theirs[None, None, :, :]]
+        answers = grid.max(axis=1).mean(axis=-1)
+        threats = (-grid).max(axis=3).mean(axis=1)
+        return LEAD_WEIGHT * lead + (1 - LEAD_WEIGHT) * 0.5 * (answers - threats), mine, theirs
+
+    def strategy(self, team: Sequence[str], opposing_team: Sequence[str],
+                 mixed: bool = True) -> Tuple[List[List[str]], np.ndarray, float]:
+        '''
+        Selection strategy against an opponent who picks knowing ours is a strategy.
+
+        Returns:
+            (picks as names, probability of each pick, value of the game)
+        '''
+        matrix, mine, _ = self.game_matrix(team, opposing_team)
+        if mixed:
+            probabilities, _, value = solve_zero_sum(matrix)
+        else:
+            worst = matrix.min(axis=1)
+            probabilities = (np.arange(len(mine)) == np.argmax(worst)).astype(np.float64)
+            value = float(worst.max())
+        return [[team[i] for i in pick] for pick in mine], probabilities, value
+
+    def select(self, team: Sequence[str], opposing_team: Sequence[str], mixed: bool = True,
+               rng: Optional[np.random.Generator] = None) -> List[str]:
+        '''
+        The pick to bring, lead first: drawn from the equilibrium strategy when mixed,
+        otherwise the maximin pick.
+        '''
+        picks, probabilities, _ = self.strategy(team, opposing_team, mixed)
+        if not mixed:
+            return picks[int(np.argmax(probabilities))]
+        rng = rng if rng is not None else np.random.default_rng()
+        return picks[rng.choice(len(picks), p=probabilities / probabilities.sum())]
+
+    def coverage(self, team: Sequence[str], opponents: Optional[Sequence[str]] = None) -> float:
+        '''
+        Mean over the opponents of the best pairing score any member of team has.
+        '''
+        targets = self._indices(opponents) if opponents is not None else np.arange(len(self.names))
+        return float(self.scores[np.ix_(self._indices(team), targets)].max(axis=0).mean())
+
+    def best_teams(self, n_best: int = 5, team_size: int = 6, candidates: int = 20,
+                   opponents: Optional[Sequence[str]] = None,
+                   parser: Optional[pokemon_parser.PokemonParser] = None) -> List[Tuple[float, List[str]]]:
+        '''
+        The n_best teams by coverage of `opponents` (default: the whole roster).
+
+        Only the `candidates` Pokemon with the best mean pairing score are considered.
+        Branches are cut when even adding the best remaining candidate against every
+        opponent cannot beat the n_best-th team found. With a parser, teams must
+        pass type_criteria.
+        '''
+        targets = self._indices(opponents) if opponents is not None else np.arange(len(self.names))
+        scores = self.scores[:, targets]
+        pool = np.argsort(-scores.mean(axis=1), kind="stable")[:candidates]
+        rows = scores[pool]
+        # suffix[k]: best score of candidates k.. against each opponent
+        suffix = np.maximum.accumulate(rows[::-1], axis=0)[::-1]
+        best: List[Tuple[float, Tuple[int, ...]]] = [] # min-heap of (coverage, members)
+
+        def search(start: int, members: Tuple[int, ...], cover: np.ndarray) -> None:
+            if len(members) == team_size:
+                value = float(cover.mean())
+                if len(best) < n_best:
+                    heapq.heappush(best, (value, members))
+                elif value > best[0][0]:
+                    heapq.heapreplace(best, (value, members))
+                return
+            for k in range(start, len(pool) - (team_size - len(members)) + 1):
+                if len(best) == n_best and np.maximum(cover, suffix[k]).mean() <= best[0][0]:
+                    return # Later candidates are covered by suffix[k] too
+                team = members + (k,)
+                if parser is not None and not type_criteria([self.names[pool[i]] for i in team], parser):
+                    continue
+                search(k + 1, team, np.maximum(cover, rows[k]))
+
+        search(0, (), np.full(len(targets), -1.0))
+        return [(value, [self.names[pool[i]] for i in members]) for value, members in sorted(best, reverse=True)]
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from analysis.damage_tensor import Roster, damage_tensor, ko_tables, parallel_ko_tables
+from parse import pokemon_parser
+from simulate_attack import calc_move_damage, ko_odds
+
+
+def test_damage_tensor_matches_scalar_calc():
+    parser = pokemon_parser.PokemonParser("config/pokemon.yaml")
+    roster = Roster.from_parser(parser)
+    damage = damage_tensor(roster)
+    assert damage.shape == (len(roster.names), len(roster.names), 4, 39)
+    for i, attacker in enumerate(roster.names[:8]):
+        for j, defender in enumerate(roster.names):
+            for m, move_name in enumerate(roster.moves[i]):
+                if not roster.damaging[i, m]:
+                    assert not damage[i, j, m].any()
+                    continue
+                move = pokemon_parser.Move(move_name)
+                strongest = calc_move_damage(move, attacker, defender, {}, {}, parser, calc_strongest=True)
+                weakest = calc_move_damage(move, attacker, defender, {}, {}, parser, calc_weakest=True)
+                assert damage[i, j, m, -1] == strongest
+                assert damage[i, j, m, 0] == weakest
+
+
+def test_ko_tables_match_ko_odds():
+    parser = pokemon_parser.PokemonParser("config/pokemon.yaml")
+    roster = Roster.from_parser(parser)
+    odds = ko_tables(roster, n_hits=4)
+    for i, attacker in enumerate(roster.names[:6]):
+        for j, defender in enumerate(roster.names[::4]):
+            expected = ko_odds(attacker, defender, {}, {}, parser)
+            np.testing.assert_allclose(odds[i, j * 4], expected, atol=1e-9)
+
+
+def test_parallel_ko_tables_match_serial():
+    roster = Roster.from_yaml("config/pokemon.yaml")
+    serial = ko_tables(roster, n_hits=3)
+    parallel = parallel_ko_tables(roster, n_hits=3, workers=2, chunk_size=5, progress=False)
+    np.testing.assert_array_equal(parallel, serial)
+    inline = parallel_ko_tables(roster, n_hits=3, workers=1, chunk_size=7, progress=False)
+    np.testing.assert_array_equal(inline, serial)
+
+
+def test_roster_rejects_more_than_four_moves(tmp_path):
+    path = tmp_path / "roster.yaml"
+    path.write_text('Starmie:\n  type: [Water, Psychic]\n  level: 50\n  stats: [160, 100, 110, 120, 135]\n'
+                    '  moves: ["Surf", "Psychic", "Recover", "Thunderbolt", "Blizzard"]\n')
+    with pytest.raises(ValueError):
+        Roster.from_yaml(str(path))
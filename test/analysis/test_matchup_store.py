@@ -0,0 +1,105 @@
+import json
+import os
+
+import numpy as np
+import yaml
+
+from analysis.matchup_store import update_store
+from src.battle.matchup_store import MatchupStore, version_dir
+import matchups
+from matchups import calc_ko_ranges, Matchup
+
+
+def write_roster(path, roster):
+    with open(path, "w") as file:
+        yaml.safe_dump(roster, file)
+
+
+def load_roster():
+    with open("config/pokemon.yaml") as file:
+        return yaml.safe_load(file)
+
+
+def test_store_matches_csv_tables(tmp_path):
+    store = update_store("config/pokemon.yaml", str(tmp_path))
+    fieldnames, _, _, _, _, nkos = calc_ko_ranges("config/pokemon.yaml")
+    for row in nkos:
+        for defender in fieldnames[1:]:
+            assert store.nko(row["Pokemon"], defender) == row[defender]
+
+    loaded = MatchupStore.load(str(tmp_path))
+    assert isinstance(loaded.odds, np.memmap)
+    np.testing.assert_array_equal(loaded.odds, store.odds)
+
+    matchup = Matchup(loaded.names[:5])
+    matchup.from_store(str(tmp_path))
+    assert matchup.matchup[loaded.names[0]][loaded.names[1]] == loaded.nko(loaded.names[0], loaded.names[1])
+
+
+def test_csv_tables_come_from_the_store(tmp_path, monkeypatch):
+    store = update_store("config/pokemon.yaml", str(tmp_path))
+    expected = calc_ko_ranges("config/pokemon.yaml")
+
+    def recompute(*args, **kwargs):
+        raise AssertionError("the tables are computed again")
+    monkeypatch.setattr(matchups, "parallel_ko_tables", recompute)
+    assert calc_ko_ranges("config/pokemon.yaml", store=store) == expected
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path, capsys):
+    roster = load_roster()
+    roster_path = str(tmp_path / "roster.yaml")
+    store_dir = str(tmp_path / "store")
+    write_roster(roster_path, roster)
+    update_store(roster_path, store_dir)
+
+    # Unchanged roster: nothing is recomputed or rewritten
+    current = version_dir(store_dir)
+    update_store(roster_path, store_dir)
+    assert version_dir(store_dir) == current
+
+    edited = next(iter(roster))
+    roster[edited]["stats"][1] += 40
+    del roster[list(roster)[-1]]
+    write_roster(roster_path, roster)
+    capsys.readouterr()
+    incremental = update_store(roster_path, store_dir)
+    assert f"recomputed 1/{len(roster)}" in capsys.readouterr().out
+
+    full = update_store(roster_path, str(tmp_path / "full"), force=True)
+    assert incremental.names == full.names
+    np.testing.assert_allclose(incremental.odds, full.odds, atol=1e-12)
+    np.testing.assert_array_equal(incremental.nkos, full.nkos)
+
+
+def test_save_swaps_whole_versions(tmp_path):
+    store_dir = str(tmp_path)
+    names = ["Tauros", "Chansey"]
+    first = MatchupStore(names, {}, np.zeros((2, 2, 4)), np.full((2, 2), 5, dtype=np.int8))
+    first.save(store_dir)
+    reader = MatchupStore.load(store_dir)
+    grown = ["Tauros", "Chansey", "Starmie"]
+    MatchupStore(grown, {}, np.ones((3, 3, 4)), np.ones((3, 3), dtype=np.int8)).save(store_dir)
+    # A reader of the old version keeps consistent tables
+    assert reader.names == names and reader.odds.shape == (2, 2, 4) and (reader.nkos == 5).all()
+    loaded = MatchupStore.load(store_dir)
+    assert loaded.names == grown and loaded.odds.shape == (3, 3, 4)
+    MatchupStore(names, {}, np.zeros((2, 2, 4)), np.full((2, 2), 2, dtype=np.int8)).save(store_dir)
+    # The current version and the one before it
+    versions = [entry for entry in os.listdir(store_dir) if entry.startswith("v-")]
+    assert len(versions) == 2 and os.path.basename(version_dir(store_dir)) in versions
+    assert MatchupStore.load(store_dir).nko("Tauros", "Chansey") == 2
+
+
+def test_unversioned_store_still_loads(tmp_path):
+    store_dir = str(tmp_path)
+    store = MatchupStore(["Tauros"], {}, np.zeros((1, 1, 4)), np.full((1, 1), 5, dtype=np.int8))
+    # Files directly in the store directory, as written before versions
+    np.save(os.path.join(store_dir, "odds.npy"), store.odds)
+    np.save(os.path.join(store_dir, "nkos.npy"), store.nkos)
+    with open(os.path.join(store_dir, "index.json"), "w") as file:
+        json.dump({"version": 1, "n_hits": 4, "threshold": 0.6, "names": ["Tauros"], "hashes": {}}, file)
+    assert MatchupStore.load(store_dir).names == ["Tauros"]
+    store.save(store_dir)
+    assert not os.path.exists(os.path.join(store_dir, "odds.npy"))
+    assert MatchupStore.load(store_dir).names == ["Tauros"]
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from src.battle.batch_simulator import (
+    N_ACTIONS, N_MOVES, BatchSimulator, BatchState, VectorBattleEnv, legal_action_mask
+)
+from src.battle.damage import damage_distribution
+from test.battle.test_simulator import battle, default_battle, mon
+
+
+def test_damage_matches_damage_distribution():
+    n = 20000
+    attacker, defender = mon("Tauros", ["Body Slam"]), mon("Starmie", ["Splash"])
+    batch = BatchState.from_battle_states([battle([attacker], [defender])] * n)
+    BatchSimulator(1).step(batch, np.zeros(n, dtype=int), np.zeros(n, dtype=int))
+    dealt = batch.max_hp[:, 1, 0] - batch.hp[:, 1, 0]
+    expected = damage_distribution(attacker, defender, "Body Slam")
+    # The distribution uses the nominal 100% accuracy, the engine the 255/256 of Gen 1
+    assert dealt.mean() == pytest.approx(expected.mean() * 255 / 256, rel=0.01)
+    assert dealt.max() <= expected.max_damage()
+    assert (batch.status[:, 1, 0] == 3).mean() == pytest.approx(0.3, abs=0.02)
+
+
+def test_battles_run_to_completion_with_legal_actions():
+    batch = BatchState.from_battle_states([default_battle()] * 256)
+    sim = BatchSimulator(2)
+    for _ in range(500):
+        if batch.done.all():
+            break
+        for side in (0, 1):
+            mask = legal_action_mask(batch, side)
+            forced = batch.must_switch[:, side]
+            assert not mask[forced, :N_MOVES].any()
+            assert mask.any(axis=1).all()
+        sim.step(batch, sim.random_actions(batch, 0), sim.random_actions(batch, 1))
+    assert batch.done.all()
+    assert set(np.unique(batch.winner)) <= {-1, 0, 1}
+    loser_hp = batch.hp[np.arange(len(batch)), 1 - np.maximum(batch.winner, 0)].sum(axis=1)
+    assert (loser_hp[batch.winner >= 0] == 0).all()
+
+
+def test_same_seed_same_batch():
+    results = []
+    for _ in range(2):
+        batch = BatchState.from_battle_states([default_battle()] * 32)
+        sim = BatchSimulator(9)
+        for _ in range(10):
+            sim.step(batch, sim.random_actions(batch, 0), sim.random_actions(batch, 1))
+        results.append(batch.hp.copy())
+    np.testing.assert_array_equal(results[0], results[1])
+
+
+def test_illegal_switch_raises():
+    batch = BatchState.from_battle_states([default_battle()] * 2)
+    with pytest.raises(ValueError):
+        BatchSimulator(0).step(batch, np.array([N_MOVES + 4, 0]), np.zeros(2, dtype=int))
+
+
+def test_vector_env():
+    env = VectorBattleEnv([default_battle()] * 8, seed=3, max_turns=50)
+    obs = env.reset()
+    assert obs.shape[0] == 8 and obs.dtype == np.float32
+    total_done = 0
+    for _ in range(200):
+        mask = env.action_mask()
+        assert mask.shape == (8, N_ACTIONS)
+        actions = np.argmax(mask, axis=1)
+        obs, reward, done, info = env.step(actions)
+        assert set(np.unique(reward)) <= {-1.0, 0.0, 1.0}
+        assert (reward[~done] == 0).all()
+        total_done += done.sum()
+    assert total_done > 8
+    assert obs.shape == (8, env.reset().shape[1])
+
+
+def test_volatiles_the_engine_drops_are_flagged():
+    confused = default_battle()
+    confused.get_opponent_active_mon().confused = True
+    batch = BatchState.from_battle_states([default_battle(), confused])
+    assert batch.unsupported.tolist() == [False, True]
+    assert batch.take(np.array([1, 0, 1])).unsupported.tolist() == [True, False, True]
+    with pytest.raises(ValueError, match="confusion"):
+        BatchState.from_battle_states([default_battle(), confused], strict=True)
@@ -0,0 +1,103 @@
+import numpy as np
+
+from src.battle.batch_simulator import BatchSimulator, BatchState
+from src.battle.belief import OpponentBelief, RentalSet
+from src.controller.mcts_agent import MCTSAgent
+from src.state.pokestate import PokemonState
+from test.battle.test_simulator import battle, mon
+
+SETS = [
+    RentalSet("Starmie", 50, ("Surf", "Thunderbolt", "Recover", "Thunder Wave")),
+    RentalSet("Starmie", 50, ("Surf", "Blizzard", "Recover", "Psychic")),
+    RentalSet("Snorlax", 50, ("Body Slam", "Rest", "Earthquake", "Reflect")),
+    RentalSet("Gengar", 50, ("Hypnosis", "Night Shade", "Thunderbolt", "Explosion")),
+    RentalSet("Exeggutor", 50, ("Sleep Powder", "Psychic", "Mega Drain", "Explosion")),
+]
+
+
+def state_with_starmie():
+    return battle(
+        [mon("Tauros", ["Body Slam", "Hyper Beam"]), mon("Chansey", ["Seismic Toss"])],
+        [PokemonState(known=True, in_play=True, species="Starmie", name="Starmie", hp=80.0)],
+    )
+
+
+def test_messages_narrow_the_belief():
+    belief = OpponentBelief(SETS)
+    state = state_with_starmie()
+    belief.sync(state)
+    assert belief.probabilities(0)[[0, 1]].sum() == 1.0
+    assert belief.observe_message("STARMIE used THUNDERBOLT!", state)
+    assert belief.probabilities(0)[0] == 1.0
+    # A move no candidate knows is treated as a misread
+    assert not belief.observe_message("STARMIE used HYPER BEAM!", state)
+    assert belief.probabilities(0)[0] == 1.0
+    assert belief.observe_message("Go! GENGAR!", state)
+    assert belief.active == 1
+    assert belief.species_probabilities(1)[belief.species.index("Gengar")] == 1.0
+
+
+def test_sampled_teams_are_consistent():
+    belief = OpponentBelief(SETS)
+    state = state_with_starmie()
+    belief.sync(state)
+    samples = belief.sample(2000, np.random.default_rng(0), state)
+    assert samples.shape == (2000, 6)
+    assert np.isin(samples[:, 0], [0, 1]).all()
+    assert (samples[:, 1:3] >= 0).all() and (samples[:, 3:] == -1).all()
+    species = belief.set_species[samples[:, :3]]
+    assert (np.sort(species, axis=1)[:, 1:] != np.sort(species, axis=1)[:, :-1]).all()
+    # Every remaining set is drawn
+    assert set(np.unique(samples[:, 1:3])) == {2, 3, 4}
+
+
+def test_batch_matches_battle_states():
+    belief = OpponentBelief(SETS)
+    state = state_with_starmie()
+    samples = belief.sample(64, np.random.default_rng(1), state)
+    batch = belief.to_batch(state, samples)
+    reference = BatchState.from_battle_states(belief.to_battle_states(state, samples))
+    for name, value in vars(reference).items():
+        np.testing.assert_array_equal(getattr(batch, name), value, err_msg=name)
+    sim = BatchSimulator(0)
+    for _ in range(30):
+        sim.step(batch, sim.random_actions(batch, 0), sim.random_actions(batch, 1))
+    assert batch.done.any()
+
+
+def test_mcts_agent_samples_from_the_belief():
+    agent = MCTSAgent(budget=0.05, workers=1, roster=None, seed=0, belief=OpponentBelief(SETS))
+    assert agent.choose_action(state_with_starmie()) in {"move 0", "move 1", "switch 1"}
+
+
+def test_revealed_species_is_not_drawn_for_earlier_slots():
+    belief = OpponentBelief(SETS)
+    state = state_with_starmie()
+    belief.sync(state)
+    assert belief.observe_species(2, "Gengar")
+    samples = belief.sample(2000, np.random.default_rng(0), state)
+    assert (samples[:, 2] == 3).all()
+    assert not (samples[:, :2] == 3).any()
+    assert (samples[:, 1] >= 0).all()
+
+
+def test_placeholders_are_not_evidence():
+    belief = OpponentBelief(SETS)
+    state = state_with_starmie()
+    # A yaml team fills in species and moves the battle has not shown yet
+    state.opponent_team.pk_list[0].move1 = mon("Starmie", ["Psychic"]).move1
+    state.opponent_team.pk_list[0].move1.known = False
+    state.opponent_team.pk_list[1] = mon("Snorlax", ["Body Slam"], revealed=False)
+    belief.sync(state)
+    assert belief.probabilities(0)[[0, 1]].tolist() == [0.5, 0.5]
+    assert not belief.present[1]
+    samples = belief.sample(500, np.random.default_rng(0), state)
+    assert set(np.unique(samples[:, 1:3])) == {2, 3, 4}
+    for sample, row in zip(belief.to_battle_states(state, samples), samples):
+        team = sample.opponent_team.pk_list
+        assert team[0].move1.name in SETS[row[0]].moves
+        assert team[1].species == SETS[row[1]].species
+    # Once revealed, the species is
+    state.opponent_team.pk_list[1].revealed = True
+    belief.sync(state)
+    assert belief.species_probabilities(1)[belief.species.index("Snorlax")] == 1.0
@@ -0,0 +1,82 @@
+import numpy as np
+
+from src.battle.damage import (
+    species_stats, damage_rolls, damage_distribution, crit_chance, get_move_info, current_hp, max_hp
+)
+from src.state.pokestate import PokemonState
+from src.state.pokestate_defs import Status
+
+
+def mon(species: str, level: int = 100, **kwargs) -> PokemonState:
+    kwargs.setdefault("hp", 100.0)
+    return PokemonState(active=True, species=species, name=species, level=level, **kwargs)
+
+
+def test_species_stats_match_stadium_rentals():
+    hp, attack, defense, _, speed = species_stats("Tauros", 100)
+    assert (hp, attack, defense, speed) == (353, 298, 288, 318)
+    assert species_stats("Chansey", 100)[0] == 703
+
+
+def test_body_slam_rolls():
+    rolls = damage_rolls(mon("Tauros"), mon("Chansey"), "Body Slam")
+    assert len(rolls) == 39
+    assert rolls[-1] == 295 and rolls[0] == 251
+
+
+def test_boosts_burn_and_screens():
+    tauros, chansey = mon("Tauros"), mon("Chansey")
+    plain = damage_rolls(tauros, chansey, "Body Slam")[-1]
+    assert damage_rolls(mon("Tauros", atk_boost=2), chansey, "Body Slam")[-1] > plain
+    assert damage_rolls(mon("Tauros", status=Status.BURNED), chansey, "Body Slam")[-1] < plain * 0.6
+    assert damage_rolls(tauros, mon("Chansey", reflect=True), "Body Slam")[-1] < plain * 0.6
+    assert damage_rolls(tauros, mon("Chansey", light_screen=True), "Body Slam")[-1] == plain
+    # Crits ignore burn and Reflect
+    crit = damage_rolls(tauros, chansey, "Body Slam", crit=True)[-1]
+    assert damage_rolls(mon("Tauros", status=Status.BURNED), mon("Chansey", reflect=True), "Body Slam", crit=True)[-1] == crit
+    assert crit > plain
+
+
+def test_special_moves_use_special_stages():
+    alakazam, chansey = mon("Alakazam"), mon("Chansey")
+    plain = damage_rolls(alakazam, chansey, "Psychic")[-1]
+    assert damage_rolls(alakazam, mon("Chansey", special_boost=2), "Psychic")[-1] < plain
+    assert damage_rolls(alakazam, mon("Chansey", light_screen=True), "Psychic")[-1] < plain
+    assert damage_rolls(mon("Alakazam", status=Status.BURNED), chansey, "Psychic")[-1] == plain
+
+
+def test_immunity_fixed_damage_and_status_moves():
+    assert not damage_rolls(mon("Dugtrio"), mon("Pidgeot"), "Earthquake").any()
+    assert (damage_rolls(mon("Gengar", level=55), mon("Tauros"), "Night Shade") == 55).all()
+    assert not damage_rolls(mon("Gengar"), mon("Tauros"), "Hypnosis").any()
+
+
+def test_distribution_includes_crits_and_misses():
+    tauros, starmie = mon("Tauros"), mon("Starmie")
+    assert abs(crit_chance(tauros, get_move_info("Body Slam")) - 55 / 256) < 1e-12
+    assert abs(crit_chance(tauros, get_move_info("Slash")) - 255 / 256) < 1e-12
+    dist = damage_distribution(tauros, starmie, "Hyper Beam")
+    assert abs(dist.prob.sum() - 1.0) < 1e-12
+    assert abs(dist.prob[dist.damage == 0].sum() - 0.1) < 1e-12
+    assert dist.max_damage() == damage_rolls(tauros, starmie, "Hyper Beam", crit=True)[-1]
+    assert np.all(np.diff(dist.damage) > 0)
+
+
+def test_multi_hit_and_ko_chance():
+    dist = damage_distribution(mon("Nidoking"), mon("Starmie"), "Double Kick", include_crits=False)
+    single = damage_rolls(mon("Nidoking"), mon("Starmie"), "Double Kick")
+    assert set(dist.damage) == set(single * 2)
+    chansey = mon("Chansey", hp=10.0)
+    assert current_hp(chansey) == round(max_hp(chansey) * 0.1)
+    assert damage_distribution(mon("Tauros"), chansey, "Body Slam").ko_chance(current_hp(chansey)) > 1.0 - 1e-12
+
+
+def test_ko_probabilities_match_two_independent_uses():
+    dist = damage_distribution(mon("Tauros"), mon("Chansey"), "Body Slam")
+    hp = max_hp(mon("Chansey"))
+    odds = dist.ko_probabilities(hp, 3)
+    total = np.add.outer(dist.damage, dist.damage)
+    expected = np.outer(dist.prob, dist.prob)[total >= hp].sum()
+    assert odds[0] == 0.0 and abs(odds[1] - expected) < 1e-12
+    assert np.all(np.diff(odds) >= 0) and odds[2] <= 1.0
+    assert (dist.ko_probabilities(0, 2) == 1.0).all()
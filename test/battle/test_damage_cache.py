@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.battle.damage import damage_distribution, damage_rolls
+from src.battle.damage_cache import DamageCache
+from src.state.pokestate import PokemonState
+from src.state.pokestate_defs import Status
+
+
+def mon(species: str, **kwargs) -> PokemonState:
+    kwargs.setdefault("hp", 100.0)
+    kwargs.setdefault("name", species)
+    return PokemonState(active=True, species=species, level=100, **kwargs)
+
+
+def test_repeated_queries_hit_the_cache():
+    cache = DamageCache()
+    tauros, chansey = mon("Tauros"), mon("Chansey")
+    first = cache.distribution(tauros, chansey, "Body Slam")
+    # Fields that don't affect damage don't change the key
+    second = cache.distribution(mon("Tauros", name="Bull", sleep_turns=2), mon("Chansey", hp=40.0), "body slam")
+    assert first is second
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    np.testing.assert_array_equal(first.prob, damage_distribution(tauros, chansey, "Body Slam").prob)
+
+
+def test_damage_relevant_fields_change_the_key():
+    cache = DamageCache()
+    chansey = mon("Chansey")
+    plain = cache.rolls(mon("Tauros"), chansey, "Body Slam")
+    burned = cache.rolls(mon("Tauros", status=Status.BURNED), chansey, "Body Slam")
+    boosted = cache.rolls(mon("Tauros", atk_boost=1), chansey, "Body Slam")
+    reflect = cache.rolls(mon("Tauros"), mon("Chansey", reflect=True), "Body Slam")
+    assert cache.stats()["misses"] == 4
+    assert burned[-1] < plain[-1] < boosted[-1] and reflect[-1] < plain[-1]
+    np.testing.assert_array_equal(plain, damage_rolls(mon("Tauros"), chansey, "Body Slam"))
+
+
+def test_ko_probabilities_and_eviction():
+    cache = DamageCache(maxsize=2)
+    tauros = mon("Tauros")
+    odds = cache.ko_probabilities(tauros, mon("Chansey", hp=50.0), "Hyper Beam", n_hits=3)
+    assert odds.shape == (3,) and np.all(np.diff(odds) >= 0)
+    assert cache.ko_probabilities(tauros, mon("Chansey", hp=50.0), "Hyper Beam", n_hits=3) is odds
+    cache.rolls(tauros, mon("Starmie"), "Body Slam")
+    cache.rolls(tauros, mon("Snorlax"), "Body Slam")
+    assert len(cache) == 2 and cache.stats()["evictions"] >= 1
+
+
+def test_cached_values_are_read_only():
+    cache = DamageCache()
+    tauros, chansey = mon("Tauros"), mon("Chansey")
+    dist = cache.distribution(tauros, chansey, "Body Slam")
+    for array in (dist.prob, cache.rolls(tauros, chansey, "Body Slam"),
+                  cache.ko_probabilities(tauros, chansey, "Body Slam")):
+        with pytest.raises(ValueError):
+            array[0] = 0.0
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+
+from src.battle import damage
+from src.battle.batch_simulator import BatchState
+from src.battle.evaluator import HeuristicEvaluator
+from src.battle.matchup_store import MatchupStore
+from src.battle.simulator import SimState, TurnSimulator, legal_actions
+from src.controller.expectiminimax_agent import ExpectiminimaxSearch
+from test.battle.test_simulator import battle, default_battle, mon
+
+NAMES = ["Tauros", "Chansey", "Starmie", "Snorlax"]
+NKOS = np.array([[5, 3, 2, 3],
+                 [4, 5, 4, 5],
+                 [2, 4, 5, 3],
+                 [2, 4, 3, 5]], dtype=np.int8)
+
+
+def store() -> MatchupStore:
+    return MatchupStore(NAMES, {}, np.zeros((4, 4, 4)), NKOS)
+
+
+def random_states(n: int):
+    rng, sim = random.Random(0), TurnSimulator(0)
+    states = []
+    for _ in range(n):
+        state = SimState.from_battle_state(default_battle())
+        for _ in range(rng.randrange(10)):
+            if state.winner is not None:
+                break
+            sim.step(state, rng.choice(legal_actions(state, 0)), rng.choice(legal_actions(state, 1)))
+        states.append(state)
+    return states
+
+
+def test_table_is_indexed_by_dex_number():
+    evaluator = HeuristicEvaluator.from_store(store())
+    tauros, chansey = damage.SPECIES_INDEX["tauros"], damage.SPECIES_INDEX["chansey"]
+    assert evaluator.nkos[tauros, chansey] == 3
+    assert evaluator.nkos[chansey, tauros] == 4
+    # Species missing from the store are even against everything
+    assert evaluator.nkos[damage.SPECIES_INDEX["mew"], tauros] == 5
+
+
+def test_batch_matches_scalar():
+    evaluator = HeuristicEvaluator.from_store(store())
+    states = random_states(100)
+    batch = BatchState.from_sim_states(states)
+    for side in (0, 1):
+        expected = [evaluator.evaluate(state, side) for state in states]
+        np.testing.assert_allclose(evaluator.evaluate_batch(batch, side), expected)
+        assert all(0.0 <= v <= 1.0 for v in expected)
+
+
+def test_scores_hp_speed_and_matchup():
+    evaluator = HeuristicEvaluator.from_store(store())
+    state = SimState.from_battle_state(default_battle())
+    even = evaluator.evaluate(state, 0)
+    assert abs(even + evaluator.evaluate(state, 1) - 1.0) < 1e-12
+    hurt = state.copy()
+    hurt.active_mon(1).hp //= 2
+    assert evaluator.evaluate(hurt, 0) > even
+    # Starmie outspeeds Tauros until its speed drops
+    slowed = state.copy()
+    slowed.active_mon(1).stages[3] = -2
+    assert evaluator.evaluate(slowed, 0) > even
+    lead = SimState.from_battle_state(battle([mon("Tauros", ["Body Slam"])], [mon("Chansey", ["Seismic Toss"])]))
+    assert evaluator.evaluate(lead, 0) > 0.5
+
+
+def test_saved_store_and_search(tmp_path):
+    store().save(str(tmp_path))
+    evaluator = HeuristicEvaluator.load(str(tmp_path))
+    search = ExpectiminimaxSearch(evaluator=evaluator)
+    action, depth = search.search(SimState.from_battle_state(default_battle()), time_limit=5.0, max_depth=1)
+    assert depth == 1 and action in legal_actions(SimState.from_battle_state(default_battle()), 0)
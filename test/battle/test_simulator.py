@@ -0,0 +1,142 @@
+import pytest
+
+from src.battle.simulator import SimState, TurnSimulator, action_index, legal_actions
+from src.state.gen1_moves import get_move_by_name
+from src.state.pokestate import BattleState, MoveState, PokemonState, TeamState
+from src.state.pokestate_defs import Status
+
+
+def mon(species: str, move_names, level: int = 100, **kwargs) -> PokemonState:
+    move_states = [
+        MoveState(known=True, name=name, pp=get_move_by_name(name).pp, pp_max=get_move_by_name(name).pp, disabled=False)
+        for name in move_names
+    ] + [None] * (4 - len(move_names))
+    kwargs.setdefault("hp", 100.0)
+    kwargs.setdefault("revealed", True)
+    return PokemonState(known=True, in_play=True, species=species, name=species, level=level,
+                        move1=move_states[0], move2=move_states[1], move3=move_states[2], move4=move_states[3],
+                        **kwargs)
+
+
+def battle(player, opponent) -> BattleState:
+    pad = lambda team: team + [PokemonState() for _ in range(6 - len(team))]
+    return BattleState(0, 0, TeamState(pad(player)), TeamState(pad(opponent)))
+
+
+def default_battle() -> BattleState:
+    return battle(
+        [mon("Tauros", ["Body Slam", "Hyper Beam", "Earthquake", "Blizzard"]),
+         mon("Chansey", ["Ice Beam", "Thunder Wave", "Softboiled", "Seismic Toss"])],
+        [mon("Starmie", ["Surf", "Thunderbolt", "Recover", "Thunder Wave"]),
+         mon("Snorlax", ["Body Slam", "Reflect", "Rest", "Earthquake"])],
+    )
+
+
+def play(seed: int, state: SimState, turns: int = 20) -> SimState:
+    sim = TurnSimulator(seed)
+    for _ in range(turns):
+        if state.winner is not None:
+            break
+        sim.step(state, legal_actions(state, 0)[0], legal_actions(state, 1)[0])
+    return state
+
+
+def snapshot(state: SimState):
+    return [(p.hp, p.status, tuple(p.pp), tuple(p.stages)) for team in state.teams for p in team if p is not None]
+
+
+def test_same_seed_same_battle_and_copies_are_independent():
+    root = SimState.from_battle_state(default_battle())
+    first = play(7, root.copy())
+    second = play(7, root.copy())
+    assert snapshot(first) == snapshot(second)
+    assert snapshot(first) != snapshot(root)
+    assert all(p.hp == p.max_hp for team in root.teams for p in team if p is not None)
+
+
+def test_faster_pokemon_knocks_out_before_the_target_moves():
+    state = SimState.from_battle_state(battle(
+        [mon("Tauros", ["Hyper Beam"])],
+        [mon("Rattata", ["Tackle"], level=5), mon("Pidgey", ["Tackle"], level=5)],
+    ))
+    TurnSimulator(1).step(state, "move 0", "move 0")
+    tauros = state.active_mon(0)
+    assert tauros.hp == tauros.max_hp
+    assert state.teams[1][0].status is Status.FAINTED
+    # The fainted side must switch before anything else happens
+    assert state.must_switch == [False, True]
+    assert legal_actions(state, 1) == [action_index("switch 1")]
+    TurnSimulator(1).step(state, "move 0", "switch 1")
+    assert state.active == [0, 1] and not state.must_switch[1]
+    assert tauros.pp[0] == get_move_by_name("Hyper Beam").pp - 1
+
+
+def test_switch_goes_first_and_resets_stages():
+    state = SimState.from_battle_state(battle(
+        [mon("Tauros", ["Earthquake"]), mon("Chansey", ["Softboiled"])],
+        [mon("Snorlax", ["Body Slam"], atk_boost=2)],
+    ))
+    state.active_mon(0).stages[0] = 2
+    TurnSimulator(3).step(state, "switch 1", "move 0")
+    assert state.active[0] == 1
+    assert state.teams[0][0].stages == [0, 0, 0, 0]
+    assert state.teams[0][0].hp == state.teams[0][0].max_hp
+    assert state.active_mon(0).hp < state.active_mon(0).max_hp
+
+
+def test_two_turn_move_charges_then_hits():
+    state = SimState.from_battle_state(battle(
+        [mon("Exeggutor", ["Solarbeam", "Psychic"])],
+        [mon("Golem", ["Harden"])],
+    ))
+    sim = TurnSimulator(5)
+    golem = state.active_mon(1)
+    sim.step(state, "move 0", "move 0")
+    assert golem.hp == golem.max_hp
+    assert legal_actions(state, 0) == [0]
+    written = default_battle()
+    state.write_to(written)
+    assert written.player_team.pk_list[0].two_turn_move
+    # The charged move fires regardless of the chosen action
+    sim.step(state, "move 1", "move 0")
+    assert golem.hp < golem.max_hp
+    assert state.active_mon(0).pp[:2] == [get_move_by_name("Solarbeam").pp - 1, get_move_by_name("Psychic").pp]
+
+
+def test_status_effects():
+    sim = TurnSimulator(11)
+    state = SimState.from_battle_state(battle(
+        [mon("Jolteon", ["Thunder Wave"])],
+        [mon("Golem", ["Harden"]), mon("Snorlax", ["Harden"])],
+    ))
+    sim.step(state, "move 0", "move 0")
+    assert state.active_mon(1).status is Status.NONE # Ground types are immune
+    sim.step(state, "move 0", "switch 1")
+    snorlax = state.active_mon(1)
+    assert snorlax.status is Status.PARALYZED
+    assert snorlax.speed() == max(1, snorlax.stats[4] // 4)
+
+
+def test_illegal_switch_raises():
+    state = SimState.from_battle_state(default_battle())
+    with pytest.raises(ValueError):
+        TurnSimulator(0).step(state, "switch 4", "move 0")
+
+
+def test_trapper_keeps_its_trap_slot_when_the_target_switches():
+    for seed in range(50):
+        state = SimState.from_battle_state(battle(
+            [mon("Dragonite", ["Slam", "Wrap"])],
+            [mon("Starmie", ["Surf"]), mon("Snorlax", ["Body Slam"])],
+        ))
+        state.teams[0][0].pp[0] = 0
+        sim = TurnSimulator(seed)
+        sim.step(state, "move 1", "move 0")
+        if state.teams[0][0].trap_turns > 0:
+            break
+    assert legal_actions(state, 0) == [1]
+    wrap_pp = state.teams[0][0].pp[1]
+    # The switch releases the trap, the forced Wrap is not used on Snorlax
+    sim.step(state, legal_actions(state, 0)[0], "switch 1")
+    assert state.active[1] == 1 and state.teams[0][0].trap_turns == 0
+    assert state.teams[0][0].pp[1] == wrap_pp
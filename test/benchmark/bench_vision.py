@@ -0,0 +1,348 @@
+"""
+Vision Stack Benchmarks
+
+Reproducible latency/throughput benchmarks for the vision pipeline, run over the
+recorded frames in test/data, example_battle_p1_box.png and seeded synthetic frames.
+Results are written as JSON so runs can be compared across commits.
+
+Usage:
+    python -m test.benchmark.bench_vision --out benchmarks/$(git rev-parse --short HEAD).json
+    python -m test.benchmark.bench_vision --out new.json --compare benchmarks/old.json
+    python -m test.benchmark.bench_vision --filter serializer --min-time 0.5
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+import uuid
+
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+import cv2
+import numpy as np
+import pytesseract
+
+from src.screen_parsing.box_detection import BoxDetection, HP_BOX_RATIO, STATUS_BOX_RATIO
+from src.state.pokestate_defs import ImageUpdate, Rectangle, MessageType, PlayerID
+from src.state_reader.phrases import parse_update_message
+from src.state_reader.tesseract import read_text_from_roi, preprocess_for_ocr, remove_large_contours
+from src.utils.battle_state_serialization import BattleStateSerializer
+from src.utils.serialization import ImageUpdateSerializer
+from src.utils.shared_image_list import SharedImageList
+from src.utils.tracing import TraceContext
+from test.state_reader.test_utils import create_example_battle_state
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SYNTHETIC_SIZE = (720, 1280) # (height, width) of a 720p capture
+SYNTHETIC_FRAMES = 8
+SEED = 0
+
+MESSAGES = [
+    "It becom3 c?nsused!",
+    "ATACK incr@ase?!",
+    "Il was buoned!",
+    "Go, SquudGo0ls!",
+    "Go! Bul by!",
+    "Pikachu used Thunderbolt!",
+]
+
+# A benchmark factory does its setup and returns (fn, teardown). Only fn is timed.
+Factory = Callable[[], Tuple[Callable[[], Any], Optional[Callable[[], None]]]]
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+@dataclass
+class BenchResult:
+    name: str
+    iterations: int
+    total_s: float
+    mean_ms: float
+    min_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput_per_s: float
+
+
+def load_recorded_frames() -> List[np.ndarray]:
+    paths = sorted(glob.glob(os.path.join(REPO_ROOT, 'test', 'data', '*.png')))
+    frames = [cv2.imread(path, cv2.IMREAD_COLOR) for path in paths]
+    return [frame for frame in frames if frame is not None]
+
+
+def load_p1_box() -> np.ndarray:
+    image = cv2.imread(os.path.join(REPO_ROOT, 'example_battle_p1_box.png'), cv2.IMREAD_COLOR)
+    if image is None:
+        raise SkipBenchmark("example_battle_p1_box.png not found")
+    return image
+
+
+def make_synthetic_frames(n: int = SYNTHETIC_FRAMES, size: Tuple[int, int] = SYNTHETIC_SIZE, seed: int = SEED) -> List[np.ndarray]:
+    """
+    Noisy frames with HP and status shaped boxes drawn in the corners, so the box
+    detector has contours to filter.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = size
+    frames = []
+    for _ in range(n):
+        frame = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+        box_h = height // 10
+        for (x, y, ratio, color) in (
+            (width // 20, height // 20, HP_BOX_RATIO, (200, 60, 40)),
+            (width - width // 3, height - height // 5, HP_BOX_RATIO, (40, 60, 200)),
+            (width // 4, height - height // 8, STATUS_BOX_RATIO / 2, (220, 220, 220)),
+        ):
+            jitter = int(rng.integers(-3, 4))
+            cv2.rectangle(frame, (x + jitter, y), (x + jitter + int(box_h * ratio), y + box_h), color, thickness=-1)
+            cv2.rectangle(frame, (x + jitter, y), (x + jitter + int(box_h * ratio), y + box_h), (255, 255, 255), thickness=3)
+        frames.append(frame)
+    return frames
+
+
+def all_frames() -> List[np.ndarray]:
+    return load_recorded_frames() + make_synthetic_frames()
+
+
+def _cycle(items: List[Any]) -> Callable[[], Any]:
+    state = {"i": -1}
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+    return next_item
+
+
+def bench_box_detection():
+    frames = _cycle(all_frames())
+    detector = BoxDetection()
+    return (lambda: detector.update(frames())), None
+
+
+def bench_preprocess_for_ocr():
+    image = load_p1_box()
+    return (lambda: preprocess_for_ocr(image)), None
+
+
+def bench_preprocess_for_ocr_otsu():
+    image = load_p1_box()
+    return (lambda: preprocess_for_ocr(image, use_otsu=True)), None
+
+
+def bench_remove_large_contours():
+    gray = preprocess_for_ocr(load_p1_box())
+    return (lambda: remove_large_contours(gray)), None
+
+
+def bench_read_text_from_roi():
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        raise SkipBenchmark("tesseract binary not found")
+    image = load_p1_box()
+    roi = ((0, 0), (image.shape[1], image.shape[0]))
+    return (lambda: read_text_from_roi(image, roi)), None
+
+
+def bench_parse_update_message():
+    battle_state = create_example_battle_state()
+    messages = _cycle(MESSAGES)
+    return (lambda: parse_update_message(messages(), battle_state, opponent=True)), None
+
+
+def bench_battle_state_to_numpy():
+    battle_state = create_example_battle_state()
+    return battle_state.to_numpy, None
+
+
+def bench_battle_state_serializer_to_json():
+    serializer = BattleStateSerializer()
+    battle_state = create_example_battle_state()
+    trace = TraceContext(frame_id=1, t_capture=0.0)
+    return (lambda: json.dumps(serializer.to_dict(battle_state, trace=trace))), None
+
+
+def bench_battle_state_serializer_from_json():
+    serializer = BattleStateSerializer()
+    message = json.dumps(serializer.to_dict(create_example_battle_state()))
+    return (lambda: serializer.from_dict(json.loads(message))), None
+
+
+def _shared_image_list(frame: np.ndarray) -> SharedImageList:
+    config = {
+        'name': f"bench_frames_{uuid.uuid4().hex[:8]}",
+        'width': str(frame.shape[1]), 'height': str(frame.shape[0]), 'channel': str(frame.shape[2]),
+        'dtype': str(frame.dtype), 'n_shmem_frames': '4',
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        return SharedImageList(config, create=True)
+
+
+def _image_update_serializer():
+    frame = make_synthetic_frames(n=1)[0]
+    shm = _shared_image_list(frame)
+    shm.get_new_frame()[:] = frame
+    serializer = ImageUpdateSerializer(shm)
+    update = ImageUpdate(shm.at(0), Rectangle(10, 10, 200, 80), MessageType.HP, PlayerID.P1,
+                         trace=TraceContext(frame_id=1, t_capture=0.0))
+
+    def teardown():
+        shm.shm.close()
+        shm.shm.unlink()
+    return serializer, update, teardown
+
+
+def bench_image_update_serializer_to_dict():
+    serializer, update, teardown = _image_update_serializer()
+    return (lambda: serializer.to_dict(update)), teardown
+
+
+def bench_image_update_serializer_from_dict():
+    serializer, update, teardown = _image_update_serializer()
+    data = serializer.to_dict(update)
+    return (lambda: serializer.from_dict(data)), teardown
+
+
+BENCHMARKS: Dict[str, Factory] = {
+    "box_detection.update": bench_box_detection,
+    "tesseract.preprocess_for_ocr": bench_preprocess_for_ocr,
+    "tesseract.preprocess_for_ocr_otsu": bench_preprocess_for_ocr_otsu,
+    "tesseract.remove_large_contours": bench_remove_large_contours,
+    "tesseract.read_text_from_roi": bench_read_text_from_roi,
+    "phrases.parse_update_message": bench_parse_update_message,
+    "battle_state.to_numpy": bench_battle_state_to_numpy,
+    "battle_state_serializer.to_json": bench_battle_state_serializer_to_json,
+    "battle_state_serializer.from_json": bench_battle_state_serializer_from_json,
+    "image_update_serializer.to_dict": bench_image_update_serializer_to_dict,
+    "image_update_serializer.from_dict": bench_image_update_serializer_from_dict,
+}
+
+
+def run_benchmark(name: str, fn: Callable[[], Any], warmup: int = 3, min_iterations: int = 20,
+                  max_iterations: int = 100000, min_time: float = 1.0) -> BenchResult:
+    """
+    Calls fn until both min_iterations and min_time are reached, timing each call.
+    Stdout is swallowed while timing (several stages print on every call).
+    """
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        for _ in range(warmup):
+            fn()
+        durations = []
+        start = time.perf_counter()
+        while len(durations) < max_iterations and (len(durations) < min_iterations or time.perf_counter() - start < min_time):
+            t0 = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - t0)
+            if out.tell() > 1 << 20:
+                out.seek(0)
+                out.truncate()
+        total = time.perf_counter() - start
+    durations_ms = np.asarray(durations) * 1000.0
+    p50, p95, p99 = np.percentile(durations_ms, (50, 95, 99))
+    return BenchResult(
+        name=name,
+        iterations=len(durations),
+        total_s=total,
+        mean_ms=float(durations_ms.mean()),
+        min_ms=float(durations_ms.min()),
+        p50_ms=float(p50),
+        p95_ms=float(p95),
+        p99_ms=float(p99),
+        throughput_per_s=len(durations) / total if total > 0 else 0.0,
+    )
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def run_all(filter_text: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Runs every benchmark whose name contains filter_text.
+
+    Returns:
+        {"environment": ..., "results": {name: BenchResult dict}, "skipped": {name: reason}}
+    """
+    results = {}
+    skipped = {}
+    for name, factory in BENCHMARKS.items():
+        if filter_text and filter_text not in name:
+            continue
+        try:
+            fn, teardown = factory()
+        except SkipBenchmark as e:
+            skipped[name] = str(e)
+            continue
+        try:
+            results[name] = asdict(run_benchmark(name, fn, **kwargs))
+        finally:
+            if teardown is not None:
+                teardown()
+    return {"environment": environment(), "results": results, "skipped": skipped}
+
+
+def format_results(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    header = f"{'benchmark':<38}{'iters':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'ops/s':>12}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    lines = [header, "-" * len(header)]
+    for name, r in report["results"].items():
+        line = (f"{name:<38}{r['iterations']:>8}{r['mean_ms']:>10.3f}{r['p50_ms']:>10.3f}"
+                f"{r['p95_ms']:>10.3f}{r['throughput_per_s']:>12.1f}")
+        if baseline:
+            base = baseline.get("results", {}).get(name)
+            # >1.00x means faster than the baseline
+            line += f"{base['p50_ms'] / r['p50_ms']:>9.2f}x" if base and r['p50_ms'] > 0 else f"{'-':>10}"
+        lines.append(line)
+    for name, reason in report["skipped"].items():
+        lines.append(f"{name:<38}skipped: {reason}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Benchmark the vision stack and save the results as JSON")
+    parser.add_argument('--out', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline JSON file to compare p50 latencies against')
+    parser.add_argument('--filter', type=str, default=None, help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Minimum seconds spent timing each benchmark')
+    parser.add_argument('--min-iterations', type=int, default=20, help='Minimum timed calls per benchmark')
+    args = parser.parse_args()
+
+    report = run_all(args.filter, min_time=args.min_time, min_iterations=args.min_iterations)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+    print(format_results(report, baseline))
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"Wrote {args.out}")
@@ -0,0 +1,21 @@
+import json
+
+from test.benchmark.bench_vision import BENCHMARKS, make_synthetic_frames, run_all, format_results
+
+
+def test_synthetic_frames_are_reproducible():
+    a = make_synthetic_frames(n=2, size=(90, 160))
+    b = make_synthetic_frames(n=2, size=(90, 160))
+    assert all((x == y).all() for x, y in zip(a, b))
+
+
+def test_run_all_produces_json_report():
+    report = run_all("serializer", warmup=1, min_iterations=3, min_time=0.0)
+    report = json.loads(json.dumps(report))
+    names = set(report["results"]) | set(report["skipped"])
+    assert names == {name for name in BENCHMARKS if "serializer" in name}
+    for result in report["results"].values():
+        assert result["iterations"] >= 3
+        assert result["p95_ms"] >= result["p50_ms"] >= result["min_ms"] > 0
+    assert "commit" in report["environment"]
+    assert "vs base" in format_results(report, baseline=report)
@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from multiprocessing import shared_memory
+
+from src.concurrent.supervisor import NodeSpec, Supervisor
+from src.utils.shared_image_list import SharedImageList, unlink_segment
+
+SHM_CONFIG = {"name": "test_supervisor_frames", "width": 4, "height": 3, "channel": 3, "dtype": "uint8",
+              "n_shmem_frames": 2}
+
+# Attaches to the ring, writes one pixel and waits to be interrupted
+ATTACH = """
+import json, sys, time
+from src.utils.shared_image_list import SharedImageList
+shm = SharedImageList(json.loads(sys.argv[sys.argv.index('--shm-config') + 1]), create=False)
+shm.at(0)[0, 0, 0] = 7
+try:
+    time.sleep(30)
+except KeyboardInterrupt:
+    shm.close()
+"""
+
+
+def segment_exists(name: str) -> bool:
+    try:
+        shared_memory.SharedMemory(name=name, create=False).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture(autouse=True)
+def no_segment():
+    unlink_segment(SHM_CONFIG["name"])
+    yield
+    unlink_segment(SHM_CONFIG["name"])
+
+
+def test_ring_is_created_before_nodes_and_unlinked_on_stop():
+    # Leaked by an earlier run
+    SharedImageList({**{k: str(v) for k, v in SHM_CONFIG.items()}, "n_shmem_frames": "1"}, create=True).shm.close()
+    supervisor = Supervisor([NodeSpec("reader", ["-c", ATTACH], shm=True)], shm_config=SHM_CONFIG, grace=2.0,
+                            cwd=os.getcwd())
+    supervisor.start()
+    assert wait_for(lambda: supervisor.shm.at(0)[0, 0, 0] == 7)
+    assert supervisor.shm.buffer.shape == (2, 3, 4, 3)
+    supervisor.stop()
+    assert supervisor.nodes[0].process.returncode == 0
+    assert not segment_exists(SHM_CONFIG["name"])
+
+
+def test_attached_process_does_not_unlink_the_ring():
+    shm = SharedImageList({k: str(v) for k, v in SHM_CONFIG.items()}, create=True)
+    code = "import json, sys; from src.utils.shared_image_list import SharedImageList; " \
+           "SharedImageList(json.loads(sys.argv[1]), create=False)"
+    subprocess.run([sys.executable, "-c", code, json.dumps({k: str(v) for k, v in SHM_CONFIG.items()})],
+                   check=True, cwd=os.getcwd(), capture_output=True)
+    assert segment_exists(SHM_CONFIG["name"])
+    shm.close()
+    assert not segment_exists(SHM_CONFIG["name"])
+
+
+def test_crashed_node_is_restarted_with_backoff():
+    supervisor = Supervisor([NodeSpec("crash", ["-c", "raise SystemExit(3)"])], max_restarts=2, backoff=0.05)
+    supervisor.start()
+    assert wait_for(lambda: not supervisor.poll())
+    assert supervisor.nodes[0].restarts == 2
+    assert supervisor.nodes[0].process.returncode == 3
+
+
+def test_clean_exit_is_not_restarted():
+    supervisor = Supervisor([NodeSpec("done", ["-c", "pass"])], backoff=0.01)
+    supervisor.start()
+    assert wait_for(lambda: not supervisor.poll())
+    assert supervisor.nodes[0].restarts == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="CPU affinity is Linux only")
+def test_node_is_pinned_and_thread_pools_sized():
+    cpu = min(os.sched_getaffinity(0))
+    spec = NodeSpec("pinned", ["-c", "import time; time.sleep(30)"], cpus=[cpu])
+    supervisor = Supervisor([spec], grace=1.0)
+    assert supervisor._environment(spec)["OMP_NUM_THREADS"] == "1"
+    supervisor.start()
+    process = supervisor.nodes[0].process
+    assert os.sched_getaffinity(process.pid) == {cpu}
+    supervisor.stop()
+    assert process.poll() is not None
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="CPU affinity is Linux only")
+def test_node_is_pinned_before_it_runs(tmp_path):
+    cpu = min(os.sched_getaffinity(0))
+    # Reports its own affinity and exits at once, before the supervisor could pin it
+    code = f"import os; open({str(tmp_path / 'cpus')!r}, 'a').write(str(sorted(os.sched_getaffinity(0)))); " \
+           "raise SystemExit(3)"
+    supervisor = Supervisor([NodeSpec("short", ["-c", code], cpus=[cpu])], max_restarts=2, backoff=0.01)
+    supervisor.start()
+    assert wait_for(lambda: not supervisor.poll())
+    assert supervisor.nodes[0].restarts == 2
+    assert (tmp_path / "cpus").read_text() == f"[{cpu}]" * 3
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+
+from asyncio import Queue
+from concurrent.futures import ThreadPoolExecutor
+
+from src.concurrent.continuous_task import ContinuousTask
+from src.concurrent.worker_pool import WorkerPool, OverflowPolicy
+
+
+def test_workers_keep_running_after_queue_empties():
+    seen = []
+
+    async def task(item):
+        seen.append(item)
+
+    async def main():
+        pool = WorkerPool(task, n_workers=2)
+        await pool.put(1)
+        await pool.join()
+        await asyncio.sleep(0.01)
+        await pool.put(2)
+        await pool.join()
+        await pool.close()
+        return pool
+
+    pool = asyncio.run(main())
+    assert sorted(seen) == [1, 2]
+    assert pool.stats.count == 2
+
+
+def test_throughput_is_not_capped_by_sleep():
+    async def task(item):
+        pass
+
+    async def main():
+        pool = WorkerPool(task, n_workers=1)
+        start = time.monotonic()
+        for i in range(500):
+            await pool.put(i)
+        await pool.close()
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) < 1.0
+
+
+def test_drop_newest_and_drop_oldest():
+    async def run(policy):
+        gate = asyncio.Event()
+        seen = []
+
+        async def task(item):
+            await gate.wait()
+            seen.append(item)
+
+        pool = WorkerPool(task, n_workers=1, maxsize=2, policy=policy)
+        await pool.put(0)
+        await asyncio.sleep(0)  # Worker picks up item 0 and blocks on the gate
+        results = [await pool.put(i) for i in range(1, 5)]
+        gate.set()
+        await pool.close()
+        return seen, results, pool.stats.dropped
+
+    seen, results, dropped = asyncio.run(run(OverflowPolicy.DROP_NEWEST))
+    assert seen == [0, 1, 2]
+    assert results == [True, True, False, False]
+    assert dropped == 2
+
+    seen, results, dropped = asyncio.run(run(OverflowPolicy.DROP_OLDEST))
+    assert seen == [0, 3, 4]
+    assert results == [True, True, True, True]
+    assert dropped == 2
+
+
+def test_block_policy_applies_backpressure():
+    async def main():
+        gate = asyncio.Event()
+
+        async def task(item):
+            await gate.wait()
+
+        pool = WorkerPool(task, n_workers=1, maxsize=1)
+        await pool.put(0)
+        await asyncio.sleep(0)
+        await pool.put(1)
+        blocked = asyncio.create_task(pool.put(2))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        gate.set()
+        await blocked
+        await pool.close()
+
+    asyncio.run(main())
+
+
+def test_blocking_work_runs_in_executor():
+    threads = set()
+
+    def task(item):
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            pool = WorkerPool(task, n_workers=4, executor=executor)
+            start = time.monotonic()
+            for i in range(8):
+                await pool.put(i)
+            await pool.close()
+            return time.monotonic() - start, pool
+
+    elapsed, pool = asyncio.run(main())
+    assert threading.get_ident() not in threads
+    assert elapsed < 0.08
+    stats = pool.stats.as_dict()
+    assert stats["count"] == 8
+    assert stats["run"]["p50"] > 0
+
+
+def test_task_errors_are_counted():
+    async def task(item):
+        raise ValueError(item)
+
+    async def main():
+        pool = WorkerPool(task)
+        await pool.put(1)
+        await pool.close()
+        return pool
+
+    assert asyncio.run(main()).stats.errors == 1
+
+
+def test_continuous_task_processes_items_put_later():
+    seen = []
+
+    async def task(item):
+        seen.append(item)
+
+    async def main():
+        continuous = ContinuousTask(Queue(), task)
+        await continuous.put("a")
+        await continuous.join()
+        await continuous.put("b")
+        await continuous.join()
+        await continuous.close()
+
+    asyncio.run(main())
+    assert seen == ["a", "b"]
+
+
+def test_continuous_task_consumes_raw_items_of_its_queue():
+    seen = []
+
+    async def task(item):
+        seen.append(item)
+
+    async def main():
+        queue = Queue()
+        for i in range(3):
+            queue.put_nowait(i)
+        continuous = ContinuousTask(queue, task)
+        await asyncio.wait_for(continuous.join(), timeout=1.0)
+        await continuous.close()
+
+    asyncio.run(main())
+    assert seen == [0, 1, 2]
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+import tty
+
+from typing import List, Optional
+
+from src.controller.macros import FRAME_END, FRAME_START
+
+
+class FakeSerialDevice:
+    """
+    Pseudo-terminal that behaves like the controller board: every byte written
+    to `port` is recorded and echoed back as its acknowledgement after `delay`
+    seconds. Bytes in `drop` are recorded but never acknowledged, bytes in `late`
+    are acknowledged after `late_delay` seconds instead. Buttons inside
+    a frame ("[" ... "]") are recorded, and only the closing "]" is acknowledged
+    after `delay` per button.
+    """
+    def __init__(self, delay: float = 0.0, drop: bytes = b"", late: bytes = b"", late_delay: float = 0.0):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.delay = delay
+        self.drop = drop
+        self.late = late
+        self.late_delay = late_delay
+        self.received: List[bytes] = []
+        self.received_at: List[float] = []
+        self.frames: List[str] = []
+        self._frame: Optional[List[str]] = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                data = os.read(self.master, 1)
+            except OSError:
+                return
+            if not data:
+                return
+            if data == FRAME_START:
+                self._frame = []
+                continue
+            if data == FRAME_END and self._frame is not None:
+                time.sleep(self.delay * len(self._frame))
+                self.frames.append("".join(self._frame))
+                self._frame = None
+                os.write(self.master, data)
+                continue
+            self.received.append(data)
+            self.received_at.append(time.perf_counter())
+            if self._frame is not None:
+                self._frame.append(data.decode('utf-8'))
+                continue
+            if data in self.drop:
+                continue
+            delay = self.late_delay if data in self.late else self.delay
+            if delay:
+                time.sleep(delay)
+            os.write(self.master, data)
+
+    @property
+    def buttons(self) -> str:
+        return b"".join(self.received).decode('utf-8')
+
+    def close(self, timeout: Optional[float] = 1.0) -> None:
+        self._running = False
+        os.close(self.slave)
+        os.close(self.master)
+        self._thread.join(timeout)
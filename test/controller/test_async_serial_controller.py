@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from src.controller.async_serial_controller import AsyncSerialController
+from test.controller.fake_serial_device import FakeSerialDevice
+
+
+@pytest.fixture
+def device():
+    device = FakeSerialDevice(delay=0.01)
+    yield device
+    device.close()
+
+
+def test_send_command_does_not_block(device):
+    controller = AsyncSerialController(device.port, ack_timeout=0.5, startup_delay=0.0)
+    start = time.perf_counter()
+    first = controller.send_command("move 2")
+    second = controller.send_command("switch 1")
+    assert time.perf_counter() - start < 0.01
+    rtts = first.result(timeout=2.0) + second.result(timeout=2.0)
+    assert device.buttons == "AVB>"
+    # Paced by the acknowledgements, not by fixed sleeps
+    assert all(0.01 <= rtt < 0.1 for rtt in rtts)
+    stats = controller.latency_stats()
+    assert stats["A"]["count"] == 1 and set(stats) == {"A", "V", "B", ">"}
+    controller.close()
+
+
+def test_missing_ack_times_out_and_continues():
+    device = FakeSerialDevice(drop=b"A")
+    controller = AsyncSerialController(device.port, ack_timeout=0.05, startup_delay=0.0)
+    controller.send_buttons(["A", "^"]).result(timeout=2.0)
+    assert controller.timeouts == 1
+    assert controller.wait_idle(1.0)
+    assert device.buttons == "A^"
+    controller.close()
+    device.close()
+
+
+def test_late_ack_is_not_taken_for_the_next_button():
+    device = FakeSerialDevice(late=b"A", late_delay=0.3)
+    controller = AsyncSerialController(device.port, ack_timeout=0.15, startup_delay=0.0)
+    controller.send_buttons(["A", "^", "V"]).result(timeout=2.0)
+    assert controller.timeouts == 1 and controller.mismatches == 0
+    controller.send_buttons(["B", ">"]).result(timeout=2.0)
+    # Every later button is acknowledged by its own echo
+    assert controller.timeouts == 1 and controller.mismatches == 0
+    assert device.buttons == "A^VB>"
+    controller.close()
+    device.close()
+
+
+def test_invalid_command_raises_before_queueing(device):
+    controller = AsyncSerialController(device.port, startup_delay=0.0)
+    with pytest.raises(ValueError):
+        controller.send_command("run 1")
+    controller.close()
+    with pytest.raises(RuntimeError):
+        controller.send_command("move 0")
+    assert device.buttons == ""
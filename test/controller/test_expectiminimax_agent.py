@@ -0,0 +1,77 @@
+from src.battle.simulator import SimState, TurnSimulator
+from src.controller.expectiminimax_agent import ExpectiminimaxAgent, ZobristHasher, make_scenarios
+from src.state.pokestate_defs import PlayerID
+from test.battle.test_simulator import battle, default_battle, mon
+
+
+def test_picks_the_knockout_move():
+    state = battle(
+        [mon("Tauros", ["Growl", "Hyper Beam"])],
+        [mon("Rattata", ["Tackle"], level=30), mon("Pidgey", ["Tackle"], level=30)],
+    )
+    agent = ExpectiminimaxAgent(time_limit=0.2, roster=None)
+    assert agent.choose_action(state) == "move 1"
+    assert agent.last_depth >= 2
+
+
+def test_search_is_deterministic_and_reuses_the_table():
+    first = ExpectiminimaxAgent(time_limit=10.0, max_depth=2, roster=None)
+    second = ExpectiminimaxAgent(time_limit=10.0, max_depth=2, roster=None)
+    assert first.choose_action(default_battle()) == second.choose_action(default_battle())
+    nodes = first.search.nodes
+    first.choose_action(default_battle())
+    # Every node of the repeated search is answered by the transposition table
+    assert first.search.nodes - nodes < nodes / 10
+
+
+def test_plays_the_opponent_side():
+    agent = ExpectiminimaxAgent(PlayerID.P2, time_limit=0.1)
+    assert agent.choose_action(default_battle()) in {"move 0", "move 1", "move 2", "move 3", "switch 1"}
+
+
+def test_zobrist_hash_tracks_state():
+    hasher = ZobristHasher()
+    state = SimState.from_battle_state(default_battle())
+    assert hasher.hash(state) == hasher.hash(state.copy())
+    child = state.copy()
+    TurnSimulator(0).step(child, "move 0", "move 0")
+    assert hasher.hash(child) != hasher.hash(state)
+
+
+def test_zobrist_hash_tells_pokemon_apart():
+    hasher = ZobristHasher()
+    keys = set()
+    for species in ["Ivysaur", "Arbok", "Gengar", "Starmie", "Kabutops"]:
+        state = SimState.from_battle_state(battle([mon("Tauros", ["Tackle"])], [mon(species, ["Tackle"])]))
+        keys.add(hasher.hash(state))
+    assert len(keys) == 5
+    state = SimState.from_battle_state(battle([mon("Tauros", ["Tackle"])], [mon("Starmie", ["Surf"])]))
+    assert hasher.hash(state) not in keys
+
+
+def test_table_is_cleared_when_the_teams_change():
+    agent = ExpectiminimaxAgent(time_limit=0.05, max_depth=2, roster=None)
+    agent.choose_action(default_battle())
+    assert agent.search.table
+    agent.search.table[-1] = (99, 0.0, 0)
+    agent.choose_action(default_battle())
+    assert -1 in agent.search.table
+    other = battle([mon("Tauros", ["Body Slam", "Earthquake"]), mon("Chansey", ["Ice Beam"])],
+                   [mon("Gengar", ["Night Shade"]), mon("Snorlax", ["Body Slam"])])
+    agent.choose_action(other)
+    assert -1 not in agent.search.table
+
+
+def test_scenarios_are_stratified():
+    scenarios = make_scenarios(4, length=16)
+    for position in range(16):
+        bands = sorted(int(s.values[position] * 4) for s in scenarios)
+        assert bands == [0, 1, 2, 3]
+
+
+def test_failed_search_falls_back_to_a_legal_action(monkeypatch):
+    agent = ExpectiminimaxAgent(time_limit=0.05, roster=None)
+    def broken(*args, **kwargs):
+        raise ValueError("Illegal move 0 for Dragonite")
+    monkeypatch.setattr(agent.search, "search", broken)
+    assert agent.choose_action(default_battle()) == "move 0"
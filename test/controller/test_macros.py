@@ -0,0 +1,83 @@
+import pytest
+
+from src.controller.async_serial_controller import AsyncSerialController
+from src.controller import controller_node
+from src.controller.controller_node import MockController, OutputControlService
+from src.controller.macros import WAIT, GridMenu, MacroCompiler, encode_frame
+from src.controller.serial_controller import command_to_buttons
+from src.utils.battle_state_serialization import BattleStateSerializer
+from test.battle.test_simulator import battle, default_battle, mon
+from test.controller.fake_serial_device import FakeSerialDevice
+
+
+def test_grid_path_is_shortest_and_wraps():
+    grid = GridMenu(rows=2, cols=3)
+    assert grid.path(0, 5) == ["V", ">", ">"]
+    assert grid.path(5, 3) == ["<", "<"]
+    assert GridMenu(rows=1, cols=6, wrap=True).path(0, 5) == ["<"]
+    assert GridMenu(rows=1, cols=6, wrap=True).path(1, 4) == [">", ">", ">"]
+
+
+def test_compiler_tracks_cursor():
+    compiler = MacroCompiler(switch_menu=GridMenu(rows=6, cols=1))
+    assert compiler.compile("switch 2") == ["B", ".", "V", "V"]
+    assert compiler.compile("switch 3") == ["B", ".", "V"]
+    compiler.reset()
+    assert compiler.compile("switch 1") == ["B", ".", "V"]
+
+
+def test_default_layout_matches_serial_controller():
+    compiler = MacroCompiler()
+    for command in ["move 0", "move 3", "switch 4", "switch 5"]:
+        buttons = command_to_buttons(command)
+        assert compiler.compile(command) == [buttons[0], WAIT] + buttons[1:]
+    assert MacroCompiler(menu_wait=0).compile("move 2") == command_to_buttons("move 2")
+
+
+def test_pick_sequence():
+    compiler = MacroCompiler()
+    assert compiler.compile("pick 4 0 2") == ["V", ">", "A", "^", "<", "A", ">", ">", "A", "S"]
+    assert compiler.preview_menu.cursor == 2
+
+
+@pytest.mark.parametrize("command", ["", "run 1", "move", "move 4", "switch -1", "pick 1 1 2", "pick 6"])
+def test_invalid_commands(command):
+    with pytest.raises(ValueError):
+        MacroCompiler().compile(command)
+
+
+def test_frame_is_one_write_and_one_ack():
+    device = FakeSerialDevice(delay=0.01)
+    controller = AsyncSerialController(device.port, ack_timeout=0.5, startup_delay=0.0, compiler=MacroCompiler())
+    assert encode_frame(["A", ">"]) == b"[A>]"
+    rtts = controller.send_command("pick 4 0 2").result(timeout=2.0)
+    assert len(rtts) == 1 and rtts[0] >= 0.1
+    assert device.frames == ["V>A^<A>>AS"]
+    assert controller.timeouts == 0 and controller.mismatches == 0
+    assert set(controller.latency_stats()) == {"frame"}
+    controller.close()
+    device.close()
+
+
+def test_cursors_are_reset_when_a_battle_starts(monkeypatch):
+    monkeypatch.setattr(controller_node, "listen", lambda exchange, callbacks: None)
+
+    class Agent:
+        def choose_action(self, battle_state):
+            return "pick 4 0 2"
+
+        def speculate(self, battle_state, action):
+            pass
+
+    device = FakeSerialDevice()
+    controller = AsyncSerialController(device.port, startup_delay=0.0, compiler=MacroCompiler())
+    service = OutputControlService(controller, Agent(), coalesce=False)
+    serializer = BattleStateSerializer()
+    service.act(serializer.to_dict(default_battle()))
+    # Same battle: the cursor stays where the last pick left it
+    service.act(serializer.to_dict(default_battle()))
+    service.act(serializer.to_dict(battle([mon("Jolteon", ["Thunderbolt"])], [mon("Snorlax", ["Body Slam"])])))
+    assert controller.wait_idle(timeout=2.0)
+    assert device.frames == ["V>A^<A>>AS", "V<A^<A>>AS", "V>A^<A>>AS"]
+    controller.close()
+    device.close()
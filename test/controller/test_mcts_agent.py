@@ -0,0 +1,78 @@
+import random
+
+from src.battle.hidden_info import RentalPool, determinize, hidden_slots
+from src.controller import mcts_agent
+from src.controller.mcts_agent import MCTSAgent
+from src.params.yaml_parser import load_battle_state_from_yaml
+from src.state.pokestate import PokemonState
+from src.state.pokestate_defs import PlayerID
+from test.battle.test_simulator import battle, default_battle, mon
+
+
+def test_picks_the_knockout_move():
+    state = battle(
+        [mon("Tauros", ["Growl", "Hyper Beam"])],
+        [mon("Rattata", ["Tackle"], level=30), mon("Pidgey", ["Tackle"], level=30)],
+    )
+    agent = MCTSAgent(budget=0.1, workers=1, roster=None, seed=0)
+    assert agent.choose_action(state) == "move 1"
+    assert agent.last_iterations > 50
+
+
+def test_plays_either_side_with_hidden_opponent():
+    state = default_battle()
+    # Nothing is known about the opponent's third Pokemon or Starmie's moves yet
+    state.opponent_team.pk_list[0].move3 = None
+    state.opponent_team.pk_list[0].move4 = None
+    agent = MCTSAgent(PlayerID.P2, budget=0.1, workers=1, seed=1)
+    assert agent.choose_action(state) in {"move 0", "move 1", "move 2", "move 3", "switch 1"}
+
+
+def test_root_parallel_search_merges_workers():
+    agent = MCTSAgent(budget=0.2, workers=2, seed=2)
+    try:
+        action = agent.choose_action(default_battle())
+        assert action in {"move 0", "move 1", "move 2", "move 3", "switch 1"}
+    finally:
+        agent.close()
+
+
+def test_determinize_fills_unknowns_from_pool():
+    state = default_battle()
+    state.opponent_team.pk_list[1] = PokemonState()
+    state.opponent_team.pk_list[0].move4 = None
+    pool = RentalPool.from_yaml("config/pokemon.yaml")
+    sample = determinize(state, 1, pool, random.Random(0))
+    third = sample.opponent_team.pk_list[1]
+    assert third.species in pool.levels and third.level == pool.levels[third.species]
+    assert sum(1 for p in sample.opponent_team.pk_list if p.species) == 3
+    assert state.opponent_team.pk_list[1].species is None
+
+
+def test_failed_search_falls_back_to_a_legal_action(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("Illegal move 0 for Dragonite")
+    monkeypatch.setattr(mcts_agent, "_search", broken)
+    agent = MCTSAgent(budget=0.05, workers=1, roster=None, seed=0)
+    assert agent.choose_action(default_battle()) == "move 0"
+
+
+def test_unrevealed_pokemon_and_unknown_moves_are_resampled():
+    state = load_battle_state_from_yaml("config/battle5.yaml")
+    opponent = state.opponent_team.pk_list
+    # The yaml names every Pokemon and move; only the lead is revealed
+    assert opponent[0].revealed and not any(p.revealed for p in opponent[1:])
+    opponent[0].move1.known = False
+    assert hidden_slots(state, 1) == 6
+    pool = RentalPool.from_yaml("config/pokemon.yaml")
+    drawn_species = set()
+    for seed in range(5):
+        sample = determinize(state, 1, pool, random.Random(seed)).opponent_team.pk_list
+        assert sample[0].species == "Pidgeot"
+        assert sample[0].move1.name in set(pool.movesets["Pidgeot"]) - {"Mirror Move", "Fly"}
+        drawn = [p.species for p in sample[1:] if p.species]
+        assert len(drawn) == 2 and all(name in pool.levels for name in drawn)
+        drawn_species.update(drawn)
+        assert all(p.level == pool.levels[p.species] for p in sample[1:] if p.species)
+    # Not the yaml's placeholders
+    assert drawn_species - {p.species for p in opponent[1:]}
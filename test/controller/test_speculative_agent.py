@@ -0,0 +1,109 @@
+import copy
+import threading
+import time
+
+from src.battle.simulator import SimState, TurnSimulator
+from src.controller.base import Agent
+from src.controller.speculative_agent import SpeculativeAgent, state_key
+from src.state.pokestate import BattleState
+from test.battle.test_simulator import default_battle
+
+
+class CountingAgent(Agent):
+    def __init__(self):
+        self.calls = 0
+
+    def choose_action(self, battle_state: BattleState) -> str:
+        self.calls += 1
+        return "move 0" if battle_state.get_opponent_active_mon().hp > 50 else "move 1"
+
+
+def played(battle_state: BattleState, seed: int) -> BattleState:
+    state = SimState.from_battle_state(battle_state)
+    TurnSimulator(seed).step(state, "move 0", "move 0")
+    result = copy.deepcopy(battle_state)
+    state.write_to(result)
+    return result
+
+
+def test_outcomes_are_grouped_and_ordered():
+    agent = SpeculativeAgent(CountingAgent(), rollouts=4, seed=0)
+    outcomes = agent.outcomes(default_battle(), "move 0")
+    probabilities = [p for p, _ in outcomes]
+    assert probabilities == sorted(probabilities, reverse=True)
+    assert 0.99 < sum(probabilities) <= 1.0 + 1e-9
+    assert len({state_key(state) for _, state in outcomes}) == len(outcomes)
+
+
+def test_cached_decision_is_returned_without_search():
+    inner = CountingAgent()
+    agent = SpeculativeAgent(inner, rollouts=16, max_states=64, seed=0)
+    battle_state = default_battle()
+    agent.speculate(battle_state, "move 0")
+    assert agent.wait(10.0)
+    speculated = inner.calls
+    assert speculated == len(agent.cache) > 1
+
+    # An outcome of the turn that was actually played
+    real = next(played(battle_state, seed) for seed in range(100) if state_key(played(battle_state, seed)) in agent.cache)
+    assert agent.choose_action(real) == inner.choose_action(real)
+    assert agent.hits == 1 and inner.calls == speculated + 1
+
+
+def test_unexpected_state_falls_back_to_the_agent():
+    inner = CountingAgent()
+    agent = SpeculativeAgent(inner, rollouts=2, seed=0)
+    battle_state = default_battle()
+    agent.speculate(battle_state, "move 0")
+    unexpected = copy.deepcopy(battle_state)
+    unexpected.player_team.pk_list[1].hp = 3.0
+    agent.choose_action(unexpected)
+    assert agent.misses == 1
+    assert agent._thread is None
+
+
+def test_cancel_does_not_wait_for_the_speculation_thread():
+    release = threading.Event()
+
+    class SlowAgent(Agent):
+        def choose_action(self, battle_state: BattleState) -> str:
+            release.wait(2.0)
+            return "move 0"
+
+    agent = SpeculativeAgent(SlowAgent(), rollouts=2, max_states=2, seed=0)
+    agent.speculate(default_battle(), "move 0")
+    start = time.time()
+    agent.cancel()
+    assert time.time() - start < 0.1
+    release.set()
+    assert agent.wait(2.0)
+    assert agent.cache == {}
+
+
+def test_miss_cuts_the_speculative_decision_short():
+    class BudgetAgent(Agent):
+        # Like the expectiminimax agent: the search, which resets the cancellation,
+        # starts after the determinization
+        def __init__(self):
+            self.cancelled = threading.Event()
+
+        def cancel(self) -> None:
+            self.cancelled.set()
+
+        def choose_action(self, battle_state: BattleState) -> str:
+            time.sleep(0.1)
+            self.cancelled.clear()
+            self.cancelled.wait(0.5)
+            return "move 0"
+
+    agent = SpeculativeAgent(BudgetAgent(), rollouts=2, max_states=4, seed=0)
+    battle_state = default_battle()
+    agent.speculate(battle_state, "move 0")
+    time.sleep(0.05)
+    unexpected = copy.deepcopy(battle_state)
+    unexpected.player_team.pk_list[1].hp = 3.0
+    start = time.time()
+    assert agent.choose_action(unexpected) == "move 0"
+    assert agent.misses == 1
+    # One budget for the real decision, not two
+    assert time.time() - start < 0.9
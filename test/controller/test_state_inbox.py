@@ -0,0 +1,181 @@
+import threading
+import time
+
+from concurrent.futures import Future
+
+from src.battle.belief import OpponentBelief
+from src.controller import controller_node
+from src.controller.base import Agent
+from src.controller.controller_node import MockController, OutputControlService
+from src.controller.expectiminimax_agent import ExpectiminimaxAgent
+from src.controller.state_inbox import StateInbox
+from src.state.pokestate import BattleState
+from src.state.pokestate_defs import PlayerID
+from src.state_reader.state_reader import BattleConditionReader, BattleStateUpdate
+from src.utils.battle_state_serialization import BattleStateSerializer
+from src.utils.tracing import TraceContext, get_sink
+from test.battle.test_belief import SETS, state_with_starmie
+from test.battle.test_simulator import battle, default_battle, mon
+
+
+def message(frame_id: int) -> dict:
+    return BattleStateSerializer().to_dict(default_battle(), TraceContext(frame_id=frame_id, t_capture=float(frame_id)))
+
+
+def test_newest_state_replaces_pending():
+    inbox = StateInbox()
+    for frame in (1, 2, 3):
+        assert inbox.put(message(frame))
+    assert inbox.get(timeout=0.1)["trace"]["frame_id"] == 3
+    assert inbox.dropped == 2
+    assert inbox.get(timeout=0.01) is None
+
+
+def test_out_of_order_state_is_ignored():
+    inbox = StateInbox()
+    inbox.put(message(5))
+    inbox.get(timeout=0.1)
+    inbox.done()
+    assert not inbox.put(message(4))
+    assert inbox.dropped == 1
+    # States without a trace are ordered by arrival
+    assert inbox.put({"player_active_mon": 0})
+
+
+def test_restarted_capture_is_not_out_of_order():
+    inbox = StateInbox()
+    assert inbox.put(message(5000))
+    inbox.get(timeout=0.1)
+    inbox.done()
+    # The capture node restarted: frame ids start over, the capture clock does not
+    restarted = message(0)
+    restarted["trace"]["t_capture"] = 5001.0
+    assert inbox.put(restarted)
+    assert inbox.dropped == 0
+
+
+def test_newer_state_supersedes_decision_once():
+    cancels = []
+    inbox = StateInbox(on_superseded=lambda: cancels.append(1))
+    inbox.put(message(1))
+    inbox.get(timeout=0.1)
+    assert not inbox.superseded()
+    inbox.put(message(2))
+    inbox.put(message(3))
+    assert inbox.superseded() and len(cancels) == 1
+    inbox.discard()
+    assert inbox.dropped == 2
+    assert inbox.get(timeout=0.1)["trace"]["frame_id"] == 3
+    assert not inbox.superseded()
+
+
+class BlockingAgent(Agent):
+    '''
+    Thinks until cancelled, except on the state with the highest HP.
+    '''
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.seen = []
+
+    def choose_action(self, battle_state: BattleState) -> str:
+        self.cancelled.clear()
+        hp = battle_state.get_player_active_mon().hp
+        self.seen.append(hp)
+        if hp < 100:
+            self.cancelled.wait(2.0)
+        return f"move {len(self.seen) - 1}"
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+def test_service_acts_on_newest_state_only(monkeypatch):
+    monkeypatch.setattr(controller_node, "listen", lambda exchange, callbacks: None)
+    controller, agent = MockController(), BlockingAgent()
+    service = OutputControlService(controller, agent)
+    serializer = BattleStateSerializer()
+    for frame, hp in enumerate([10, 20, 30, 100]):
+        battle_state = default_battle()
+        battle_state.get_player_active_mon().hp = hp
+        service.update(serializer.to_dict(battle_state, TraceContext(frame_id=frame, t_capture=float(frame))))
+        if frame == 0:
+            time.sleep(0.05)
+    deadline = time.time() + 2.0
+    while not hasattr(controller, "last_command") and time.time() < deadline:
+        time.sleep(0.01)
+    # 10 is cancelled by 20, which waits in the inbox until replaced by 30 and then 100
+    assert agent.seen == [10, 100]
+    assert controller.last_command == "move 1"
+    assert service.dropped == 3
+    service.inbox.close()
+
+
+def test_service_waits_for_the_buttons_and_reports_errors(monkeypatch, capsys):
+    monkeypatch.setattr(controller_node, "listen", lambda exchange, callbacks: None)
+
+    class FailingController(MockController):
+        def send_command(self, command: str) -> Future:
+            future: Future = Future()
+            threading.Timer(0.05, future.set_exception, (OSError("port closed"),)).start()
+            return future
+
+    sink = get_sink()
+    sink.clear()
+    service = OutputControlService(FailingController(), BlockingAgent(), coalesce=False)
+    service.act(message(1))
+    assert "port closed" in capsys.readouterr().out
+    send = [record for record in sink.spans() if record["stage"] == "controller_send"]
+    assert send and send[0]["duration"] >= 0.05
+
+
+def test_cancel_cuts_expectiminimax_search_short():
+    agent = ExpectiminimaxAgent(time_limit=5.0, max_depth=8)
+    threading.Timer(0.05, agent.cancel).start()
+    start = time.time()
+    agent.choose_action(default_battle())
+    assert time.time() - start < 1.0
+
+
+def test_battle_messages_reach_the_belief(monkeypatch):
+    monkeypatch.setattr(controller_node, "listen", lambda exchange, callbacks: None)
+    belief = OpponentBelief(SETS)
+    controller, agent = MockController(), BlockingAgent()
+    service = OutputControlService(controller, agent, belief=belief)
+    serializer, reader = BattleStateSerializer(), BattleConditionReader()
+    state = BattleStateUpdate(state_with_starmie())
+    messages = []
+    for frame, (hp, text) in enumerate([(10, None), (20, "Go! GENGAR!"), (30, None), (100, "GENGAR used EXPLOSION!")]):
+        if text is not None:
+            reader.update_condition(state, text, PlayerID.P2)
+        state.get_state().get_player_active_mon().hp = hp
+        messages.append(serializer.to_dict(state.get_state(), TraceContext(frame_id=frame, t_capture=float(frame)),
+                                           messages=reader.take_messages()))
+    for frame, data in enumerate(messages):
+        service.update(data)
+        if frame == 0:
+            time.sleep(0.05)
+    deadline = time.time() + 2.0
+    while not hasattr(controller, "last_command") and time.time() < deadline:
+        time.sleep(0.01)
+    # The state of the switch message was dropped, its message was not
+    assert agent.seen == [10, 100]
+    assert belief.active == 1
+    assert belief.probabilities(1)[3] == 1.0
+    # A new player team starts a new battle
+    service.inbox.close()
+    service.act(serializer.to_dict(battle([mon("Jolteon", ["Thunderbolt"])], [mon("Snorlax", ["Body Slam"])])))
+    assert belief.probabilities(1)[3] < 1.0 and belief.active == 0
+
+
+def test_parsed_changes_are_serialized():
+    reader = BattleConditionReader()
+    state = default_battle()
+    state.opponent_team.pk_list[1] = mon("Snorlax", ["Body Slam"], revealed=False)
+    reader.update_condition(BattleStateUpdate(state), "Enemy STARMIE used THUNDER WAVE!", PlayerID.P2)
+    reader.update_condition(BattleStateUpdate(state), "Go! Snorlax!", PlayerID.P2)
+    data = BattleStateSerializer().to_dict(state, messages=reader.take_messages())
+    assert reader.take_messages() == []
+    messages = BattleStateSerializer().messages_from_dict(data)
+    assert [m[0] for m in messages] == ["Enemy STARMIE used THUNDER WAVE!", "Go! Snorlax!"]
+    assert all(m[1] for m in messages)
+    assert messages[1][2] == ("actor", "switch", 1)
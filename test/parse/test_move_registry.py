@@ -0,0 +1,47 @@
+import os
+import time
+
+from parse.pokemon_parser import Move, MoveRegistry
+
+
+class CountingRegistry(MoveRegistry):
+    def __init__(self, moves_dir):
+        super().__init__(moves_dir)
+        self.parsed = []
+
+    def _parse(self, name):
+        self.parsed.append(name)
+        return super()._parse(name)
+
+
+def write_move(directory, name, power):
+    with open(os.path.join(directory, name + ".yaml"), "w") as file:
+        file.write(f"name: {name}\nbasePower: {power}\ncategory: Physical\ntype: Normal\nflags: {{}}\n")
+
+
+def test_moves_are_parsed_once():
+    registry = CountingRegistry("config/moves")
+    assert Move("Surf", registry).power() == Move("Surf", registry).power() == 95
+    assert registry.parsed == ["Surf"]
+
+
+def test_load_all_cache_is_invalidated_by_changed_files(tmp_path):
+    write_move(tmp_path, "Tackle", 35)
+    write_move(tmp_path, "Slam", 80)
+    cache_path = str(tmp_path / "moves.cache.pkl")
+
+    registry = CountingRegistry(str(tmp_path))
+    registry.load_all(cache_path)
+    assert sorted(registry.parsed) == ["Slam", "Tackle"]
+
+    registry = CountingRegistry(str(tmp_path))
+    registry.load_all(cache_path)
+    assert registry.parsed == []
+    assert Move("Slam", registry).power() == 80
+
+    time.sleep(0.01)
+    write_move(tmp_path, "Slam", 85)
+    registry = CountingRegistry(str(tmp_path))
+    registry.load_all(cache_path)
+    assert registry.parsed == ["Slam"]
+    assert Move("Slam", registry).power() == 85
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import threading
+import time
+
+from types import SimpleNamespace
+
+from src.rabbitmq.async_receive import AsyncListener
+
+
+class FakeChannel:
+    def __init__(self):
+        self.acked = []
+        self.nacked = []
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        self.nacked.append(delivery_tag)
+
+
+def _deliver(listener, channel, topic, tag, message):
+    method_frame = SimpleNamespace(routing_key=topic, delivery_tag=tag)
+    listener.on_message(channel, method_frame, None, json.dumps(message).encode('utf-8'))
+
+
+def test_slow_topic_does_not_block_other_topics():
+    release = threading.Event()
+    fast_done = []
+
+    def slow(message):
+        release.wait(timeout=5)
+
+    def fast(message):
+        fast_done.append(message["i"])
+        release.set()
+
+    async def main():
+        listener = AsyncListener("exchange", {"slow": slow, "fast": fast}, max_workers=2)
+        channel = FakeChannel()
+        _deliver(listener, channel, "slow", 1, {"i": 0})
+        _deliver(listener, channel, "fast", 2, {"i": 1})
+        await listener.drain()
+        return channel
+
+    channel = asyncio.run(main())
+    assert fast_done == [1]
+    assert sorted(channel.acked) == [1, 2]
+
+
+def test_same_topic_keeps_order_and_acks_after_completion():
+    seen = []
+
+    def handler(message):
+        time.sleep(0.01 * (3 - message["i"]))
+        seen.append(message["i"])
+
+    async def main():
+        listener = AsyncListener("exchange", {"topic": handler}, max_workers=3)
+        channel = FakeChannel()
+        for i in range(3):
+            _deliver(listener, channel, "topic", i, {"i": i})
+        assert channel.acked == []
+        await listener.drain()
+        return channel
+
+    channel = asyncio.run(main())
+    assert seen == [0, 1, 2]
+    assert channel.acked == [0, 1, 2]
+
+
+def test_failed_callback_is_nacked():
+    def handler(message):
+        raise RuntimeError("boom")
+
+    async def main():
+        listener = AsyncListener("exchange", {"topic": handler})
+        channel = FakeChannel()
+        _deliver(listener, channel, "topic", 7, {})
+        await listener.drain()
+        return channel
+
+    channel = asyncio.run(main())
+    assert channel.nacked == [7]
+    assert channel.acked == []
+
+
+def test_coroutine_callbacks_are_awaited():
+    seen = []
+
+    async def handler(message):
+        await asyncio.sleep(0)
+        seen.append(message["i"])
+
+    async def main():
+        listener = AsyncListener("exchange", {"topic": handler})
+        channel = FakeChannel()
+        _deliver(listener, channel, "topic", 1, {"i": 5})
+        await listener.drain()
+        return channel
+
+    channel = asyncio.run(main())
+    assert seen == [5]
+    assert channel.acked == [1]
+
+
+def test_barrier_topic_runs_between_earlier_and_later_messages():
+    events = []
+
+    def config(message):
+        time.sleep(0.02)
+        events.append("config")
+
+    def update(message):
+        if message["i"] == 0:
+            time.sleep(0.02)
+        events.append(message["i"])
+
+    async def main():
+        listener = AsyncListener("exchange", {"config": config, "update": update}, max_workers=4,
+                                 order_key=lambda topic, message: (topic, message.get("i")), barrier_topics=("config",))
+        channel = FakeChannel()
+        _deliver(listener, channel, "update", 1, {"i": 0})
+        _deliver(listener, channel, "config", 2, {})
+        _deliver(listener, channel, "update", 3, {"i": 1})
+        await listener.drain()
+        return channel
+
+    channel = asyncio.run(main())
+    assert events == [0, "config", 1]
+    assert sorted(channel.acked) == [1, 2, 3]
+
+
+def test_order_key_lets_different_boxes_run_concurrently():
+    both_running = threading.Barrier(2, timeout=2)
+
+    def handler(message):
+        both_running.wait()
+
+    async def main():
+        listener = AsyncListener("exchange", {"topic": handler}, max_workers=2,
+                                 order_key=lambda topic, message: message["box"])
+        channel = FakeChannel()
+        _deliver(listener, channel, "topic", 1, {"box": "p1_hp"})
+        _deliver(listener, channel, "topic", 2, {"box": "p2_hp"})
+        await listener.drain()
+        return channel
+
+    # With one lock per topic the two handlers could not meet at the barrier
+    assert sorted(asyncio.run(main()).acked) == [1, 2]
+
+
+def test_callback_latency_is_measured():
+    async def main():
+        listener = AsyncListener("exchange", {"topic": lambda message: time.sleep(0.01)}, max_workers=2)
+        channel = FakeChannel()
+        for i in range(3):
+            _deliver(listener, channel, "topic", i, {"i": i})
+        await listener.drain()
+        return listener
+
+    stats = asyncio.run(main()).stats
+    assert stats.count == 3 and stats.errors == 0
+    assert stats.as_dict()["mean_run"] >= 0.01
@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+
+from state.team_selection import TeamSelector, solve_zero_sum
+
+NAMES = ["A", "B", "C", "D", "E", "F", "G", "H"]
+
+
+def selector(seed: int = 0) -> TeamSelector:
+    rng = np.random.default_rng(seed)
+    nkos = rng.integers(1, 6, size=(len(NAMES), len(NAMES)))
+    return TeamSelector(NAMES, nkos, rng.integers(50, 150, size=len(NAMES)), [("Normal", None)] * len(NAMES))
+
+
+def test_pairing_scores_follow_favorable_matchup():
+    nkos = np.array([[5, 2], [3, 5]])
+    scores = TeamSelector(["Fast", "Slow"], nkos, np.array([120, 80]), [("Normal", None)] * 2).scores
+    # Fast KOs in 2, Slow needs 3: favorable for Fast either way
+    assert scores[0, 1] > 0 and scores[1, 0] < 0
+    assert np.allclose(scores, -scores.T)
+
+
+def test_game_matrix_matches_direct_evaluation():
+    sel = selector()
+    team, opposing = NAMES[:6], NAMES[2:]
+    matrix, mine, theirs = sel.game_matrix(team, opposing)
+    assert matrix.shape == (60, 60)
+    assert len({(p[0], frozenset(p[1:])) for p in map(tuple, mine)}) == 60
+    pairs = sel.scores[np.ix_(sel._indices(team), sel._indices(opposing))]
+    for r, c in [(0, 0), (17, 42), (59, 3)]:
+        grid = pairs[np.ix_(mine[r], theirs[c])]
+        answers = grid.max(axis=0).mean()
+        threats = (-grid).max(axis=1).mean()
+        expected = 0.4 * grid[0, 0] + 0.6 * 0.5 * (answers - threats)
+        assert np.isclose(matrix[r, c], expected)
+
+
+def test_mixed_strategy_is_at_least_the_maximin():
+    sel = selector(1)
+    picks, probabilities, value = sel.strategy(NAMES[:6], NAMES[2:])
+    _, _, pure = sel.strategy(NAMES[:6], NAMES[2:], mixed=False)
+    assert np.isclose(probabilities.sum(), 1.0)
+    assert value >= pure - 1e-3
+    assert len(sel.select(NAMES[:6], NAMES[2:], rng=np.random.default_rng(0))) == 3
+    # Matching pennies
+    x, y, v = solve_zero_sum(np.array([[1.0, -1.0], [-1.0, 1.0]]))
+    assert np.allclose(x, 0.5, atol=0.05) and abs(v) < 0.05
+
+
+def test_branch_and_bound_finds_the_best_coverage():
+    sel = selector(2)
+    best = sel.best_teams(n_best=3, team_size=4, candidates=len(NAMES))
+    brute = sorted((sel.coverage(team), list(team)) for team in itertools.combinations(NAMES, 4))[::-1][:3]
+    assert [round(v, 12) for v, _ in best] == [round(v, 12) for v, _ in brute]
+    assert sorted(best[0][1]) == sorted(brute[0][1])
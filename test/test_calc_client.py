@@ -0,0 +1,52 @@
+import sys
+
+import pytest
+
+from calc_client import CalcError, CalcPool, CalcRequest, CalcWorker
+
+# Speaks the calc_server.js protocol without needing node or @smogon/calc
+FAKE_SERVER = [sys.executable, "-u", "-c", """
+import json, sys
+for line in sys.stdin:
+    request = json.loads(line)
+    if request["move"] == "Bad":
+        print(json.dumps({"id": request["id"], "error": "No such move"}))
+    elif request["move"] == "Crash":
+        sys.exit(1)
+    else:
+        level = request["attacking_level"]
+        print(json.dumps({"id": request["id"], "damage": [level, level + len(request["move"])]}))
+"""]
+
+
+def request(move: str, level: int = 50) -> CalcRequest:
+    return CalcRequest("Gengar", level, "Chansey", 50, move)
+
+
+def test_pipelined_requests_resolve_by_id():
+    worker = CalcWorker(FAKE_SERVER)
+    try:
+        futures = worker.submit_many([request("Surf", level) for level in range(1, 201)])
+        assert [f.result(timeout=5) for f in futures] == [[level, level + 4] for level in range(1, 201)]
+        assert worker.pending == 0
+    finally:
+        worker.close()
+
+
+def test_errors_are_per_request():
+    with CalcPool(n_workers=2, command=FAKE_SERVER) as pool:
+        assert pool.calculate_many([request("Surf"), request("Bad"), request("Psychic")], timeout=5) == \
+            [[50, 54], [-1], [50, 57]]
+        with pytest.raises(CalcError):
+            pool.submit(request("Bad")).result(timeout=5)
+
+
+def test_server_exit_fails_pending_requests():
+    worker = CalcWorker(FAKE_SERVER)
+    try:
+        futures = worker.submit_many([request("Crash"), request("Surf")])
+        for future in futures:
+            with pytest.raises(CalcError):
+                future.result(timeout=5)
+    finally:
+        worker.close()
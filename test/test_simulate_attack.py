@@ -0,0 +1,37 @@
+import numpy as np
+
+from simulate_attack import damage_rolls, hit_distribution, nhko_probabilities, likelihood_nhko, N_ROLLS
+
+
+def brute_force_nhko(max_damage: int, hp: int, n: int) -> float:
+    grids = np.meshgrid(*[damage_rolls(max_damage)] * n)
+    return np.sum(sum(grids) >= hp) / N_ROLLS ** n
+
+
+def test_matches_meshgrid_enumeration():
+    for max_damage, hp in [(50, 120), (100, 250), (33, 100), (200, 150), (0, 10)]:
+        probabilities = nhko_probabilities(hit_distribution(max_damage, hp), 4)
+        for n in range(1, 5):
+            assert abs(probabilities[n-1] - brute_force_nhko(max_damage, hp, n)) < 1e-12
+
+
+def test_fixed_damage():
+    assert likelihood_nhko(50, 150, True, 2) == 0.0
+    assert likelihood_nhko(50, 150, True, 3) == 1.0
+
+
+def test_beyond_4hko_is_monotonic():
+    probabilities = nhko_probabilities(hit_distribution(30, 200), 10)
+    assert np.all(np.diff(probabilities) >= 0)
+    assert probabilities[5] == 0.0 and probabilities[-1] > 0.0
+
+
+def test_crit_and_accuracy_mixing():
+    hp, normal, crit, crit_chance, accuracy = 120, 50, 95, 0.2, 0.85
+    outcomes = [(0, 1 - accuracy)]
+    outcomes += [(d, accuracy * (1 - crit_chance) / N_ROLLS) for d in damage_rolls(normal)]
+    outcomes += [(d, accuracy * crit_chance / N_ROLLS) for d in damage_rolls(crit)]
+    expected = sum(p1 * p2 for d1, p1 in outcomes for d2, p2 in outcomes if d1 + d2 >= hp)
+    pmf = hit_distribution(normal, hp, crit_damage=crit, crit_chance=crit_chance, accuracy=accuracy)
+    assert abs(pmf.sum() - 1.0) < 1e-12
+    assert abs(nhko_probabilities(pmf, 2)[1] - expected) < 1e-12
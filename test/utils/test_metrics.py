@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from src.utils.metrics import Histogram, MetricsRegistry, get_registry, serve_metrics, timed
+from src.utils.profiling import ProfilerToggle, SamplingProfiler
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    for _ in range(90):
+        histogram.observe(0.0005)
+    for _ in range(10):
+        histogram.observe(0.05)
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.95) == 0.1
+    assert histogram.max == 0.05
+
+
+def test_histogram_overflow_bucket_reports_max():
+    histogram = Histogram(buckets=(0.001,))
+    histogram.observe(2.0)
+    assert histogram.quantile(0.99) == 2.0
+
+
+def test_registry_counters_and_timer():
+    registry = MetricsRegistry()
+    registry.inc("frames")
+    registry.inc("frames", 2)
+    with registry.timer("stage"):
+        time.sleep(0.005)
+    snapshot = registry.snapshot()
+    assert snapshot["counters"]["frames"] == 3
+    assert snapshot["histograms"]["stage"]["count"] == 1
+    assert snapshot["histograms"]["stage"]["max"] >= 0.005
+    text = registry.format_text()
+    assert "frames_total 3" in text
+    assert 'stage_ms{stat="p95"}' in text
+    assert registry.format_log_line().startswith("[metrics] stage: n=1")
+
+
+def test_timed_records_even_on_error():
+    @timed("test_metrics.failing")
+    def failing():
+        raise ValueError("boom")
+
+    try:
+        failing()
+    except ValueError:
+        pass
+    assert get_registry().snapshot()["histograms"]["test_metrics.failing"]["count"] >= 1
+
+
+def test_http_endpoint_serves_text():
+    registry = MetricsRegistry()
+    registry.observe("box_detection.canny", 0.002)
+    server = serve_metrics(0, registry=registry)
+    try:
+        host, port = server.server_address[:2]
+        body = urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=2).read().decode()
+    finally:
+        server.shutdown()
+    assert "box_detection.canny_count 1" in body
+
+
+def busy_wait(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling_profiler_sees_busy_function():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_wait(0.1)
+    profiler.stop()
+    assert any("busy_wait" in stack for stack in profiler.samples)
+    assert "busy_wait" in profiler.top_functions()
+
+
+def test_profiler_toggle_writes_profile(tmp_path):
+    toggle = ProfilerToggle(mode="cprofile", out_dir=str(tmp_path))
+    toggle.toggle()
+    busy_wait(0.01)
+    toggle.toggle()
+    assert not toggle.running
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith(".prof")
+
+
+def test_running_profile_is_written_at_exit(tmp_path):
+    code = ("from src.utils.profiling import install_profiler_signal; "
+            f"install_profiler_signal(mode='sample', out_dir={str(tmp_path)!r}, start=True); "
+            "sum(i * i for i in range(200000))")
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, timeout=30)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".collapsed")]
@@ -0,0 +1,78 @@
+import json
+import time
+import uuid
+
+import numpy as np
+
+from src.state.pokestate_defs import ImageUpdate, Rectangle, MessageType, PlayerID
+from src.utils.battle_state_serialization import BattleStateSerializer
+from src.utils.serialization import ImageUpdateSerializer
+from src.utils.shared_image_list import SharedImageList
+from src.utils.trace_report import load_spans, summarize
+from src.utils.tracing import TraceContext, SpanSink, span, record_since_capture
+from test.state_reader.test_utils import create_example_battle_state
+
+
+def test_span_records_duration_and_frame_id():
+    sink = SpanSink()
+    trace = TraceContext.new(7)
+    with span("stage", trace, sink=sink):
+        time.sleep(0.01)
+    record_since_capture("end_to_end", trace, sink=sink)
+    spans = sink.spans()
+    assert [s["stage"] for s in spans] == ["stage", "end_to_end"]
+    assert all(s["frame_id"] == 7 for s in spans)
+    assert spans[0]["duration"] >= 0.01
+    assert spans[1]["duration"] >= spans[0]["duration"]
+
+
+def test_sink_is_a_ring_buffer():
+    sink = SpanSink(capacity=3)
+    for i in range(5):
+        sink.record("stage", i, 0.0, 0.0)
+    assert [s["frame_id"] for s in sink.spans()] == [2, 3, 4]
+
+
+def test_dump_and_summarize(tmp_path):
+    sink = SpanSink()
+    for i in range(100):
+        sink.record("ocr", i, 0.0, (i + 1) / 1000.0)
+    path = str(tmp_path / "trace.jsonl")
+    assert sink.dump_jsonl(path) == 100
+    assert len(sink) == 0
+    summary = summarize(load_spans([path]))
+    assert summary["ocr"]["count"] == 100
+    assert abs(summary["ocr"]["p50"] - 50.5) < 1e-6
+    assert summary["ocr"]["p99"] > summary["ocr"]["p95"] > summary["ocr"]["p50"]
+
+
+def test_image_update_serialization_carries_trace():
+    config = {
+        'name': f"test_frames_{uuid.uuid4().hex[:8]}",
+        'width': '4', 'height': '4', 'channel': '3', 'dtype': 'uint8', 'n_shmem_frames': '2',
+    }
+    shm = SharedImageList(config, create=True)
+    try:
+        serializer = ImageUpdateSerializer(shm)
+        update = ImageUpdate(
+            np.zeros((4, 4, 3), dtype=np.uint8), Rectangle(0, 0, 2, 2),
+            MessageType.HP, PlayerID.P1, trace=TraceContext(frame_id=3, t_capture=12.5))
+        data = serializer.to_dict(update)
+        assert all(isinstance(v, str) for v in data.values())
+        assert serializer.from_dict(data).trace == TraceContext(frame_id=3, t_capture=12.5)
+
+        update.trace = None
+        assert serializer.from_dict(serializer.to_dict(update)).trace is None
+    finally:
+        shm.shm.close()
+        shm.shm.unlink()
+
+
+def test_battle_state_message_carries_trace():
+    serializer = BattleStateSerializer()
+    state = create_example_battle_state()
+    trace = TraceContext(frame_id=11, t_capture=1.25)
+    data = json.loads(json.dumps(serializer.to_dict(state, trace=trace)))
+    assert serializer.trace_from_dict(data) == trace
+    assert serializer.from_dict(data) == state
+    assert serializer.trace_from_dict(serializer.to_dict(state)) is None